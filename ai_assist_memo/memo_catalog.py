@@ -0,0 +1,162 @@
+"""In-process metadata cache for listing AI memos."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import threading
+import uuid
+from operator import itemgetter
+from pathlib import Path
+
+from .memo_index import parse_memo
+
+
+STAMP_NAME = ".memo_stamp"
+HEADER_BYTES = 1024  # 解析标题和 created_at 时读取的文件头长度
+
+
+class _Dir:
+    """一个目录的缓存：目录 mtime、其中 .md 文件的元数据（按 mtime 降序）和子目录名。"""
+
+    __slots__ = ("mtime_ns", "files", "ordered", "subdirs")
+
+    def __init__(self, mtime_ns: int, files: dict, subdirs: list[str]):
+        self.mtime_ns = mtime_ns
+        self.files = files  # name -> (mtime_ns, rel, size, title, created_at)
+        self.subdirs = subdirs
+        self.ordered: list[tuple] = []
+        self.resort()
+
+    def resort(self) -> None:
+        self.ordered = sorted(self.files.values(), key=itemgetter(0), reverse=True)
+
+
+def _read_meta(path: Path, rel: str, stat) -> tuple:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(HEADER_BYTES).decode("utf-8", errors="ignore")
+        title, created_at, _ = parse_memo(head)
+    except OSError:
+        title, created_at = "", ""
+    return (stat.st_mtime_ns, rel, stat.st_size, title, created_at)
+
+
+class MemoCatalog:
+    """list_memos 的元数据缓存。
+
+    每个目录缓存一份文件元数据，目录 mtime 不变（没有增删文件）时不再逐个 stat；
+    文件内容的变化无法从目录 mtime 看出，因此 memo_store 每次写入后调用 touch / forget
+    直接更新缓存，并在共享的 stamp 文件中写入新令牌：其他 local_tools.py 进程发现令牌变化时
+    重新 stat 一遍文件（只有 mtime/size 变化的文件才重新读取文件头）。
+    在编辑器中原地修改文件不会改变目录 mtime，要等下一次任意写入或进程重启后才会反映出来。
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = data_dir
+        self.stamp_path = data_dir / STAMP_NAME
+        self._dirs: dict[str, _Dir] = {}
+        self._stamp: str | None = None
+        self._lock = threading.Lock()
+
+    def _relative(self, path: Path) -> str:
+        return path.resolve().relative_to(self.data_dir.resolve()).as_posix()
+
+    def _read_stamp(self) -> str:
+        try:
+            return self.stamp_path.read_text(encoding="utf-8")
+        except OSError:
+            return ""
+
+    def _write_stamp(self) -> None:
+        token = uuid.uuid4().hex
+        try:
+            self.stamp_path.write_text(token, encoding="utf-8")
+        except OSError:
+            return
+        self._stamp = token
+
+    def _load_dir(self, path: Path, force: bool) -> _Dir | None:
+        key = str(path)
+        cached = self._dirs.get(key)
+        try:
+            dir_mtime = path.stat().st_mtime_ns
+        except OSError:
+            self._dirs.pop(key, None)
+            return None
+        if cached is not None and cached.mtime_ns == dir_mtime and not force:
+            return cached
+
+        old_files = cached.files if cached is not None else {}
+        files: dict[str, tuple] = {}
+        subdirs: list[str] = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif entry.name.endswith(".md") and entry.is_file():
+                    stat = entry.stat()
+                    old = old_files.get(entry.name)
+                    if old is not None and old[0] == stat.st_mtime_ns and old[2] == stat.st_size:
+                        files[entry.name] = old
+                    else:
+                        files[entry.name] = _read_meta(Path(entry.path), self._relative(Path(entry.path)), stat)
+        loaded = _Dir(dir_mtime, files, subdirs)
+        self._dirs[key] = loaded
+        return loaded
+
+    def _walk(self, path: Path, force: bool):
+        loaded = self._load_dir(path, force)
+        if loaded is None:
+            return
+        yield loaded
+        for name in loaded.subdirs:
+            yield from self._walk(path / name, force)
+
+    def top(self, root: Path, limit: int, exclude: str | None = None) -> list[tuple]:
+        """root 下按 mtime 降序的前 limit 个备忘录：(mtime_ns, path, size, title, created_at)。
+
+        exclude: 跳过该文件名（小写比较，例如 todo.md）。
+        各目录的列表已按 mtime 排好序，用堆做 k 路归并，只取出需要的前 limit 项。
+        """
+        with self._lock:
+            stamp = self._read_stamp()
+            force = stamp != self._stamp
+            self._stamp = stamp
+            dirs = list(self._walk(root, force))
+            merged = heapq.merge(*(d.ordered for d in dirs), key=itemgetter(0), reverse=True)
+            if exclude is not None:
+                merged = (item for item in merged if item[1].rsplit("/", 1)[-1].lower() != exclude)
+            return list(itertools.islice(merged, limit))
+
+    def touch(self, path: Path) -> None:
+        """写入备忘录后更新其元数据。"""
+        with self._lock:
+            cached = self._dirs.get(str(path.parent))
+            if cached is not None:
+                try:
+                    cached.files[path.name] = _read_meta(path, self._relative(path), path.stat())
+                    cached.mtime_ns = path.parent.stat().st_mtime_ns
+                    cached.resort()
+                except OSError:
+                    self._dirs.pop(str(path.parent), None)
+            else:
+                # 新建的月份目录：让上级目录下次重新扫描，以发现新的子目录
+                for parent in path.parents:
+                    self._dirs.pop(str(parent), None)
+                    if parent == self.data_dir:
+                        break
+            self._write_stamp()
+
+    def forget(self, path: Path) -> None:
+        """删除备忘录后移除其元数据。"""
+        with self._lock:
+            cached = self._dirs.get(str(path.parent))
+            if cached is not None and cached.files.pop(path.name, None) is not None:
+                try:
+                    cached.mtime_ns = path.parent.stat().st_mtime_ns
+                    cached.resort()
+                except OSError:
+                    self._dirs.pop(str(path.parent), None)
+            self._write_stamp()
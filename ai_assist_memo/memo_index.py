@@ -0,0 +1,224 @@
+"""Persistent full-text index for AI memos (SQLite FTS5)."""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+
+INDEX_NAME = "memo_index.sqlite3"
+SCHEMA_VERSION = 1
+SNIPPET_CHARS = 60  # 摘要中命中位置前后各保留的字符数
+TITLE_WEIGHT = 5.0  # 标题命中在 bm25 排序中的权重（正文为 1）
+
+# 中日韩文字之间没有空格，unicode61 分词器会把整段当成一个词；
+# 入库和查询时都把这些字符拆成单字，再用短语查询匹配相邻的字
+_CJK_RE = re.compile(r"([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af])")
+_HEADER_RE = re.compile(r"^- (created_at|updated_at): *(.*)$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memos (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS memo_fts USING fts5(title, body, tokenize = 'unicode61');
+"""
+
+
+def _segment(text: str) -> str:
+    return _CJK_RE.sub(r" \1 ", text)
+
+
+def parse_memo(text: str) -> tuple[str, str, str]:
+    """从 _compose_markdown 生成的文本中解析 (title, created_at, body)；其他格式整体作为正文。"""
+    lines = text.splitlines()
+    title = ""
+    created_at = ""
+    start = 0
+    if lines and lines[0].startswith("# "):
+        title = lines[0][2:].strip()
+        start = 1
+        while start < len(lines) and (not lines[start].strip() or _HEADER_RE.match(lines[start])):
+            match = _HEADER_RE.match(lines[start])
+            if match and match.group(1) == "created_at":
+                created_at = match.group(2).strip()
+            start += 1
+    return title, created_at, "\n".join(lines[start:]).strip()
+
+
+def _match_query(query: str, any_term: bool) -> str:
+    # 每个词作为一个短语（引号内的双引号需转义）；默认所有词都要命中
+    phrases = []
+    for term in query.split():
+        tokens = _segment(term).split()
+        if tokens:
+            phrases.append('"' + " ".join(tokens).replace('"', '""') + '"')
+    return (" OR " if any_term else " ").join(phrases)
+
+
+def _snippet(text: str, terms: list[str]) -> str:
+    lowered = text.lower()
+    hits = [pos for pos in (lowered.find(t.lower()) for t in terms) if pos >= 0]
+    if not hits:
+        return text[: SNIPPET_CHARS * 2].strip()
+    pos = min(hits)
+    start = max(0, pos - SNIPPET_CHARS)
+    end = min(len(text), pos + SNIPPET_CHARS)
+    snippet = " ".join(text[start:end].split())
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(text) else "")
+
+
+class MemoIndex:
+    """按 mtime/size 与 data 目录增量同步的备忘录全文索引。
+
+    多个 local_tools.py 进程共享同一个索引文件（WAL 模式），每个线程使用独立连接；
+    写入备忘录后由 memo_store 调用 index_file/remove 更新，启动时 reconcile 补齐外部修改。
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = data_dir
+        self.path = data_dir / INDEX_NAME
+        self._local = threading.local()
+        self._reconciled = False
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                with conn:
+                    conn.execute("DROP TABLE IF EXISTS memos")
+                    conn.execute("DROP TABLE IF EXISTS memo_fts")
+                    conn.executescript(_SCHEMA)
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._local.conn = conn
+        return conn
+
+    def _relative(self, path: Path) -> str:
+        return path.resolve().relative_to(self.data_dir.resolve()).as_posix()
+
+    def _upsert(self, conn: sqlite3.Connection, rel: str, path: Path, stat) -> None:
+        title, created_at, body = parse_memo(path.read_text(encoding="utf-8", errors="replace"))
+        row = conn.execute("SELECT id FROM memos WHERE path = ?", (rel,)).fetchone()
+        if row is None:
+            memo_id = conn.execute(
+                "INSERT INTO memos (path, mtime_ns, size, title, created_at) VALUES (?, ?, ?, ?, ?)",
+                (rel, stat.st_mtime_ns, stat.st_size, title, created_at),
+            ).lastrowid
+        else:
+            memo_id = row[0]
+            conn.execute(
+                "UPDATE memos SET mtime_ns = ?, size = ?, title = ?, created_at = ? WHERE id = ?",
+                (stat.st_mtime_ns, stat.st_size, title, created_at, memo_id),
+            )
+            conn.execute("DELETE FROM memo_fts WHERE rowid = ?", (memo_id,))
+        conn.execute(
+            "INSERT INTO memo_fts (rowid, title, body) VALUES (?, ?, ?)",
+            (memo_id, _segment(title), _segment(body)),
+        )
+
+    def _delete(self, conn: sqlite3.Connection, rel: str) -> None:
+        row = conn.execute("SELECT id FROM memos WHERE path = ?", (rel,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM memo_fts WHERE rowid = ?", (row[0],))
+            conn.execute("DELETE FROM memos WHERE id = ?", (row[0],))
+
+    def index_file(self, path: Path) -> None:
+        """写入备忘录后更新其索引项。"""
+        conn = self._conn()
+        with conn:
+            self._upsert(conn, self._relative(path), path, path.stat())
+
+    def remove(self, path: Path) -> None:
+        """删除备忘录后移除其索引项。"""
+        conn = self._conn()
+        with conn:
+            self._delete(conn, self._relative(path))
+
+    def reconcile(self) -> dict:
+        """对比磁盘上的 mtime/size，只重建有变化的文件，并移除已删除文件的索引项。"""
+        conn = self._conn()
+        known = {path: (mtime_ns, size) for path, mtime_ns, size in conn.execute(
+            "SELECT path, mtime_ns, size FROM memos"
+        )}
+        added = updated = 0
+        with conn:
+            for file_path in self.data_dir.rglob("*.md"):
+                stat = file_path.stat()
+                rel = self._relative(file_path)
+                previous = known.pop(rel, None)
+                if previous == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                self._upsert(conn, rel, file_path, stat)
+                if previous is None:
+                    added += 1
+                else:
+                    updated += 1
+            for rel in known:
+                self._delete(conn, rel)
+        return {"added": added, "updated": updated, "removed": len(known)}
+
+    def ensure_reconciled(self) -> None:
+        """每个进程首次使用索引时同步一次（补齐在编辑器中直接修改的文件）。"""
+        if self._reconciled:
+            return
+        with self._lock:
+            if self._reconciled:
+                return
+            stats = self.reconcile()
+            self._reconciled = True
+        if any(stats.values()):
+            print(f"[Memo Index] reconciled {stats}", file=sys.stderr)
+
+    def search(self, query: str, limit: int = 10, prefix: str = "", exclude: str | None = None) -> list[dict]:
+        """按 bm25 排序返回命中的备忘录（所有词都命中的结果为空时，退回任意词命中）。"""
+        self.ensure_reconciled()
+        conn = self._conn()
+        sql = (
+            "SELECT m.path, m.title, m.created_at, m.mtime_ns, bm25(memo_fts, ?, 1.0) AS rank "
+            "FROM memo_fts JOIN memos m ON m.id = memo_fts.rowid "
+            "WHERE memo_fts MATCH ? AND m.path LIKE ? ESCAPE '\\'"
+        )
+        if exclude:
+            sql += " AND m.path <> ?"
+        sql += " ORDER BY rank LIMIT ?"
+        like = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = []
+        for any_term in (False, True):
+            match = _match_query(query, any_term)
+            if not match:
+                return []
+            params = (TITLE_WEIGHT, match, like) + ((exclude,) if exclude else ()) + (limit,)
+            rows = conn.execute(sql, params).fetchall()
+            if rows or len(query.split()) < 2:
+                break
+
+        terms = query.split()
+        results = []
+        for path, title, created_at, mtime_ns, rank in rows:
+            try:
+                _, _, body = parse_memo((self.data_dir / path).read_text(encoding="utf-8", errors="replace"))
+            except OSError:
+                continue
+            results.append(
+                {
+                    "path": path,
+                    "title": title,
+                    "created_at": created_at,
+                    "mtime_ns": mtime_ns,
+                    "score": round(-rank, 4),
+                    "snippet": _snippet(body, terms),
+                }
+            )
+        return results
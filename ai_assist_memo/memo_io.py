@@ -0,0 +1,109 @@
+"""Crash-safe file primitives for AI memos."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+HEADER_BYTES = 1024  # 原地更新 updated_at 时读取的文件头长度
+REPLACE_RETRIES = 5  # Windows 上目标文件正被其他进程读取时 os.replace 会失败，短暂等待后重试
+
+# _compose_markdown 生成的文件头中 updated_at 的值（兼容 Windows 上写入的 CRLF）
+_UPDATED_AT_RE = re.compile(rb"\A# [^\r\n]*\r?\n\r?\n- created_at: [^\r\n]*\r?\n- updated_at: ([^\r\n]*)")
+
+
+@contextmanager
+def file_lock(path: Path, lock_dir: Path):
+    """按文件加排他锁，桌面端和 Web 端的 MCP 调用在不同的 local_tools.py 进程中也会互斥。
+
+    锁文件放在 lock_dir 中（以路径的哈希命名），不会被当成备忘录列出或索引。
+    """
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    key = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+    with open(lock_dir / f"{key}.lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK 自身会重试约 10 秒，仍未拿到时抛出 OSError，继续等待
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """写入同目录下的临时文件并 fsync，再用 os.replace 替换：中途崩溃时原文件保持不变。"""
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        for attempt in range(REPLACE_RETRIES):
+            try:
+                os.replace(tmp, path)
+                break
+            except PermissionError:
+                if attempt == REPLACE_RETRIES - 1:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def append_text(path: Path, text: str) -> None:
+    """在文件末尾追加（原内容不以换行结尾时先补一个换行），只写入新增的部分。"""
+    needs_newline = False
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(("\n" if needs_newline else "") + text)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def touch_updated_at(path: Path, timestamp: str) -> bool:
+    """原地改写文件头中的 updated_at。
+
+    没有该文件头时无需处理，返回 True；新旧值字节长度不同（例如时区格式变化）无法原地改写，返回 False。
+    """
+    with open(path, "r+b") as f:
+        match = _UPDATED_AT_RE.match(f.read(HEADER_BYTES))
+        if match is None:
+            return True
+        value = timestamp.encode("utf-8")
+        if len(value) != len(match.group(1)):
+            return False
+        f.seek(match.start(1))
+        f.write(value)
+        f.flush()
+        os.fsync(f.fileno())
+    return True
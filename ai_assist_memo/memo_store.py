@@ -1,13 +1,29 @@
 from __future__ import annotations
 
+import re
+import sys
 from datetime import datetime
 from pathlib import Path
 
+from . import memo_io
+from .memo_catalog import MemoCatalog
+from .memo_index import MemoIndex
+from .memo_vectors import VectorIndex
+
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
+LOCK_DIR = DATA_DIR / ".locks"
 TODO_NAME = "todo.md"
 VALID_UPDATE_MODES = {"replace", "append", "prepend"}
+SEARCH_MAX_LIMIT = 50
+
+# _compose_markdown 生成的文件头（标题、created_at、updated_at 及其后的空行）
+_HEADER_RE = re.compile(r"\A# [^\n]*\n\n- created_at: [^\n]*\n- updated_at: ([^\n]*)\n(?:\n|\Z)")
+
+_CATALOG = MemoCatalog(DATA_DIR)
+_INDEX = MemoIndex(DATA_DIR)
+_VECTORS = VectorIndex(DATA_DIR)
 
 
 def _ensure_data_dir() -> None:
@@ -50,6 +66,22 @@ def _relative_posix(path: Path) -> str:
     return path.resolve().relative_to(DATA_DIR.resolve()).as_posix()
 
 
+def _reindex(path: Path, removed: bool = False) -> None:
+    if removed:
+        _CATALOG.forget(path)
+    else:
+        _CATALOG.touch(path)
+    # 索引只用于检索：更新失败不影响备忘录本身的读写，下次启动时由 reconcile 补齐
+    for tag, index in (("Memo Index", _INDEX), ("Memo Vectors", _VECTORS)):
+        try:
+            if removed:
+                index.remove(path)
+            else:
+                index.index_file(path)
+        except Exception as exc:  # 向量索引可能依赖 Ollama 服务
+            print(f"[{tag}] failed to update index for {path}: {exc}", file=sys.stderr)
+
+
 def _compose_markdown(title: str, content: str, created: datetime) -> str:
     created_iso = created.isoformat(timespec="seconds")
     header_lines = [
@@ -73,15 +105,22 @@ def create_memo(content: str, title: str = "", timestamp: str | None = None) ->
     month_dir = DATA_DIR / f"{dt.year:04d}" / f"{dt.month:02d}"
     month_dir.mkdir(parents=True, exist_ok=True)
 
+    memo_title = title.strip() if title and title.strip() else f"Memo {dt.strftime('%Y-%m-%d %H:%M:%S')}"
+    text = _compose_markdown(memo_title, content, dt)
+
+    # 以独占模式创建：同一秒内来自两个进程的新建不会互相覆盖
     base_name = dt.strftime("%Y%m%d_%H%M%S")
     memo_path = month_dir / f"{base_name}.md"
     seq = 1
-    while memo_path.exists():
-        memo_path = month_dir / f"{base_name}_{seq:02d}.md"
-        seq += 1
-
-    memo_title = title.strip() if title and title.strip() else f"Memo {dt.strftime('%Y-%m-%d %H:%M:%S')}"
-    memo_path.write_text(_compose_markdown(memo_title, content, dt), encoding="utf-8")
+    while True:
+        try:
+            with open(memo_path, "x", encoding="utf-8") as f:
+                f.write(text)
+            break
+        except FileExistsError:
+            memo_path = month_dir / f"{base_name}_{seq:02d}.md"
+            seq += 1
+    _reindex(memo_path)
 
     return {
         "ok": True,
@@ -112,26 +151,91 @@ def list_memos(
     if month is not None:
         root = root / f"{month:02d}"
 
-    if not root.exists():
-        return {"ok": True, "count": 0, "items": []}
+    # 元数据来自进程内缓存：没有变化时只检查目录 mtime，不逐个 stat 文件
+    entries = _CATALOG.top(root, limit, exclude=None if include_todo else TODO_NAME)
+    items = [
+        {
+            "path": rel,
+            "size": size,
+            "updated_at": datetime.fromtimestamp(mtime_ns / 1e9).astimezone().isoformat(timespec="seconds"),
+            "title": title,
+            "created_at": created_at,
+        }
+        for mtime_ns, rel, size, title, created_at in entries
+    ]
+    return {"ok": True, "count": len(items), "items": items}
+
 
-    files = sorted(root.rglob("*.md"), key=lambda p: p.stat().st_mtime, reverse=True)
+def _check_search_args(query: str, year: int | None, month: int | None, limit: int) -> None:
+    if not query or not query.strip():
+        raise ValueError("Query must not be empty.")
+    if month is not None and year is None:
+        raise ValueError("When month is provided, year is required.")
+    if month is not None and not (1 <= month <= 12):
+        raise ValueError("Month must be between 1 and 12.")
+    if limit <= 0:
+        raise ValueError("Limit must be greater than 0.")
+
+
+def _path_prefix(year: int | None, month: int | None) -> str:
+    prefix = ""
+    if year is not None:
+        prefix = f"{year:04d}/"
+    if month is not None:
+        prefix += f"{month:02d}/"
+    return prefix
+
+
+def sync_index() -> None:
+    """启动时按 mtime 增量同步全文索引和向量索引（补齐在编辑器中直接修改的文件）。"""
+    for tag, index in (("Memo Index", _INDEX), ("Memo Vectors", _VECTORS)):
+        try:
+            index.ensure_reconciled()
+        except Exception as exc:
+            print(f"[{tag}] failed to reconcile index: {exc}", file=sys.stderr)
+
+
+def search_memos(
+    query: str,
+    year: int | None = None,
+    month: int | None = None,
+    limit: int = 10,
+    include_todo: bool = True,
+) -> dict:
+    """全文检索备忘录，按相关度返回路径、标题和命中位置附近的摘要。"""
+    _check_search_args(query, year, month, limit)
+    _ensure_data_dir()
+    hits = _INDEX.search(
+        query.strip(),
+        limit=min(limit, SEARCH_MAX_LIMIT),
+        prefix=_path_prefix(year, month),
+        exclude=None if include_todo else TODO_NAME,
+    )
     items = []
-    for file_path in files:
-        if not include_todo and file_path.name.lower() == TODO_NAME:
-            continue
-        stat = file_path.stat()
-        items.append(
-            {
-                "path": _relative_posix(file_path),
-                "size": stat.st_size,
-                "updated_at": datetime.fromtimestamp(stat.st_mtime).astimezone().isoformat(timespec="seconds"),
-            }
-        )
-        if len(items) >= limit:
-            break
+    for hit in hits:
+        mtime = hit.pop("mtime_ns") / 1e9
+        hit["updated_at"] = datetime.fromtimestamp(mtime).astimezone().isoformat(timespec="seconds")
+        items.append(hit)
+    return {"ok": True, "query": query.strip(), "count": len(items), "items": items}
 
-    return {"ok": True, "count": len(items), "items": items}
+
+def semantic_search_memos(
+    query: str,
+    year: int | None = None,
+    month: int | None = None,
+    limit: int = 5,
+    include_todo: bool = True,
+) -> dict:
+    """按语义相似度检索备忘录分块，每个备忘录返回最相关的一段原文。"""
+    _check_search_args(query, year, month, limit)
+    _ensure_data_dir()
+    items = _VECTORS.search(
+        query.strip(),
+        top_k=min(limit, SEARCH_MAX_LIMIT),
+        prefix=_path_prefix(year, month),
+        exclude=None if include_todo else TODO_NAME,
+    )
+    return {"ok": True, "query": query.strip(), "count": len(items), "items": items}
 
 
 def read_memo(path: str) -> dict:
@@ -150,46 +254,83 @@ def read_memo(path: str) -> dict:
     }
 
 
-def update_memo(path: str, content: str, mode: str = "replace") -> dict:
-    """更新指定备忘录内容，支持 replace/append/prepend 三种模式。"""
-    update_mode = mode.strip().lower()
-    if update_mode not in VALID_UPDATE_MODES:
-        raise ValueError(f"Invalid mode: {mode}. Supported modes: {sorted(VALID_UPDATE_MODES)}")
-
-    memo_path = _resolve_memo_path(path)
-    if not memo_path.exists() or not memo_path.is_file():
-        raise FileNotFoundError(f"Memo not found: {path}")
+def _merge_update(current: str, payload: str, mode: str, now: str) -> str:
+    # 有 _compose_markdown 文件头时保留标题和 created_at、刷新 updated_at，
+    # replace / prepend 作用于正文；payload 自带 "# 标题" 时视为完整文档整体替换
+    match = _HEADER_RE.match(current)
+    if match is None or (mode == "replace" and payload.lstrip().startswith("# ")):
+        header, body = "", current
+    else:
+        header, body = current[: match.start(1)] + now + "\n\n", current[match.end():]
 
-    current = memo_path.read_text(encoding="utf-8")
-    payload = content or ""
-    if update_mode == "replace":
+    if mode == "replace":
         merged = payload
-    elif update_mode == "append":
-        separator = "\n" if current and not current.endswith("\n") else ""
-        merged = f"{current}{separator}{payload}"
+    elif mode == "append":
+        separator = "\n" if body and not body.endswith("\n") else ""
+        merged = f"{body}{separator}{payload}"
     else:
         separator = "\n" if payload and not payload.endswith("\n") else ""
-        merged = f"{payload}{separator}{current}"
+        merged = f"{payload}{separator}{body}"
+    return header + merged
 
-    memo_path.write_text(merged, encoding="utf-8")
-    stat = memo_path.stat()
+
+def _refresh_updated_at(current: str, now: str) -> str:
+    match = _HEADER_RE.match(current)
+    return current if match is None else current[: match.start(1)] + now + current[match.end(1):]
+
+
+def _apply_update(target: Path, content: str, mode: str, must_exist: bool = False) -> dict:
+    payload = content or ""
+    now = datetime.now().astimezone().isoformat(timespec="seconds")
+    # 同一文件的更新互斥（跨 local_tools.py 进程），避免并发的读-改-写丢失更新
+    with memo_io.file_lock(target, LOCK_DIR):
+        if must_exist and not target.is_file():
+            # 等锁期间被其他调用删除
+            raise FileNotFoundError(f"Memo not found: {_relative_posix(target)}")
+        if mode == "append" and target.exists():
+            # 追加只写入新增内容，文件头中的 updated_at 原地改写
+            memo_io.append_text(target, payload)
+            if not memo_io.touch_updated_at(target, now):
+                current = target.read_text(encoding="utf-8")
+                memo_io.atomic_write_text(target, _refresh_updated_at(current, now))
+        else:
+            # replace / prepend 需要整体重写：先写临时文件再原子替换，崩溃时不会留下半个文件
+            current = target.read_text(encoding="utf-8") if target.exists() else ""
+            memo_io.atomic_write_text(target, _merge_update(current, payload, mode, now))
+        stat = target.stat()
+    _reindex(target)
     return {
         "ok": True,
-        "path": _relative_posix(memo_path),
-        "absolute_path": str(memo_path),
-        "mode": update_mode,
+        "path": _relative_posix(target),
+        "absolute_path": str(target),
+        "mode": mode,
         "size": stat.st_size,
         "updated_at": datetime.fromtimestamp(stat.st_mtime).astimezone().isoformat(timespec="seconds"),
     }
 
 
+def update_memo(path: str, content: str, mode: str = "replace") -> dict:
+    """更新指定备忘录内容，支持 replace/append/prepend 三种模式（作用于正文，保留标题并刷新 updated_at）。"""
+    update_mode = mode.strip().lower()
+    if update_mode not in VALID_UPDATE_MODES:
+        raise ValueError(f"Invalid mode: {mode}. Supported modes: {sorted(VALID_UPDATE_MODES)}")
+
+    memo_path = _resolve_memo_path(path)
+    if not memo_path.exists() or not memo_path.is_file():
+        raise FileNotFoundError(f"Memo not found: {path}")
+
+    return _apply_update(memo_path, content, update_mode, must_exist=True)
+
+
 def delete_memo(path: str) -> dict:
     """删除指定备忘录文件。"""
     memo_path = _resolve_memo_path(path)
     if not memo_path.exists() or not memo_path.is_file():
         raise FileNotFoundError(f"Memo not found: {path}")
 
-    memo_path.unlink()
+    with memo_io.file_lock(memo_path, LOCK_DIR):
+        memo_path.unlink()
+    _reindex(memo_path, removed=True)
     return {"ok": True, "deleted": True, "path": path}
 
 
@@ -202,24 +343,4 @@ def update_todo(content: str, mode: str = "append") -> dict:
     if update_mode not in VALID_UPDATE_MODES:
         raise ValueError(f"Invalid mode: {mode}. Supported modes: {sorted(VALID_UPDATE_MODES)}")
 
-    current = todo_path.read_text(encoding="utf-8") if todo_path.exists() else ""
-    payload = content or ""
-    if update_mode == "replace":
-        merged = payload
-    elif update_mode == "append":
-        separator = "\n" if current and not current.endswith("\n") else ""
-        merged = f"{current}{separator}{payload}"
-    else:
-        separator = "\n" if payload and not payload.endswith("\n") else ""
-        merged = f"{payload}{separator}{current}"
-
-    todo_path.write_text(merged, encoding="utf-8")
-    stat = todo_path.stat()
-    return {
-        "ok": True,
-        "path": _relative_posix(todo_path),
-        "absolute_path": str(todo_path),
-        "mode": update_mode,
-        "size": stat.st_size,
-        "updated_at": datetime.fromtimestamp(stat.st_mtime).astimezone().isoformat(timespec="seconds"),
-    }
+    return _apply_update(todo_path, content, update_mode)
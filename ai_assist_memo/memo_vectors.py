@@ -0,0 +1,382 @@
+"""Local semantic index for AI memos (memory-mapped float16 vectors)."""
+
+from __future__ import annotations
+
+import math
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from .memo_index import parse_memo
+
+
+# 嵌入模型：为空时使用无需模型的字符 n-gram 哈希嵌入；
+# 填写 Ollama 的嵌入模型名（例如 "bge-m3"、"nomic-embed-text"）时通过本机 Ollama 计算
+EMBED_MODEL = ""
+HASH_DIM = 1024  # 哈希嵌入的维度（512 维时短句之间的哈希冲突明显）
+CHUNK_CHARS = 400  # 每个分块的最大字符数
+CHUNK_OVERLAP = 80  # 长段落切分时相邻分块的重叠字符数
+GROW_ROWS = 1024  # 向量文件每次扩容的最小行数
+SCORE_BLOCK = 16384  # 计算相似度时每次从 memmap 读入的行数
+
+VECTORS_NAME = "memo_vectors.f16"
+META_NAME = "memo_vectors.sqlite3"
+
+_CJK_RUN_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+")
+_WORD_RE = re.compile(r"[^\W_]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vec_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS vec_files (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS vec_chunks (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vec_chunks_path ON vec_chunks (path);
+CREATE TABLE IF NOT EXISTS vec_free (id INTEGER PRIMARY KEY);
+"""
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder:
+    """字符 n-gram 特征哈希嵌入：CJK 取单字和相邻两字，其他文字取整词和词内三字母组。
+
+    不需要下载模型，只能捕捉字面上的重叠（近义词召回不如真正的嵌入模型）。
+    使用 crc32 而不是内置 hash，保证不同进程得到相同的向量。
+    """
+
+    def __init__(self, dim: int = HASH_DIM):
+        self.dim = dim
+        self.name = f"hash-ngram-{dim}"
+
+    def _features(self, text: str) -> dict[str, float]:
+        counts: dict[str, float] = {}
+        text = text.lower()
+        for run in _CJK_RUN_RE.findall(text):
+            for i, ch in enumerate(run):
+                counts[ch] = counts.get(ch, 0) + 1
+                if i + 1 < len(run):
+                    gram = run[i:i + 2]
+                    counts[gram] = counts.get(gram, 0) + 2
+        for word in _WORD_RE.findall(_CJK_RUN_RE.sub(" ", text)):
+            counts[word] = counts.get(word, 0) + 2
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                gram = padded[i:i + 3]
+                counts[gram] = counts.get(gram, 0) + 1
+        return counts
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                out[row, h % self.dim] += sign * (1.0 + math.log(count))
+        return _normalize(out)
+
+
+class OllamaEmbedder:
+    """通过本机 Ollama 的 /api/embed 计算嵌入（维度在首次调用时确定）"""
+
+    def __init__(self, model: str, host: str | None = None):
+        import ollama
+
+        self.client = ollama.Client(host=host)
+        self.model = model
+        self.name = f"ollama:{model}"
+        self._dim: int | None = None
+
+    @property
+    def dim(self) -> int:
+        if self._dim is None:
+            self._dim = self.embed(["dim"]).shape[1]
+        return self._dim
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        response = self.client.embed(model=self.model, input=list(texts))
+        vectors = np.asarray(response["embeddings"], dtype=np.float32)
+        self._dim = vectors.shape[1]
+        return _normalize(vectors)
+
+
+def make_embedder():
+    return OllamaEmbedder(EMBED_MODEL) if EMBED_MODEL else HashingEmbedder()
+
+
+def chunk_text(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """按段落合并为不超过 size 字符的分块；超长段落按固定窗口切分（相邻窗口重叠 overlap 字符）。"""
+    chunks: list[str] = []
+    current = ""
+    for para in (p.strip() for p in re.split(r"\n\s*\n", text)):
+        if not para:
+            continue
+        if len(para) > size:
+            if current:
+                chunks.append(current)
+                current = ""
+            step = size - overlap
+            for start in range(0, len(para) - overlap, step):
+                chunks.append(para[start:start + size])
+            continue
+        if current and len(current) + 1 + len(para) > size:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{para}" if current else para
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class VectorIndex:
+    """备忘录分块的向量索引。
+
+    向量以 float16 存放在无文件头的 memo_vectors.f16 中（第 i 行对应 vec_chunks.id = i），
+    检索时以只读 memmap 按块读取，不把整个矩阵载入内存；分块文本和空闲行号记录在
+    memo_vectors.sqlite3 中。删除的行先清零再放入空闲列表，之后的写入优先复用，
+    文件只增不减（Windows 上无法截短仍被其他进程映射的文件）。
+
+    所有写操作都在 SQLite 的 IMMEDIATE 事务中进行，多个 local_tools.py 进程之间互斥。
+    """
+
+    def __init__(self, data_dir: Path, embedder=None):
+        self.data_dir = data_dir
+        self.vectors_path = data_dir / VECTORS_NAME
+        self.meta_path = data_dir / META_NAME
+        self.embedder = embedder or make_embedder()
+        self._local = threading.local()
+        self._map: np.memmap | None = None
+        self._map_lock = threading.Lock()
+        self._dim: int | None = None
+        self._reconciled = False
+        self._lock = threading.Lock()
+
+    # ---------- storage ----------
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.meta_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._check_embedder(conn)
+            self._local.conn = conn
+        return conn
+
+    def _check_embedder(self, conn: sqlite3.Connection) -> None:
+        # 换了嵌入模型（或维度）时旧向量不可比较：清空后由 reconcile 全部重建
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM vec_meta"))
+            dim = self.embedder.dim
+            if meta.get("embedder") != self.embedder.name or meta.get("dim") != str(dim):
+                if meta:
+                    print(f"[Memo Vectors] embedder changed to {self.embedder.name}; rebuilding", file=sys.stderr)
+                for table in ("vec_files", "vec_chunks", "vec_free", "vec_meta"):
+                    conn.execute(f"DELETE FROM {table}")
+                conn.executemany(
+                    "INSERT INTO vec_meta (key, value) VALUES (?, ?)",
+                    [("embedder", self.embedder.name), ("dim", str(dim)), ("rows", "0")],
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._dim = dim
+
+    def _rows(self, conn: sqlite3.Connection) -> int:
+        return int(conn.execute("SELECT value FROM vec_meta WHERE key = 'rows'").fetchone()[0])
+
+    def _allocate(self, conn: sqlite3.Connection, count: int) -> list[int]:
+        ids = [row[0] for row in conn.execute("SELECT id FROM vec_free ORDER BY id LIMIT ?", (count,))]
+        if ids:
+            conn.executemany("DELETE FROM vec_free WHERE id = ?", [(i,) for i in ids])
+        if len(ids) < count:
+            rows = self._rows(conn)
+            extra = count - len(ids)
+            ids.extend(range(rows, rows + extra))
+            conn.execute("UPDATE vec_meta SET value = ? WHERE key = 'rows'", (str(rows + extra),))
+            self._ensure_capacity(rows + extra)
+        return ids
+
+    def _ensure_capacity(self, rows: int) -> None:
+        row_bytes = self._dim * 2
+        size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+        if size >= rows * row_bytes:
+            return
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(max(rows, size // row_bytes + GROW_ROWS) * row_bytes)
+
+    def _write_rows(self, ids: list[int], vectors: np.ndarray) -> None:
+        row_bytes = self._dim * 2
+        data = np.ascontiguousarray(vectors, dtype=np.float16)
+        with open(self.vectors_path, "r+b") as f:
+            for row, vec in zip(ids, data):
+                f.seek(row * row_bytes)
+                f.write(vec.tobytes())
+
+    def _matrix(self, rows: int) -> np.ndarray:
+        # 只读映射；其他进程扩容后文件变大，需要重新映射
+        with self._map_lock:
+            if self._map is None or self._map.shape[0] < rows:
+                self._map = None
+                if rows == 0:
+                    return np.zeros((0, self._dim), dtype=np.float16)
+                total = self.vectors_path.stat().st_size // (self._dim * 2)
+                self._map = np.memmap(self.vectors_path, dtype=np.float16, mode="r", shape=(total, self._dim))
+            return self._map[:rows]
+
+    # ---------- updates ----------
+
+    def _relative(self, path: Path) -> str:
+        return path.resolve().relative_to(self.data_dir.resolve()).as_posix()
+
+    def _drop(self, conn: sqlite3.Connection, rel: str) -> None:
+        ids = [row[0] for row in conn.execute("SELECT id FROM vec_chunks WHERE path = ?", (rel,))]
+        if ids:
+            self._write_rows(ids, np.zeros((len(ids), self._dim), dtype=np.float16))
+            conn.execute("DELETE FROM vec_chunks WHERE path = ?", (rel,))
+            conn.executemany("INSERT OR IGNORE INTO vec_free (id) VALUES (?)", [(i,) for i in ids])
+        conn.execute("DELETE FROM vec_files WHERE path = ?", (rel,))
+
+    def _store(self, rel: str, path: Path, stat) -> None:
+        title, _, body = parse_memo(path.read_text(encoding="utf-8", errors="replace"))
+        chunks = chunk_text(body) or ([title] if title else [])
+        # 嵌入在事务之外计算（可能较慢），写入时再确认文件没有被其他进程抢先处理
+        vectors = self.embedder.embed([f"{title}\n{c}" for c in chunks]) if chunks else None
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT mtime_ns, size FROM vec_files WHERE path = ?", (rel,)).fetchone()
+            if row != (stat.st_mtime_ns, stat.st_size):
+                self._drop(conn, rel)
+                if chunks:
+                    ids = self._allocate(conn, len(chunks))
+                    self._write_rows(ids, vectors)
+                    conn.executemany(
+                        "INSERT INTO vec_chunks (id, path, title, text) VALUES (?, ?, ?, ?)",
+                        [(i, rel, title, c) for i, c in zip(ids, chunks)],
+                    )
+                conn.execute(
+                    "INSERT INTO vec_files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                    (rel, stat.st_mtime_ns, stat.st_size),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def index_file(self, path: Path) -> None:
+        """写入备忘录后重新分块并计算嵌入。"""
+        self._store(self._relative(path), path, path.stat())
+
+    def remove(self, path: Path) -> None:
+        """删除备忘录后回收其向量行。"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._drop(conn, self._relative(path))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def reconcile(self) -> dict:
+        """对比磁盘上的 mtime/size，只为有变化的文件重新计算嵌入，并回收已删除文件的向量。"""
+        conn = self._conn()
+        known = {path: (mtime_ns, size) for path, mtime_ns, size in conn.execute(
+            "SELECT path, mtime_ns, size FROM vec_files"
+        )}
+        changed = 0
+        for file_path in self.data_dir.rglob("*.md"):
+            stat = file_path.stat()
+            rel = self._relative(file_path)
+            if known.pop(rel, None) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            self._store(rel, file_path, stat)
+            changed += 1
+        if known:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for rel in known:
+                    self._drop(conn, rel)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return {"changed": changed, "removed": len(known)}
+
+    def ensure_reconciled(self) -> None:
+        """每个进程首次使用索引时同步一次。"""
+        if self._reconciled:
+            return
+        with self._lock:
+            if self._reconciled:
+                return
+            stats = self.reconcile()
+            self._reconciled = True
+        if any(stats.values()):
+            print(f"[Memo Vectors] reconciled {stats}", file=sys.stderr)
+
+    # ---------- search ----------
+
+    def search(self, query: str, top_k: int = 5, prefix: str = "", exclude: str | None = None) -> list[dict]:
+        """返回与 query 最相近的分块（每个备忘录只取得分最高的一块），按余弦相似度降序。"""
+        self.ensure_reconciled()
+        conn = self._conn()
+        q = self.embedder.embed([query])[0]
+        rows = self._rows(conn)
+        matrix = self._matrix(rows)
+
+        if prefix or exclude:
+            # 按路径过滤时只对符合条件的行计算相似度
+            like = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            ids = np.fromiter(
+                (row[0] for row in conn.execute(
+                    "SELECT id FROM vec_chunks WHERE path LIKE ? ESCAPE '\\' AND path <> ?",
+                    (like, exclude or ""),
+                )),
+                dtype=np.int64,
+            )
+            ids = ids[ids < rows]
+            scores = (matrix[ids].astype(np.float32) @ q) if len(ids) else np.zeros(0, np.float32)
+        else:
+            ids = None
+            scores = np.empty(rows, dtype=np.float32)
+            for start in range(0, rows, SCORE_BLOCK):
+                block = matrix[start:start + SCORE_BLOCK]
+                scores[start:start + len(block)] = block.astype(np.float32) @ q
+
+        # 多取一些候选，去掉同一备忘录的重复分块后再截断到 top_k
+        n_candidates = min(len(scores), top_k * 4)
+        if n_candidates == 0:
+            return []
+        candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        results: list[dict] = []
+        seen: set[str] = set()
+        for pos in candidates:
+            if scores[pos] <= 0:  # 已删除的行向量为 0，没有任何相同特征的分块得分也接近 0
+                break
+            row_id = int(ids[pos]) if ids is not None else int(pos)
+            hit = conn.execute("SELECT path, title, text FROM vec_chunks WHERE id = ?", (row_id,)).fetchone()
+            if hit is None or hit[0] in seen:
+                continue
+            seen.add(hit[0])
+            results.append({"path": hit[0], "title": hit[1], "score": round(float(scores[pos]), 4), "snippet": hit[2]})
+            if len(results) >= top_k:
+                break
+        return results
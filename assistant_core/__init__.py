@@ -0,0 +1 @@
+"""AI assistant core components shared by the entry-point scripts."""
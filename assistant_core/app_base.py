@@ -0,0 +1,561 @@
+"""桌面端助手窗口的公共部分，各入口脚本只提供配置和 ASR / TTS 选择。
+
+  - AssistantConfig:      配置项及默认值，脚本的配置区只写与默认值不同的项；
+  - AssistantWindow:      Ollama 客户端、会话存储、MCP 会话池、TurnEngine 的装配，
+                          聊天界面、键盘对话（逐 token 推送到 PyQt 和 Web）与退出清理；
+  - VoiceAssistantWindow: 在此之上加按住 Ctrl+Alt+A 录音 → ASR → LLM → TTS → 播放，
+                          模型在后台线程加载，按 config.tts_engine 选择 Kokoro 或 Qwen TTS。
+
+Web 端的 broadcast_message / broadcast_stream 由脚本传入（server 依赖 flask，本模块不导入）；
+torch / qwen_asr / qwen_tts / kokoro 只在加载模型时导入。
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+
+import keyboard
+import numpy as np
+import ollama
+from mcp import StdioServerParameters
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtWidgets import (QApplication, QCheckBox, QHBoxLayout, QLabel, QLineEdit,
+                             QPushButton, QTextEdit, QVBoxLayout, QWidget)
+
+from .asr_input import transcribe
+from .chat_context import ChatContext, make_ollama_summarizer
+from .chat_view import ChatView
+from .conversation import ConversationStore
+from .engine import TurnEngine, fetch_tools
+from .llm_limiter import ConcurrencyLimitedClient
+from .mcp_pool import MCPSessionPool
+from .memo_recall import MemoRecall
+from .tool_dispatch import ToolDispatcher
+from .tracing import Tracer
+from .tts_cache import TTSCache
+from .tts_engine import CachedSynthesizer, KokoroSynthesizer, QwenSynthesizer
+from .voice_pipeline import reply_and_speak, speak
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class AssistantConfig:
+    ollama_host: str = "http://192.168.40.12:11434"
+    model_name: str = "qwen3.5:35b-a3b"
+    chat_options: dict | None = None  # 传给 ollama chat 的额外参数，例如 {'think': False}
+    mcp_pool_size: int = 2  # 常驻 MCP 会话数（每个会话对应一个 local_tools.py 子进程）
+    memo_recall_top_k: int = 3  # 每轮自动注入的相关备忘录片段数上限（0 表示关闭）
+    memo_recall_min_score: float = 0.12  # 注入片段的最低相似度（默认哈希嵌入；改用 Ollama 嵌入模型后应调高，如 0.5）
+    chat_view_max_messages: int = 200  # 桌面端聊天显示区最多保留的消息条数
+    context_max_tokens: int = 12000  # 上下文估算超过该值时压缩最早的对话
+    context_target_tokens: int = 6000  # 压缩后的目标大小
+    tool_output_max_chars: int = 4000  # 单条工具输出写入上下文的最大字符数
+    serialize_turns: bool = True  # 同一会话的多轮请求（键盘 / 语音 / Web）排队执行，避免消息交错
+    ollama_max_concurrency: int = 4  # 同时发往 Ollama 的请求上限（与服务端 OLLAMA_NUM_PARALLEL 对应）
+    clear_chat_by_tool: bool = False  # True: 工具返回 clear_chat 时在本地清空对话
+
+    # --- 语音（仅 VoiceAssistantWindow 使用） ---
+    asr_model_id: str = "Qwen/Qwen3-ASR-0.6B"
+    record_sample_rate: int = 16000  # ASR 要求 16kHz
+    tts_engine: str = "qwen"  # "qwen" 或 "kokoro"
+    tts_model_id: str = "Qwen/Qwen3-TTS-12Hz-0.6B-CustomVoice"
+    tts_speaker: str = "Serena"
+    tts_language: str = "Chinese"
+    # https://huggingface.co/hexgrad/Kokoro-82M/blob/main/VOICES.md
+    kokoro_repo_id: str = 'hexgrad/Kokoro-82M-v1.1-zh'
+    kokoro_sample_rate: int = 24000
+    kokoro_voice: str = 'zf_001'  # zf_001 女声, zm_010 男声
+    kokoro_language: str = 'z'  # 'z' 中文
+    voice_streaming: bool = False  # True: LLM 边生成边分句送去 TTS；False: 完整回复生成后再分句
+    tts_max_len: int | None = 100  # TTS 单句最大字符数，超过则继续拆分（None: 整段合成，不分句）
+    voice_prompt_suffix: str = "\n（回复中尽量不要出现特殊符号，用文字表述便于朗读）"
+    tts_cache_dir: str | None = os.path.join(_ROOT, 'tts_cache')  # 常用短句的合成结果缓存（None 表示不缓存）
+    tts_cache_max_bytes: int = 512 * 1024 * 1024
+    trace_file: str = os.path.join(_ROOT, 'traces', 'voice_turns.jsonl')  # 语音对话分阶段延迟追踪
+    trace_ring_size: int = 200  # 内存中保留、可通过 Web 端 /api/traces 查询的最近轮次数
+
+
+class Communicator(QObject):
+    trigger_show = pyqtSignal()
+    append_chat = pyqtSignal(str, str) # 发送者, 内容
+    # 流式回复：开始(发送者) → 增量文本 / 重置 → 结束(最终内容，为空表示放弃)
+    stream_begin = pyqtSignal(str)
+    stream_delta = pyqtSignal(str)
+    stream_reset = pyqtSignal()
+    stream_end = pyqtSignal(str)
+    request_exit = pyqtSignal()
+    voice_status = pyqtSignal(str)  # 语音状态提示
+
+
+class AssistantWindow(QWidget):
+    """键盘对话助手窗口。
+
+    broadcast(sender, content) / broadcast_stream(sender): Web 端的 broadcast_message / broadcast_stream，
+    为 None 时不与 Web 端同步。
+    """
+
+    communicator_class = Communicator
+
+    def __init__(self, config: AssistantConfig, broadcast=None, broadcast_stream=None):
+        super().__init__()
+        self.config = config
+        self._broadcast = broadcast
+        self._broadcast_stream = broadcast_stream
+        self.comm = self.communicator_class()
+        # 桌面端与各 Web 会话共用一个客户端，同时进行的 chat 请求数受限
+        self.client = ConcurrencyLimitedClient(ollama.Client(host=config.ollama_host), config.ollama_max_concurrency)
+        self.model_name = config.model_name
+
+        # --- 对话上下文管理 ---
+        # 会话存储：每轮对话作为一个事务提交，同一会话内的轮次排队执行
+        self.conversations = ConversationStore(
+            lambda: ChatContext(
+                max_tokens=config.context_max_tokens,
+                target_tokens=config.context_target_tokens,
+                tool_output_max_chars=config.tool_output_max_chars,
+                summarizer=make_ollama_summarizer(self.client, config.model_name),
+            ),
+            serialize_turns=config.serialize_turns,
+        )
+        self.conversation = self.conversations.session()
+
+        # --- MCP 配置 ---
+        self.server_params = StdioServerParameters(
+            command="python",
+            args=["local_tools.py"], # 确保路径正确
+        )
+        # 常驻 MCP 会话池：子进程只启动一次，之后的工具调用复用已握手的会话
+        self.mcp_pool = MCPSessionPool(self.server_params, size=config.mcp_pool_size)
+        # 同一轮多个 tool_calls 的并发调度器，并发度与会话数一致
+        self.tool_dispatcher = ToolDispatcher(self.call_mcp_tool, max_parallel=config.mcp_pool_size)
+        # 每轮首次请求前检索相关备忘录片段，作为临时上下文注入（省去 memo_list / memo_read 往返）
+        self.memo_recall = (MemoRecall(self.mcp_pool, top_k=config.memo_recall_top_k,
+                                       min_score=config.memo_recall_min_score)
+                            if config.memo_recall_top_k > 0 else None)
+        # 对话轮次引擎（streaming 请求 → 工具调用 → 最终回复），键盘 / 语音 / Web 共用
+        self.engine = TurnEngine(self.client, config.model_name, self.tool_dispatcher, tools=lambda: self.tools,
+                                 chat_options=config.chat_options, context_provider=self.memo_recall)
+        self.tool_filter = self._apply_clear_chat if config.clear_chat_by_tool else None
+
+        # MCP 工具定义：由 local_tools.py 提供，运行时通过 sync_tools_from_mcp() 动态获取。
+        # 初始留空，若同步失败会回退为最小的 `run_command` 工具。
+        self.tools = []
+
+        # --- UI 初始化 ---
+        self.init_ui()
+
+        # 初始时尝试同步一次工具列表
+        self.sync_tools_from_mcp()
+
+        # --- 信号绑定 ---
+        self.comm.trigger_show.connect(self.show_and_focus)
+        self.comm.append_chat.connect(self.update_chat_display)
+        self.comm.stream_begin.connect(self.chat_view.begin_stream)
+        self.comm.stream_delta.connect(self.chat_view.append_delta)
+        self.comm.stream_reset.connect(self.chat_view.reset_stream)
+        self.comm.stream_end.connect(self.chat_view.end_stream)
+        self.comm.request_exit.connect(self.handle_exit)
+        self.comm.voice_status.connect(lambda msg: self.update_chat_display("System", msg))
+
+    def sync_tools_from_mcp(self):
+        """从 MCP Server 动态获取工具定义，同步给 Ollama（失败时回退为 run_command）"""
+        def fetch():
+            self.tools = fetch_tools(self.mcp_pool)
+
+        threading.Thread(target=fetch, daemon=True).start()
+
+    # --- 核心逻辑：调用 MCP 工具 ---
+    def call_mcp_tool(self, tool_name, arguments):
+        """通过常驻 MCP 会话调用本地工具（线程安全，可在任意线程中调用）"""
+        return self.mcp_pool.call_tool(tool_name, arguments)
+
+    def init_ui(self):
+        self.setWindowTitle("AI Research Assistant (Multi-turn)")
+        self.setFixedSize(500, 600)
+        # 窗口置顶，方便随时唤起
+        self.setWindowFlags(Qt.WindowType.WindowStaysOnTopHint)
+
+        layout = QVBoxLayout()
+
+        # 1. 聊天记录显示区
+        self.display = QTextEdit()
+        self.display.setReadOnly(True)
+        # 增量渲染 + 超出上限淘汰最早的消息
+        self.chat_view = ChatView(
+            self.display,
+            markdown_enabled=lambda: getattr(self, 'md_checkbox', None) is not None and self.md_checkbox.isChecked(),
+            max_messages=self.config.chat_view_max_messages,
+        )
+        layout.addWidget(QLabel("Chat History:"))
+        layout.addWidget(self.display)
+
+        # 2. 输入区
+        self.input_field = QLineEdit()
+        self.input_field.setPlaceholderText("输入消息... (输入'结束对话'清空记录)")
+        self.input_field.returnPressed.connect(self.handle_send)
+
+        # 3. 按钮区
+        btn_layout = QHBoxLayout()
+        self.send_btn = QPushButton("发送")
+        self.send_btn.clicked.connect(self.handle_send)
+        self.clear_btn = QPushButton("结束当前对话")
+        self.clear_btn.clicked.connect(self.reset_chat)
+        self.md_checkbox = QCheckBox("渲染 Markdown")
+        self.md_checkbox.setChecked(True)
+
+        btn_layout.addWidget(self.send_btn)
+        btn_layout.addWidget(self.clear_btn)
+        btn_layout.addWidget(self.md_checkbox)
+
+        layout.addWidget(self.input_field)
+        layout.addLayout(btn_layout)
+
+        self.setLayout(layout)
+
+    # --- 逻辑处理 ---
+    def show_and_focus(self):
+        self.show()
+        self.activateWindow()
+        self.input_field.setFocus()
+
+    def update_chat_display(self, sender, content):
+        # 拦截来自 Web 端的清空信号
+        if sender == "__CLEAR__":
+            self.reset_chat()
+            return
+
+        # 根据复选框决定是否渲染 Markdown；只渲染这一条消息，视图停在底部时自动滚动
+        self.chat_view.append_message(sender, content)
+
+    def reset_chat(self):
+        self.conversation.clear()
+        self.chat_view.clear()
+        self.update_chat_display("System", "对话上下文已清空。")
+
+    def _apply_clear_chat(self, turn, tool_messages):
+        """特殊处理：当工具中有 clear_chat 时，在本地清空对话并向用户展示通知。
+        返回需要写回上下文的工具消息（清空点之前的结果与本轮已有消息随上下文一起丢弃）。"""
+        clear_idx = None
+        for i, m in enumerate(tool_messages):
+            if m['name'] == 'clear_chat':
+                clear_idx = i
+        if clear_idx is None:
+            return tool_messages
+        try:
+            self.reset_chat()
+            turn.discard()
+            self.comm.append_chat.emit("System", "对话已被清空（由工具触发）。")
+        except Exception as e:
+            print(f"[MCP Action] 清空对话失败: {e}")
+        return tool_messages[clear_idx:]
+
+    def handle_send(self):
+        user_text = self.input_field.text().strip()
+        if not user_text:
+            return
+
+        if user_text in ["结束对话", "exit", "clear", "quit"]:
+            self.reset_chat()
+            self.input_field.clear()
+            return
+
+        self.update_chat_display("Me", user_text)
+        self.input_field.clear()
+        self.input_field.setEnabled(False) # 防止重复发送
+
+        # 开启后台线程处理 AI 逻辑
+        threading.Thread(target=self.process_ai_logic, args=(user_text,), daemon=True).start()
+
+    def _web_broadcast(self, sender, content):
+        if self._broadcast is None:
+            return
+        try:
+            self._broadcast(sender, content)
+        except Exception:
+            pass
+
+    def process_ai_logic(self, user_input, from_web=False):
+        web_stream = None
+        desktop_streaming = False
+        try:
+            with self.conversation.turn() as turn:
+                # 加入上下文
+                turn.append({'role': 'user', 'content': user_input})
+
+                # 如果来自 PyQt 端，同步用户消息到 Web
+                if not from_web:
+                    self._web_broadcast("Me", user_input)
+
+                # 回复逐 token 推送到共享对话的 Web 客户端，完成后整体显示到 PyQt
+                if not from_web and self._broadcast_stream is not None:
+                    try:
+                        web_stream = self._broadcast_stream("AI")
+                    except Exception:
+                        pass
+                self.comm.stream_begin.emit("AI")
+                desktop_streaming = True
+
+                def on_delta(delta):
+                    self.comm.stream_delta.emit(delta)
+                    if web_stream is not None:
+                        web_stream.delta(delta)
+
+                def on_reset():
+                    # 工具调用前的输出不计入最终回复
+                    self.comm.stream_reset.emit()
+                    if web_stream is not None:
+                        web_stream.reset()
+
+                # 第一轮请求（含工具调用判断）→ 并发执行工具 → 再次请求获取最终回复
+                content = self.engine.run(turn, on_delta, on_reset, tool_filter=self.tool_filter)
+                self.comm.stream_end.emit(content)
+                desktop_streaming = False
+                # 同步 AI 回复到 Web（写入聊天记录）
+                if web_stream is not None:
+                    web_stream.commit(content)
+
+        except Exception as e:
+            if web_stream is not None:
+                try:
+                    web_stream.abort()
+                except Exception:
+                    pass
+            if desktop_streaming:
+                self.comm.stream_end.emit("")
+            self.comm.append_chat.emit("System Error", str(e))
+        finally:
+            self.input_field.setEnabled(True)
+            self.input_field.setFocus()
+
+    def _post_to_desktop_and_web(self, sender, content):
+        self.comm.append_chat.emit(sender, content)
+        self._web_broadcast(sender, content)
+
+    def handle_exit(self):
+        print("助手正在退出...")
+        self.tool_dispatcher.shutdown()
+        self.mcp_pool.close()
+        QApplication.quit()
+
+    def register_hotkeys(self) -> list[str]:
+        """注册 Ctrl+Alt+Q / Ctrl+Alt+E 之外的快捷键，返回启动提示中的说明"""
+        return []
+
+    def run_hotkey_listener(self):
+        keyboard.add_hotkey('ctrl+alt+q', lambda: self.comm.trigger_show.emit())
+        keyboard.add_hotkey('ctrl+alt+e', lambda: self.comm.request_exit.emit())
+        hints = ["Ctrl+Alt+Q 唤起", "Ctrl+Alt+E 退出"] + self.register_hotkeys()
+        print(f"助手已启动 ({', '.join(hints)})")
+
+
+class VoiceAssistantWindow(AssistantWindow):
+    """键盘对话 + 按住 Ctrl+Alt+A 的语音对话"""
+
+    def __init__(self, config: AssistantConfig, broadcast=None, broadcast_stream=None):
+        super().__init__(config, broadcast, broadcast_stream)
+
+        # --- 语音录制状态 ---
+        self._recording = False
+        self._recorded_frames = []
+
+        # --- ASR / TTS 模型（延迟加载） ---
+        self.asr_model = None
+        self.tts_cache = (TTSCache(config.tts_cache_dir, max_bytes=config.tts_cache_max_bytes)
+                          if config.tts_cache_dir else None)
+        self.tts = None  # TTS 合成器（启用缓存时带缓存），模型加载完成后创建
+        # 每轮语音对话的分阶段耗时：写入 JSONL，并保留最近若干轮供 Web 端查询
+        self.tracer = Tracer(config.trace_file, capacity=config.trace_ring_size)
+        self._models_loaded = False
+        self._models_loading = False
+
+        # --- 初始化 ASR 和 TTS 模型 ---
+        print("正在后台加载 ASR 和 TTS 模型...")
+        self._load_voice_models()
+
+        print("AI Assistant 初始化完成。")
+
+    # ==================== 模型加载 ====================
+
+    def _load_asr(self):
+        import torch
+        from qwen_asr import Qwen3ASRModel
+
+        return Qwen3ASRModel.from_pretrained(
+            self.config.asr_model_id,
+            dtype=torch.bfloat16,
+            device_map="cuda:0",
+            max_inference_batch_size=32,
+            max_new_tokens=256,
+        )
+
+    def _load_tts(self):
+        """按 config.tts_engine 加载 TTS 模型，返回合成器（缓存由调用方包装）"""
+        import torch
+
+        cfg = self.config
+        if cfg.tts_engine == "kokoro":
+            from kokoro import KModel, KPipeline
+
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            model = KModel(repo_id=cfg.kokoro_repo_id).to(device).eval()
+            en_pipeline = KPipeline(lang_code='a', repo_id=cfg.kokoro_repo_id, model=False)
+            def en_callable(text):
+                return next(en_pipeline(text)).phonemes
+            pipeline = KPipeline(
+                lang_code=cfg.kokoro_language, repo_id=cfg.kokoro_repo_id,
+                model=model, en_callable=en_callable,
+            )
+            return KokoroSynthesizer(pipeline, cfg.kokoro_repo_id, cfg.kokoro_voice,
+                                     cfg.kokoro_language, cfg.kokoro_sample_rate)
+
+        from qwen_tts import Qwen3TTSModel
+
+        model = Qwen3TTSModel.from_pretrained(
+            cfg.tts_model_id,
+            device_map="cuda:0",
+            dtype=torch.bfloat16,
+        )
+        return QwenSynthesizer(model, cfg.tts_model_id, cfg.tts_speaker, cfg.tts_language)
+
+    def _load_voice_models(self):
+        """后台加载 ASR 和 TTS 模型（首次使用时触发）"""
+        if self._models_loaded or self._models_loading:
+            return
+        self._models_loading = True
+        self.comm.voice_status.emit("正在加载 ASR 和 TTS 模型，请稍候...")
+
+        def _load():
+            try:
+                print("[Voice] 开始加载 ASR 模型...")
+                self.asr_model = self._load_asr()
+                print("[Voice] ASR 模型加载完成")
+
+                print(f"[Voice] 开始加载 {self.config.tts_engine} TTS 模型...")
+                synthesizer = self._load_tts()
+                self.tts = (CachedSynthesizer(synthesizer, self.tts_cache)
+                            if self.tts_cache is not None else synthesizer)
+                print(f"[Voice] {self.config.tts_engine} TTS 模型加载完成")
+
+                self._models_loaded = True
+                self.comm.voice_status.emit("ASR / TTS 模型加载完毕，可以使用语音对话了。")
+            except Exception as e:
+                self.comm.voice_status.emit(f"模型加载失败: {e}")
+                print(f"[Voice] 模型加载异常: {e}")
+                import traceback
+                traceback.print_exc()
+            finally:
+                self._models_loading = False
+
+        threading.Thread(target=_load, daemon=True).start()
+
+    # ==================== 语音交互功能 ====================
+
+    def _asr_transcribe(self, wav: np.ndarray, sample_rate: int | None = None):
+        """识别一段 PCM，返回 (text, language)"""
+        return transcribe(self.asr_model, wav, sample_rate or self.config.record_sample_rate)
+
+    def _on_voice_key_press(self):
+        """Ctrl+Alt+A 按下 → 开始录音"""
+        import sounddevice as sd
+
+        if self._recording:
+            return
+        self._recording = True
+        self._recorded_frames = []
+        self.comm.voice_status.emit("🎙️ 正在录音... 松开 Ctrl+Alt+A 停止")
+        print("[Voice] 开始录音")
+
+        def _record_callback(indata, frames, time_info, status):
+            if self._recording:
+                self._recorded_frames.append(indata.copy())
+
+        self._audio_stream = sd.InputStream(
+            samplerate=self.config.record_sample_rate,
+            channels=1,
+            dtype='float32',
+            callback=_record_callback,
+        )
+        self._audio_stream.start()
+
+    def _on_voice_key_release(self):
+        """Ctrl+Alt+A 松开 → 停止录音，启动 ASR→LLM→TTS 流水线"""
+        if not self._recording:
+            return
+        self._recording = False
+        print("[Voice] 停止录音")
+
+        try:
+            self._audio_stream.stop()
+            self._audio_stream.close()
+        except Exception:
+            pass
+
+        if not self._recorded_frames:
+            self.comm.voice_status.emit("未检测到音频输入。")
+            return
+
+        audio_data = np.concatenate(self._recorded_frames, axis=0).flatten()
+        self._recorded_frames = []
+
+        # 后台执行 ASR → LLM → TTS
+        threading.Thread(target=self._voice_pipeline, args=(audio_data,), daemon=True).start()
+
+    def _voice_pipeline(self, audio_data: np.ndarray):
+        """语音对话全流程: ASR → LLM → TTS → 播放"""
+        trace = self.tracer.begin("voice", audio_s=round(len(audio_data) / self.config.record_sample_rate, 3))
+        trace.mark("record_end")
+        try:
+            # --- 1) ASR: 语音转文字 ---
+            self.comm.voice_status.emit("正在识别语音...")
+            with trace.span("asr"):
+                user_text, detected_lang = self._asr_transcribe(audio_data)
+            print(f"[Voice ASR] 语言={detected_lang}, 文字={user_text}")
+            self._voice_reply(user_text, trace)
+        except Exception as e:
+            self.comm.voice_status.emit(f"语音处理异常: {e}")
+            print(f"[Voice] 异常: {e}")
+        finally:
+            trace.finish()
+
+    def _voice_reply(self, user_text: str, trace) -> None:
+        """识别结果 → LLM → TTS → 播放，阻塞直到播放结束。
+
+        config.voice_streaming 为 True 时三级流水线并行：LLM streaming 遇到标点就拆句推入队列，
+        TTS 线程合成后写入环形缓冲区，OutputStream 回调实时播放；否则完整回复生成后再分句，
+        首句单独合成、其余批量合成（tts_max_len 为 None 时整段合成）。
+        """
+        if not user_text:
+            self.comm.voice_status.emit("未识别到有效语音。")
+            return
+
+        # 显示识别结果
+        self.comm.append_chat.emit("Me 🎤", user_text)
+
+        llm_input = user_text + self.config.voice_prompt_suffix
+        # 本轮对话事务：由 reply_and_speak 提交（出错则丢弃）；with 保证交给它之前出错也会释放排队
+        with self.conversation.turn() as turn:
+            turn.append({'role': 'user', 'content': llm_input})
+            self._web_broadcast("Me 🎤", user_text)
+
+            reply_and_speak(
+                self.engine, turn,
+                lambda batches, total=None: speak(batches, self.tts, self.comm.voice_status.emit,
+                                                  total=total, trace=trace),
+                streaming=self.config.voice_streaming,
+                max_len=self.config.tts_max_len,
+                on_reply=lambda content: self._post_to_desktop_and_web("AI", content),
+                tool_filter=self.tool_filter,
+                trace=trace,
+            )
+        if self.tts_cache is not None and self.tts is not None:
+            print(f"[TTS Cache] {self.tts.stats()}")
+        self.comm.voice_status.emit("语音播放完毕。")
+
+    def register_hotkeys(self) -> list[str]:
+        # 语音快捷键：按下开始录音，松开停止
+        keyboard.on_press_key('a', lambda e: self._on_voice_key_press() if keyboard.is_pressed('ctrl') and keyboard.is_pressed('alt') else None)
+        keyboard.on_release_key('a', lambda e: self._on_voice_key_release() if not keyboard.is_pressed('a') else None)
+        return ["Ctrl+Alt+A 语音对话"]
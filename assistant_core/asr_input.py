@@ -0,0 +1,26 @@
+"""ASR 输入适配：直接把内存中的 PCM 交给 `Qwen3ASRModel.transcribe`。
+
+transcribe 的 audio 参数除了文件路径 / URL 之外也接受 `(np.ndarray, sample_rate)`，
+因此录音缓冲区和 Web 端上传的原始字节无需再写入临时 WAV 文件再读回，
+也不会出现桌面端和 Web 端同时写同一个临时文件的竞争。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def pcm_input(audio, sample_rate: int) -> tuple[np.ndarray, int]:
+    """将 float32 PCM（ndarray 或原始字节）包装为 transcribe 可直接接受的 (wav, sr)"""
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        audio = np.frombuffer(audio, dtype=np.float32)
+    wav = np.asarray(audio, dtype=np.float32).reshape(-1)
+    return wav, sample_rate
+
+
+def transcribe(asr_model, audio, sample_rate: int) -> tuple[str, str | None]:
+    """ASR 阶段：识别一段 PCM，返回 (text, language)；没有结果时返回 ("", None)"""
+    results = asr_model.transcribe(audio=pcm_input(audio, sample_rate), language=None)
+    if not results:
+        return "", None
+    return results[0].text.strip(), results[0].language
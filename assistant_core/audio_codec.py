@@ -0,0 +1,84 @@
+"""Web 端音频帧编解码：浏览器 ↔ 服务器之间的 PCM 传输格式协商。
+
+原先上传和下发都是 float32 原始字节（每个采样 4 字节），24 kHz 的 TTS 音频约 96 KB/s，
+手机经 Tailscale 访问时很容易成为瓶颈。这里提供几种只依赖 NumPy 的格式：
+
+  - ``pcm_s16``：16 位整型 PCM，体积减半，对 ASR / 播放没有可感知的损失（默认）；
+  - ``mulaw8``：μ-law（μ=255）压扩的 8 位有符号码，体积为 float32 的 1/4，
+    适合带宽很紧的场合（有轻微底噪）；
+  - ``pcm_f32``：旧格式，兼容未升级的客户端。
+
+帧本身不带状态，每个 Socket.IO 二进制消息可独立解码；字节序统一为小端。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+PCM_F32 = "pcm_f32"
+PCM_S16 = "pcm_s16"
+MULAW8 = "mulaw8"
+
+# 服务端支持的格式，按优先级排列
+CODECS = (PCM_S16, MULAW8, PCM_F32)
+LEGACY_CODEC = PCM_F32
+
+_MU = 255.0
+_LOG1P_MU = np.log1p(_MU)
+
+
+def negotiate(accepted, preferred=CODECS) -> str:
+    """在客户端声明可接受的格式中，按服务端优先级选出一个；都不支持时退回旧格式"""
+    accepted = set(accepted or ())
+    for codec in preferred:
+        if codec in accepted and codec in CODECS:
+            return codec
+    return LEGACY_CODEC
+
+
+def encode(wav, codec: str) -> bytes:
+    """float PCM（-1~1）→ 指定格式的字节"""
+    x = np.asarray(wav, dtype=np.float32).reshape(-1)
+    if codec == PCM_F32:
+        return x.astype("<f4", copy=False).tobytes()
+    x = np.clip(x, -1.0, 1.0)
+    if codec == PCM_S16:
+        return np.round(x * 32767.0).astype("<i2").tobytes()
+    if codec == MULAW8:
+        y = np.sign(x) * np.log1p(_MU * np.abs(x)) / _LOG1P_MU
+        return np.round(y * 127.0).astype(np.int8).tobytes()
+    raise ValueError(f"Unsupported audio codec: {codec}")
+
+
+def decode(payload, codec: str) -> np.ndarray:
+    """指定格式的字节 → float32 PCM；末尾不完整的采样会被丢弃"""
+    buf = memoryview(payload).cast("B")
+    if codec == PCM_F32:
+        return np.frombuffer(buf[: len(buf) - len(buf) % 4], dtype="<f4").astype(np.float32)
+    if codec == PCM_S16:
+        pcm = np.frombuffer(buf[: len(buf) - len(buf) % 2], dtype="<i2")
+        return pcm.astype(np.float32) / 32768.0
+    if codec == MULAW8:
+        y = np.frombuffer(buf, dtype=np.int8).astype(np.float32) / 127.0
+        return (np.sign(y) * np.expm1(np.abs(y) * _LOG1P_MU) / _MU).astype(np.float32)
+    raise ValueError(f"Unsupported audio codec: {codec}")
+
+
+def parse_upload(data, default_rate: int) -> tuple[np.ndarray, int, list]:
+    """解析 Web 端上传的语音。
+
+    新客户端发送 ``{"codec", "sampleRate", "data", "accept"}``；旧客户端直接发送
+    float32 原始字节。返回 (float32 PCM, 采样率, 客户端可接受的下发格式列表)。
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return decode(data, LEGACY_CODEC), default_rate, [LEGACY_CODEC]
+    if not isinstance(data, dict) or not isinstance(data.get("data"), (bytes, bytearray, memoryview)):
+        raise ValueError("Invalid voice payload.")
+    codec = data.get("codec") or LEGACY_CODEC
+    rate = int(data.get("sampleRate") or default_rate)
+    if rate <= 0:
+        raise ValueError(f"Invalid sample rate: {rate}")
+    accept = data.get("accept")
+    if not isinstance(accept, list):
+        accept = [LEGACY_CODEC]
+    return decode(data["data"], codec), rate, accept
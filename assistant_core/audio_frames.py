@@ -0,0 +1,41 @@
+"""把 TTS 产出的任意长度音频切成固定时长的帧，附带递增序号，供 Web 端流式推送。
+
+TTS 引擎每次产出的片段长短不一（Kokoro 按内部分段，Qwen TTS 整句），
+按帧发送后浏览器收到第一帧即可开始播放，客户端再按序号在抖动缓冲区中重排。
+跨片段的不足一帧的尾部会留到下一次 push，句子之间不会插入多余的静音。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+class PcmFramer:
+    def __init__(self, sample_rate: int, frame_ms: int = 100):
+        if sample_rate <= 0 or frame_ms <= 0:
+            raise ValueError("sample_rate and frame_ms must be greater than 0.")
+        self.sample_rate = sample_rate
+        self.frame_samples = max(1, sample_rate * frame_ms // 1000)
+        self.seq = 0  # 下一帧的序号
+        self._tail = np.zeros(0, dtype=np.float32)
+
+    def push(self, wav) -> list[tuple[int, np.ndarray]]:
+        """追加一段音频，返回已凑满的 [(seq, frame), ...]"""
+        wav = np.asarray(wav, dtype=np.float32).reshape(-1)
+        if len(self._tail):
+            wav = np.concatenate([self._tail, wav])
+        n_full = len(wav) // self.frame_samples
+        frames = []
+        for k in range(n_full):
+            frames.append((self.seq, wav[k * self.frame_samples:(k + 1) * self.frame_samples]))
+            self.seq += 1
+        self._tail = wav[n_full * self.frame_samples:].copy()
+        return frames
+
+    def flush(self) -> list[tuple[int, np.ndarray]]:
+        """输出剩余不足一帧的尾部（流结束时调用）"""
+        if not len(self._tail):
+            return []
+        frame, self._tail = self._tail, np.zeros(0, dtype=np.float32)
+        self.seq += 1
+        return [(self.seq - 1, frame)]
@@ -0,0 +1,126 @@
+"""播放用的单生产者 / 单消费者 float32 环形缓冲区。
+
+TTS 线程直接把合成结果写入预分配的环形数组，`sd.OutputStream` 的实时回调
+从中读取到 outdata，回调内不做 `np.concatenate` 之类的内存分配，也不加锁：
+读写位置各自只由一个线程修改（CPython 下 int 赋值是原子的）。
+"""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+DEFAULT_CAPACITY = 24000 * 30  # 约 30 秒 @24kHz
+
+
+class AudioRingBuffer:
+    """SPSC 环形缓冲区。
+
+    write() 只能由生产者线程调用，缓冲区满时轮询等待；
+    read_into() 只能由消费者（音频回调）调用，永不阻塞。
+    消费者不再读取（例如播放设备出错）时调用 abort()，等待中的 write() 随即返回。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("Capacity must be greater than 0.")
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=np.float32)
+        # 单调递增的累计读写样本数，下标为 pos % capacity
+        self._write_pos = 0
+        self._read_pos = 0
+        self._closed = False
+        self._aborted = False
+        self._started = False
+        self.first_read_at = None  # 首次读出数据的 time.monotonic()（用于延迟追踪）
+        # 统计
+        self.underruns = 0
+        self.high_water = 0
+
+    # ---------- 状态 ----------
+    @property
+    def available(self) -> int:
+        """可读样本数"""
+        return self._write_pos - self._read_pos
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.available
+
+    @property
+    def drained(self) -> bool:
+        """生产者已结束且数据已全部读出"""
+        return self._closed and self.available == 0
+
+    def close(self) -> None:
+        """生产者调用：不再写入新数据"""
+        self._closed = True
+
+    @property
+    def aborted(self) -> bool:
+        return self._aborted
+
+    def abort(self) -> None:
+        """消费者已退出：之后的 write() 不再等待空间，直接返回"""
+        self._aborted = True
+        self._closed = True
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "written": self._write_pos,
+            "played": self._read_pos,
+            "underruns": self.underruns,
+            "high_water": self.high_water,
+        }
+
+    # ---------- 生产者 ----------
+    def write(self, samples, poll_interval: float = 0.005) -> int:
+        """写入一段音频；空间不足时分段写入并等待消费者读出。返回写入的样本数（abort 后可能少于输入）"""
+        data = np.asarray(samples, dtype=np.float32).reshape(-1)
+        total = len(data)
+        offset = 0
+        while offset < total:
+            if self._aborted:
+                return offset
+            space = self.free
+            if space == 0:
+                time.sleep(poll_interval)
+                continue
+            n = min(space, total - offset)
+            start = self._write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self._buf[start:start + first] = data[offset:offset + first]
+            if n > first:
+                self._buf[:n - first] = data[offset + first:offset + n]
+            offset += n
+            # 数据拷贝完成后再发布写位置
+            self._write_pos += n
+            fill = self.available
+            if fill > self.high_water:
+                self.high_water = fill
+        return total
+
+    # ---------- 消费者 ----------
+    def read_into(self, out: np.ndarray) -> int:
+        """将最多 len(out) 个样本拷贝到 out（可以是 outdata[:, 0] 这样的视图），返回拷贝数。
+
+        不足部分不做处理，由调用方补零；生产者未结束时数据不足记为一次 underrun。
+        """
+        frames = len(out)
+        avail = self.available
+        n = min(frames, avail)
+        if n:
+            start = self._read_pos % self.capacity
+            first = min(n, self.capacity - start)
+            np.copyto(out[:first], self._buf[start:start + first])
+            if n > first:
+                np.copyto(out[first:n], self._buf[:n - first])
+            self._read_pos += n
+            if not self._started:
+                self.first_read_at = time.monotonic()
+                self._started = True
+        if n < frames and not self._closed and self._started:
+            self.underruns += 1
+        return n
@@ -0,0 +1,202 @@
+"""带 token 预算的对话上下文。
+
+`ChatContext` 是 list 的子类，作为会话的历史容器（见 conversation.py），
+也可以直接当普通 list 使用：
+
+  - 工具输出（run_command 的 stdout、SwitchBot 原始 JSON 等）在写入时按字符上限截断，
+    保留头尾，写入后不再改变；
+  - 总 token 数超过 max_tokens 时一次性把最早的若干轮压缩到 target_tokens 以下：
+    被移出的轮次交给 summarizer 概括成一条摘要消息放在最前面，summarizer 不可用时直接丢弃；
+  - append 本身不压缩。summarizer 是一次远程调用，压缩分为三步：plan_compaction（只读，
+    选出区间）→ summarize（耗时，调用方不应持有锁）→ apply_compaction（替换，期间若历史
+    已被清空或改写则放弃）。Conversation 在提交一轮后于后台线程中执行这三步，
+    单独使用时可调用 maybe_compact()；
+  - 两次压缩之间上下文只追加不修改，消息前缀保持稳定，Ollama 可以复用 KV cache。
+    压缩只发生在轮次边界（user 消息处），不会拆开 tool_call 与其结果。
+"""
+
+from __future__ import annotations
+
+from typing import Callable
+
+DEFAULT_MAX_TOKENS = 12000  # 超过该值触发压缩
+DEFAULT_TARGET_TOKENS = 6000  # 压缩后的目标大小（高低水位之间留出余量，减少压缩次数）
+DEFAULT_TOOL_OUTPUT_MAX_CHARS = 4000  # 单条工具输出保留的最大字符数
+DEFAULT_KEEP_TURNS = 2  # 至少保留最近的轮数
+
+SUMMARY_PREFIX = "以下是此前对话的摘要，供参考：\n"
+SUMMARY_PROMPT = (
+    "请把下面这段助手与用户的对话概括为简洁的中文摘要，"
+    "保留用户的偏好、已确认的事实、设备状态和未完成的事项，省略寒暄和工具输出的细节。"
+    "只输出摘要本身。\n\n"
+)
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：CJK 字符约 1 token/字，其余约 4 字符/token"""
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def message_tokens(message) -> int:
+    content = message.get('content') or ''
+    tokens = estimate_tokens(content) + _MESSAGE_OVERHEAD_TOKENS
+    tool_calls = message.get('tool_calls')
+    if tool_calls:
+        tokens += estimate_tokens(str(tool_calls))
+    return tokens
+
+
+def truncate_middle(text: str, max_chars: int) -> str:
+    """保留头部约 2/3、尾部约 1/3，中间替换为截断说明"""
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    omitted = len(text) - head - tail
+    return f"{text[:head]}\n...[已截断 {omitted} 字符]...\n{text[-tail:] if tail else ''}"
+
+
+def format_transcript(messages, max_chars: int = 16000) -> str:
+    """把待压缩的消息整理为纯文本对话记录，供摘要模型阅读"""
+    lines = []
+    for m in messages:
+        role = m.get('role', '')
+        content = (m.get('content') or '').strip()
+        if role == 'tool':
+            content = truncate_middle(content, 300)
+            role = f"tool:{m.get('name', '')}"
+        if content:
+            lines.append(f"{role}: {content}")
+    return truncate_middle("\n".join(lines), max_chars)
+
+
+def make_ollama_summarizer(client, model: str) -> Callable[[list], str]:
+    """使用同一个 Ollama 模型生成摘要"""
+    def summarize(messages: list) -> str:
+        response = client.chat(
+            model=model,
+            messages=[{'role': 'user', 'content': SUMMARY_PROMPT + format_transcript(messages)}],
+            think=False,
+        )
+        return (response['message']['content'] or '').strip()
+    return summarize
+
+
+class ChatContext(list):
+    """按 token 预算自动压缩的对话历史（list 子类）"""
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        target_tokens: int = DEFAULT_TARGET_TOKENS,
+        tool_output_max_chars: int = DEFAULT_TOOL_OUTPUT_MAX_CHARS,
+        keep_turns: int = DEFAULT_KEEP_TURNS,
+        summarizer: Callable[[list], str] | None = None,
+    ):
+        super().__init__()
+        if target_tokens > max_tokens:
+            raise ValueError("target_tokens must not exceed max_tokens.")
+        self.max_tokens = max_tokens
+        self.target_tokens = target_tokens
+        self.tool_output_max_chars = tool_output_max_chars
+        self.keep_turns = max(1, keep_turns)
+        self.summarizer = summarizer
+        self._summary = None  # 当前摘要消息（按对象身份识别）
+        self.compactions = 0
+
+    # ---------- 写入 ----------
+    def _prepare(self, message):
+        if message.get('role') == 'tool':
+            content = str(message.get('content') or '')
+            if len(content) > self.tool_output_max_chars:
+                message = dict(message)
+                message['content'] = truncate_middle(content, self.tool_output_max_chars)
+        return message
+
+    def append(self, message) -> None:
+        super().append(self._prepare(message))
+
+    def extend(self, messages) -> None:
+        for m in messages:
+            self.append(m)
+
+    def clear(self) -> None:
+        super().clear()
+        self._summary = None
+
+    # ---------- 压缩 ----------
+    def total_tokens(self) -> int:
+        return sum(message_tokens(m) for m in self)
+
+    def needs_compaction(self) -> bool:
+        return self.total_tokens() > self.max_tokens
+
+    def maybe_compact(self) -> bool:
+        """总量超过 max_tokens 时压缩，返回是否发生了压缩"""
+        if not self.needs_compaction():
+            return False
+        return self.compact()
+
+    def compact(self) -> bool:
+        plan = self.plan_compaction()
+        if plan is None:
+            return False
+        return self.apply_compaction(plan, self.summarize(plan[2]))
+
+    def plan_compaction(self) -> tuple[int, int, list] | None:
+        """选出要移出的区间，返回 (start, cut, dropped)；没有可压缩的轮次时返回 None。不修改历史"""
+        # 开头的 system 提示词（摘要除外）固定保留
+        start = 0
+        while start < len(self) and self[start].get('role') == 'system' and self[start] is not self._summary:
+            start += 1
+        pinned_tokens = sum(message_tokens(m) for m in self[:start])
+
+        turn_starts = [i for i in range(start, len(self)) if self[i].get('role') == 'user']
+        candidates = turn_starts[1:len(turn_starts) - self.keep_turns + 1] if len(turn_starts) > self.keep_turns else []
+        if not candidates:
+            return None
+
+        # 摘要本身也占预算，按 target 的 1/8 预留
+        summary_budget = self.target_tokens // 8 if self.summarizer else 0
+        suffix_tokens = [0] * (len(self) + 1)
+        for i in range(len(self) - 1, start - 1, -1):
+            suffix_tokens[i] = suffix_tokens[i + 1] + message_tokens(self[i])
+        cut = candidates[-1]
+        for idx in candidates:
+            if pinned_tokens + summary_budget + suffix_tokens[idx] <= self.target_tokens:
+                cut = idx
+                break
+        return start, cut, list(self[start:cut])
+
+    def summarize(self, dropped: list) -> dict | None:
+        """把移出的消息概括为一条摘要消息；summarizer 不可用或失败时返回 None"""
+        if self.summarizer is None:
+            return None
+        try:
+            text = self.summarizer(dropped)
+            if text:
+                return {'role': 'system', 'content': SUMMARY_PREFIX + text}
+        except Exception as e:
+            print(f"[Context] 生成摘要失败，直接丢弃旧对话: {e}")
+        return None
+
+    def apply_compaction(self, plan: tuple[int, int, list], summary_msg: dict | None) -> bool:
+        """用摘要替换 plan 选出的区间。plan 之后只允许在末尾追加，区间内的消息已变化时放弃并返回 False"""
+        start, cut, dropped = plan
+        if len(self) < cut or any(a is not b for a, b in zip(self[start:cut], dropped)):
+            return False
+
+        before = self.total_tokens()
+        kept = list(self[cut:])
+        del self[start:]
+        if summary_msg is not None:
+            super().append(summary_msg)
+        super().extend(kept)
+        self._summary = summary_msg
+        self.compactions += 1
+        print(f"[Context] 压缩 {len(dropped)} 条旧消息: ~{before} → ~{self.total_tokens()} tokens")
+        return True
@@ -0,0 +1,220 @@
+"""PyQt 聊天显示区的增量视图。
+
+原先每条消息都新建 QTextDocument 做 setMarkdown → toHtml，再整段 append 到 QTextEdit，
+文档无限增长；流式回复如果也这样做，每个 delta 都要重新渲染。这里：
+
+  - 完整消息只渲染一次，用 QTextCursor 追加到文档末尾；
+  - 流式消息的 delta 以纯文本直接插入（几乎没有开销），Markdown 只针对这一条消息、
+    按 render_interval_ms 节流重新渲染，结束时再渲染一次最终内容；
+  - 超过 max_messages 条时从文档开头删除最早的消息，并关闭撤销栈，内存不随会话增长；
+  - 流式进行中仍可追加其他消息（例如 System 状态）：每条消息用一个 QTextCursor 记住起点，
+    文档其他位置的增删会自动调整它，流式消息的范围是 [自身起点, 下一条消息起点 - 1)，
+    delta、重新渲染和移除都只作用于这个范围；
+  - 只有在视图本来就停在底部时才自动滚动，用户向上翻看记录时不会被拉回。
+
+所有方法都应在 GUI 线程中调用（通过 pyqtSignal 转发）。
+"""
+
+from __future__ import annotations
+
+import html
+import time
+from collections import deque
+from typing import Callable
+
+from PyQt6.QtGui import QTextCursor, QTextDocument
+from PyQt6.QtWidgets import QTextEdit
+
+DEFAULT_MAX_MESSAGES = 200
+DEFAULT_RENDER_INTERVAL_MS = 150
+
+
+class ChatView:
+    def __init__(
+        self,
+        display: QTextEdit,
+        markdown_enabled: Callable[[], bool] = lambda: True,
+        max_messages: int = DEFAULT_MAX_MESSAGES,
+        render_interval_ms: int = DEFAULT_RENDER_INTERVAL_MS,
+    ):
+        if max_messages <= 0:
+            raise ValueError("max_messages must be greater than 0.")
+        self.display = display
+        self.display.setUndoRedoEnabled(False)
+        self.markdown_enabled = markdown_enabled
+        self.max_messages = max_messages
+        self.render_interval = render_interval_ms / 1000.0
+        self._md_doc = QTextDocument()  # 复用的 Markdown → HTML 转换文档
+        # 每条消息起点处的 QTextCursor（文档在其之前增删时由 Qt 自动调整位置）
+        self._starts: deque[QTextCursor] = deque()
+        self._active: dict | None = None  # 正在流式显示的消息
+
+    # ---------- 渲染 ----------
+    @staticmethod
+    def _header_html(sender: str) -> str:
+        color = "#2c3e50" if sender == "AI" else "#2980b9"
+        return f"<b style='color:{color}'>{html.escape(sender)}:</b> "
+
+    def _body_html(self, content: str) -> str:
+        if self.markdown_enabled():
+            self._md_doc.setMarkdown(content)
+            return self._md_doc.toHtml()
+        return html.escape(content).replace('\n', '<br>')
+
+    # ---------- 完整消息 ----------
+    def append_message(self, sender: str, content: str) -> None:
+        with self._keep_scroll():
+            self._append(self._header_html(sender) + self._body_html(content))
+            self._evict()
+
+    # ---------- 流式消息 ----------
+    def begin_stream(self, sender: str) -> None:
+        if self._active is not None:
+            self.end_stream()
+        with self._keep_scroll():
+            start = self._append(self._header_html(sender))
+            self._active = {
+                "sender": sender,
+                "start": start,
+                # 标题不再改变，正文起点 = 消息起点 + 标题长度
+                "body_offset": self._message_end(start) - start.position(),
+                "parts": [],
+                "rendered_at": 0.0,
+            }
+            self._evict()
+
+    def append_delta(self, text: str) -> None:
+        if self._active is None or not text:
+            return
+        self._active["parts"].append(text)
+        with self._keep_scroll():
+            now = time.monotonic()
+            if self.markdown_enabled() and now - self._active["rendered_at"] >= self.render_interval:
+                self._render_active()
+            else:
+                cursor = QTextCursor(self.display.document())
+                cursor.setPosition(self._message_end(self._active["start"]))
+                cursor.insertText(text)
+
+    def reset_stream(self) -> None:
+        """清空当前流式消息已显示的内容（例如工具调用前的输出）"""
+        if self._active is None:
+            return
+        self._active["parts"] = []
+        with self._keep_scroll():
+            self._replace_active_body("")
+
+    def end_stream(self, content: str | None = None) -> None:
+        """结束流式消息并按最终内容渲染；content 为空字符串且没有任何输出时移除该消息"""
+        active = self._active
+        if active is None:
+            return
+        if content is None:
+            content = "".join(active["parts"])
+        active["parts"] = [content]
+        with self._keep_scroll():
+            if content:
+                self._render_active()
+            else:
+                self._remove_message(active["start"])
+        self._active = None
+        self._evict()
+
+    # ---------- 清空 ----------
+    def clear(self) -> None:
+        active = self._active
+        self.display.clear()
+        self._starts.clear()
+        self._active = None
+        if active is not None:
+            # 流式回复进行中被清空（例如工具触发清空）：保留这条回复的显示位置
+            self.begin_stream(active["sender"])
+
+    # ---------- 内部 ----------
+    def _append(self, html_text: str) -> QTextCursor:
+        """在文档末尾追加一条消息，返回记录其起点的 QTextCursor"""
+        doc = self.display.document()
+        cursor = QTextCursor(doc)
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.beginEditBlock()
+        if self._starts:
+            cursor.insertBlock()
+        position = cursor.position()
+        cursor.insertHtml(html_text)
+        cursor.endEditBlock()
+        # 内容插入后再创建起点游标：插入发生在游标位置时 Qt 会把游标推到插入内容之后
+        start = QTextCursor(doc)
+        start.setPosition(position)
+        self._starts.append(start)
+        return start
+
+    def _index(self, start: QTextCursor) -> int:
+        for i, s in enumerate(self._starts):
+            if s is start:
+                return i
+        raise ValueError("Message is not in the view.")
+
+    def _message_end(self, start: QTextCursor) -> int:
+        """消息的结束位置（不含与下一条消息之间的段落分隔）"""
+        i = self._index(start)
+        if i + 1 < len(self._starts):
+            return self._starts[i + 1].position() - 1
+        return self.display.document().characterCount() - 1
+
+    def _render_active(self) -> None:
+        active = self._active
+        active["rendered_at"] = time.monotonic()
+        self._replace_active_body(self._body_html("".join(active["parts"])))
+
+    def _replace_active_body(self, body_html: str) -> None:
+        start = self._active["start"]
+        cursor = QTextCursor(self.display.document())
+        cursor.beginEditBlock()
+        cursor.setPosition(start.position() + self._active["body_offset"])
+        cursor.setPosition(self._message_end(start), QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        if body_html:
+            cursor.insertHtml(body_html)
+        cursor.endEditBlock()
+
+    def _remove_message(self, start: QTextCursor) -> None:
+        """删除一条消息：连同它前面的段落分隔（第一条消息则连同后面的分隔）"""
+        i = self._index(start)
+        end = self._message_end(start)
+        cursor = QTextCursor(self.display.document())
+        if i > 0:
+            cursor.setPosition(start.position() - 1)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        elif len(self._starts) > 1:
+            cursor.setPosition(0)
+            cursor.setPosition(self._starts[1].position(), QTextCursor.MoveMode.KeepAnchor)
+        else:
+            cursor.select(QTextCursor.SelectionType.Document)
+        cursor.removeSelectedText()
+        del self._starts[i]
+
+    def _evict(self) -> None:
+        """超出 max_messages 时删除最早的消息；正在流式显示的消息留到结束后再删"""
+        while len(self._starts) > self.max_messages:
+            if self._active is not None and self._starts[0] is self._active["start"]:
+                break
+            self._remove_message(self._starts[0])
+
+    def _keep_scroll(self):
+        return _ScrollKeeper(self.display)
+
+
+class _ScrollKeeper:
+    """修改前在底部 → 修改后滚动到底部；否则保持用户当前的阅读位置"""
+
+    def __init__(self, display: QTextEdit):
+        self._bar = display.verticalScrollBar()
+
+    def __enter__(self):
+        self._at_bottom = self._bar.value() >= self._bar.maximum() - 4
+        return self
+
+    def __exit__(self, *exc):
+        if self._at_bottom:
+            self._bar.setValue(self._bar.maximum())
+        return False
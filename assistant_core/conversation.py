@@ -0,0 +1,211 @@
+"""线程安全的对话存储：按轮次事务写入、按会话排队、快照读取。
+
+桌面端输入、语音流水线和 Web 端请求分别运行在不同线程中。直接共享一个 list
+时，交错执行的请求会把 user / tool / assistant 消息插到彼此中间，破坏 tool_call
+与结果的对应关系。这里每一轮对话都是一个 `Turn`：
+
+  - 开始时获取会话的历史快照，本轮产生的消息先写入 turn 自己的缓冲区；
+  - `turn.messages()` 返回 快照 + 本轮消息，用于传给 `client.chat`；
+  - 正常结束时整体提交到历史末尾（一次加锁追加），异常时整体丢弃。
+
+会话默认串行执行各轮（FIFO 排队），不同会话之间互不阻塞。
+history 是 ChatContext 时，提交后超出 token 预算的历史在后台线程中压缩：
+生成摘要的 LLM 调用不持有锁，只在选取区间和替换结果时短暂加锁。
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable
+
+DEFAULT_SESSION = "default"
+
+
+class Turn:
+    """一轮对话的事务。通过 `Conversation.turn()` 获取，建议用 with 语句使用"""
+
+    def __init__(self, conversation: "Conversation", snapshot: list, release: Callable[[], None] | None):
+        self._conversation = conversation
+        self._snapshot = snapshot
+        self._pending: list = []
+        self._context: list = []
+        self._release = release
+        self._generation = conversation.generation
+        self._done = False
+
+    def append(self, message) -> None:
+        self._pending.append(message)
+
+    def extend(self, messages) -> None:
+        self._pending.extend(messages)
+
+    def set_context(self, messages: list) -> None:
+        """本轮的临时上下文（例如自动检索到的备忘录片段）：放在本轮消息之前传给 LLM，不写入历史"""
+        self._context = list(messages)
+
+    def messages(self) -> list:
+        """传给 LLM 的消息列表：开始时的历史快照 + 临时上下文 + 本轮已产生的消息"""
+        return self._snapshot + self._context + self._pending
+
+    def discard(self) -> None:
+        """丢弃本轮目前为止的消息（例如工具清空了对话），之后仍可继续追加"""
+        self._snapshot = []
+        self._pending = []
+        self._generation = self._conversation.generation
+
+    def commit(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        try:
+            self._conversation._commit(self._pending, self._generation)
+        finally:
+            self._finish()
+
+    def rollback(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        self._finish()
+
+    def _finish(self) -> None:
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+    def __enter__(self) -> "Turn":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+class Conversation:
+    """单个会话的历史。history 通常是 ChatContext（按 token 预算压缩），也可以是普通 list"""
+
+    def __init__(self, history: list, serialize_turns: bool = True, name: str = DEFAULT_SESSION):
+        self.name = name
+        self.serialize_turns = serialize_turns
+        self._history = history
+        self._lock = threading.Lock()
+        # 每次 clear() 递增，清空之前开始的轮次提交时不会把旧快照带回来
+        self.generation = 0
+        # 按票号实现的 FIFO 排队
+        self._turn_cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned: set[int] = set()  # 等待超时而放弃的票号
+        self._compacting = False
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return list(self._history)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._history)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._history.clear()
+            self.generation += 1
+
+    def turn(self, timeout: float | None = None) -> Turn:
+        """开始一轮对话。serialize_turns=True 时排队等待本会话之前的轮次结束"""
+        release = None
+        if self.serialize_turns:
+            self._wait_turn(timeout)
+            release = self._release_turn
+        try:
+            return Turn(self, self.snapshot(), release)
+        except BaseException:
+            if release is not None:
+                release()
+            raise
+
+    def _wait_turn(self, timeout: float | None) -> None:
+        with self._turn_cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            if ticket != self._serving:
+                print(f"[Conversation] 会话 {self.name} 前面还有 {ticket - self._serving} 轮，排队等待")
+            if not self._turn_cond.wait_for(lambda: ticket == self._serving, timeout):
+                # 超时：作废这张票，轮到它时直接跳过
+                self._abandoned.add(ticket)
+                raise TimeoutError(f"Conversation {self.name} is busy.")
+
+    def _release_turn(self) -> None:
+        with self._turn_cond:
+            self._serving += 1
+            while self._serving in self._abandoned:
+                self._abandoned.discard(self._serving)
+                self._serving += 1
+            self._turn_cond.notify_all()
+
+    def _commit(self, messages: list, generation: int) -> None:
+        if not messages:
+            return
+        with self._lock:
+            if generation != self.generation:
+                # 对话在本轮进行中被清空：本轮消息依赖的上下文已不存在，直接丢弃
+                return
+            self._history.extend(messages)
+            needs_compaction = getattr(self._history, "needs_compaction", None)
+            if self._compacting or needs_compaction is None or not needs_compaction():
+                return
+            self._compacting = True
+        threading.Thread(
+            target=self._compact, args=(generation,), name=f"compact-{self.name}", daemon=True
+        ).start()
+
+    def _compact(self, generation: int) -> None:
+        """后台压缩历史：摘要生成期间其他轮次可以照常读取快照和提交"""
+        try:
+            with self._lock:
+                if generation != self.generation:
+                    return
+                plan = self._history.plan_compaction()
+            if plan is None:
+                return
+            summary_msg = self._history.summarize(plan[2])
+            with self._lock:
+                if generation == self.generation:
+                    self._history.apply_compaction(plan, summary_msg)
+        except Exception as e:
+            print(f"[Conversation] 会话 {self.name} 压缩历史失败: {e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+
+class ConversationStore:
+    """按 session id 管理多个会话；history_factory 为每个新会话创建历史容器"""
+
+    def __init__(self, history_factory: Callable[[], list], serialize_turns: bool = True):
+        self._factory = history_factory
+        self.serialize_turns = serialize_turns
+        self._sessions: dict[str, Conversation] = {}
+        self._lock = threading.Lock()
+
+    def session(self, session_id: str = DEFAULT_SESSION) -> Conversation:
+        with self._lock:
+            conv = self._sessions.get(session_id)
+            if conv is None:
+                conv = Conversation(self._factory(), self.serialize_turns, name=session_id)
+                self._sessions[session_id] = conv
+            return conv
+
+    def turn(self, session_id: str = DEFAULT_SESSION, timeout: float | None = None) -> Turn:
+        return self.session(session_id).turn(timeout)
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def session_ids(self) -> list[str]:
+        with self._lock:
+            return list(self._sessions)
@@ -0,0 +1,178 @@
+"""无界面的 LLM 对话轮次引擎与 MCP 工具目录。
+
+五个入口脚本、Web 端文字对话和语音流水线原先各自实现一遍“首轮 streaming 请求（带 tools）→
+并发执行 tool_calls → 第二轮请求”的流程。这里把它收拢为 `TurnEngine.run`：
+调用方只提供对话事务和输出回调（PyQt 信号、Web 推送、TTS 分句队列……），
+因此整个流程可以脱离 PyQt / GUI 单独运行和压测。
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Iterable
+
+from .sentence_split import StreamingSegmenter, collect_chat_stream
+from .tracing import NULL_TRACE, TurnTrace
+
+# 同步 MCP 工具失败时的最小回退工具（与 local_tools.py 中的 run_command 对应）
+FALLBACK_TOOLS = [{
+    'type': 'function',
+    'function': {
+        'name': 'run_command',
+        'description': '在本地电脑执行终端命令',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'command': {'type': 'string', 'description': '要执行的 CMD 命令'},
+            },
+            'required': ['command'],
+        },
+    },
+}]
+
+
+def ollama_tools_from_mcp(mcp_tools: Iterable) -> list[dict]:
+    """将 MCP 的工具定义转换为 Ollama 需要的格式"""
+    return [{
+        'type': 'function',
+        'function': {
+            'name': t.name,
+            'description': t.description,
+            'parameters': t.inputSchema,
+        },
+    } for t in mcp_tools]
+
+
+def fetch_tools(mcp_pool) -> list[dict]:
+    """从 MCP 会话池获取工具定义；失败时返回回退的 run_command 工具"""
+    try:
+        tools = ollama_tools_from_mcp(mcp_pool.list_tools())
+        print(f"成功同步工具: {[t['function']['name'] for t in tools]}")
+        return tools
+    except Exception as e:
+        print(f"同步工具失败，使用回退 run_command：{e}")
+        return list(FALLBACK_TOOLS)
+
+
+def _last_user_text(messages: list) -> str:
+    for message in reversed(messages):
+        if message.get('role') == 'user':
+            return message.get('content') or ''
+    return ''
+
+
+class TurnEngine:
+    """执行一轮对话：streaming 首轮请求 → 工具调用 → streaming 第二轮请求。
+
+    client: `ollama.Client` 或兼容对象（如 ConcurrencyLimitedClient、压测桩）
+    tools: 返回当前工具列表的函数（工具在后台同步，每轮读取最新值）
+    tool_dispatcher: `ToolDispatcher`；为 None 时忽略模型返回的 tool_calls
+    chat_options: 附加到每次 chat 请求的参数（例如 {'think': False}）
+    context_provider(user_text) -> messages: 每轮首次请求前调用，返回的消息作为本轮临时上下文
+        （例如 `MemoRecall` 检索到的备忘录片段），不写入历史
+    """
+
+    def __init__(
+        self,
+        client,
+        model: str,
+        tool_dispatcher=None,
+        tools: Callable[[], list] = list,
+        chat_options: dict | None = None,
+        keep_alive=-1,
+        context_provider: Callable[[str], list] | None = None,
+    ):
+        self.client = client
+        self.model = model
+        self.tool_dispatcher = tool_dispatcher
+        self.tools = tools
+        self.chat_options = dict(chat_options or {})
+        self.keep_alive = keep_alive
+        self.context_provider = context_provider
+
+    def _stream(self, messages: list, on_delta, tools: list | None = None) -> tuple[str, list]:
+        kwargs = dict(self.chat_options)
+        if tools is not None:
+            kwargs['tools'] = tools
+            kwargs['keep_alive'] = self.keep_alive
+        return collect_chat_stream(
+            self.client.chat(model=self.model, messages=messages, stream=True, **kwargs),
+            on_delta,
+        )
+
+    def run(
+        self,
+        turn,
+        on_delta: Callable[[str], None] | None = None,
+        on_reset: Callable[[], None] | None = None,
+        tool_filter: Callable[[object, list], list] | None = None,
+        tag: str = "MCP Action",
+        trace: TurnTrace = NULL_TRACE,
+    ) -> str:
+        """在对话事务 turn 中生成回复（调用方已写入用户消息），返回最终回复文本。
+
+        on_delta(text): 每个增量文本；on_reset(): 工具调用后、第二轮请求前调用，
+        此前输出的内容不计入最终回复。tool_filter(turn, tool_messages) 可在写回上下文前
+        处理工具结果（例如 clear_chat 清空对话），返回需要写回的消息。
+        trace: 记录请求发出、首个 token、工具调用和完成时间
+        """
+        def _on_delta(delta: str) -> None:
+            trace.mark_once("llm_first_token")
+            if on_delta is not None:
+                on_delta(delta)
+
+        if self.context_provider is not None:
+            user_text = _last_user_text(turn.messages())
+            if user_text:
+                with trace.span("context"):
+                    turn.set_context(self.context_provider(user_text))
+
+        trace.mark("llm_request", round=1)
+        content, tool_calls = self._stream(turn.messages(), _on_delta, tools=self.tools())
+
+        if tool_calls and self.tool_dispatcher is not None:
+            # 记录模型的 tool_call 请求
+            turn.append({'role': 'assistant', 'content': content, 'tool_calls': tool_calls})
+            # 同一轮的多个工具调用并发执行，结果按模型顺序写回上下文
+            names = [c['function']['name'] for c in tool_calls]
+            with trace.span("tools", names=names):
+                tool_messages = self.tool_dispatcher.run(tool_calls, tag=tag)
+            if tool_filter is not None:
+                tool_messages = tool_filter(turn, tool_messages)
+            turn.extend(tool_messages)
+
+            if on_reset is not None:
+                on_reset()
+            trace.mark("llm_request", round=2)
+            content, _ = self._stream(turn.messages(), _on_delta)
+
+        trace.mark("llm_done", chars=len(content))
+        turn.append({'role': 'assistant', 'content': content})
+        return content
+
+    def run_sentences(
+        self,
+        turn,
+        on_sentence: Callable[[str], None],
+        max_len: int,
+        tool_filter: Callable[[object, list], list] | None = None,
+        tag: str = "MCP Action",
+        trace: TurnTrace = NULL_TRACE,
+    ) -> str:
+        """同 run，但把回复增量切分成句子交给 on_sentence（供 TTS 边生成边合成）。
+
+        整轮共用一个增量分句器：首段尽早切出，之后的片段更长；
+        工具调用前已输出的句子照常朗读，剩余的缓冲在第二轮请求前送出。
+        """
+        segmenter = StreamingSegmenter(max_len=max_len)
+
+        def _on_delta(delta: str) -> None:
+            for s in segmenter.feed(delta):
+                on_sentence(s)
+
+        def _flush() -> None:
+            for s in segmenter.flush():
+                on_sentence(s)
+
+        content = self.run(turn, _on_delta, _flush, tool_filter, tag, trace)
+        _flush()
+        return content
@@ -0,0 +1,96 @@
+"""共享 Ollama 客户端前的并发限制器。
+
+桌面端、语音流水线和多个 Web 会话共用同一个 `ollama.Client`。各会话可以并行处理，
+但同时发往远端模型的请求数需要受控（与服务端 OLLAMA_NUM_PARALLEL 对应），
+超出的请求在这里排队，而不是全部堆到服务端。
+"""
+
+from __future__ import annotations
+
+import threading
+
+
+class ConcurrencyLimitedClient:
+    """包装 ollama.Client：chat() 调用最多 max_concurrent 个同时进行。
+
+    stream=True 时返回 `_LimitedStream`：第一次迭代时才获取许可并发起请求，
+    迭代器耗尽、出错、close() 或被回收时释放；其他属性直接转发给原客户端。
+    """
+
+    def __init__(self, client, max_concurrent: int = 2, name: str = "LLM"):
+        if max_concurrent <= 0:
+            raise ValueError("max_concurrent must be greater than 0.")
+        self._client = client
+        self._sem = threading.BoundedSemaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.name = name
+
+    def _acquire(self) -> None:
+        if not self._sem.acquire(blocking=False):
+            print(f"[{self.name}] 并发请求已达上限 {self.max_concurrent}，排队等待")
+            self._sem.acquire()
+
+    def chat(self, *args, **kwargs):
+        if kwargs.get('stream'):
+            return _LimitedStream(self, args, kwargs)
+        self._acquire()
+        try:
+            return self._client.chat(*args, **kwargs)
+        finally:
+            self._sem.release()
+
+    def __getattr__(self, item):
+        return getattr(self._client, item)
+
+
+class _LimitedStream:
+    """流式 chat 的结果。
+
+    许可在第一次 next() 时才获取（ollama 的流式请求本来也是迭代时才发出），
+    调用方拿到结果后没有开始迭代就丢弃（例如中途抛出异常）时不会占用许可。
+    """
+
+    def __init__(self, limiter: ConcurrencyLimitedClient, args, kwargs):
+        self._limiter = limiter
+        self._args = args
+        self._kwargs = kwargs
+        self._it = None
+        self._held = False
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        if self._it is None:
+            self._limiter._acquire()
+            self._held = True
+            try:
+                self._it = iter(self._limiter._client.chat(*self._args, **self._kwargs))
+            except BaseException:
+                self.close()
+                raise
+        try:
+            return next(self._it)
+        except BaseException:
+            # 包括 StopIteration：流结束或出错都释放许可
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        it, self._it = self._it, None
+        try:
+            if it is not None and hasattr(it, "close"):
+                it.close()
+        finally:
+            if self._held:
+                self._held = False
+                self._limiter._sem.release()
+
+    def __del__(self):
+        self.close()
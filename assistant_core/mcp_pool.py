@@ -0,0 +1,206 @@
+"""常驻 MCP 客户端会话池。
+
+原先每次工具调用都会重新 `stdio_client` 启动一个 `python local_tools.py` 子进程，
+并完成 FastMCP 导入、switchbot 初始化和 MCP 握手，单次就要数百毫秒。
+这里在一个专用的 asyncio 事件循环线程上维持若干个预热好的 `ClientSession`，
+任意线程都可以通过 `submit()` / `call_tool()` 提交调用；子进程退出时自动重连。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+from contextlib import AsyncExitStack
+from datetime import timedelta
+from typing import Any, Awaitable, Callable
+
+import anyio
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+
+# 会话已断开（子进程退出 / 管道关闭）时抛出的异常，此类错误在请求发出前即失败，可安全重试
+_DISCONNECT_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    BrokenPipeError,
+    ConnectionError,
+)
+
+
+def format_tool_result(result) -> str:
+    """将 `CallToolResult` 转为文本；result.content 通常是一个 list，里面有 text 字段"""
+    return result.content[0].text if result.content else "No output"
+
+
+class MCPSessionPool:
+    """在后台事件循环线程中维护 `size` 个常驻 MCP 会话。
+
+    每个会话由一个 worker 协程独占，worker 从共享的任务队列中取任务执行，
+    因此同一时刻最多有 `size` 个工具调用并发进行。
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        size: int = 2,
+        call_timeout: float = 60.0,
+        name: str = "MCP",
+    ):
+        if size <= 0:
+            raise ValueError("Pool size must be greater than 0.")
+        self.server_params = server_params
+        self.size = size
+        self.call_timeout = call_timeout
+        self.name = name
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._jobs: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    # ---------- 生命周期 ----------
+    def start(self) -> "MCPSessionPool":
+        """启动事件循环线程并预热全部会话（幂等）"""
+        with self._start_lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} session pool is closed.")
+            if self._thread is not None:
+                return self
+            self._thread = threading.Thread(
+                target=self._run_loop, name=f"{self.name}-session-pool", daemon=True,
+            )
+            self._thread.start()
+        self._ready.wait()
+        return self
+
+    def close(self, timeout: float = 5.0) -> None:
+        """关闭所有会话（终止子进程）并停止事件循环"""
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._loop is None or self._thread is None:
+            return
+        fut = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        try:
+            fut.result(timeout=timeout)
+        except Exception as e:
+            print(f"[{self.name} Pool] 关闭异常: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=timeout)
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._jobs = asyncio.Queue()
+        self._workers = [loop.create_task(self._worker(i)) for i in range(self.size)]
+        loop.call_soon(self._ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def _shutdown(self) -> None:
+        for _ in self._workers:
+            self._jobs.put_nowait(None)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    # ---------- 提交任务 ----------
+    def submit_session_call(
+        self, fn: Callable[[ClientSession], Awaitable[Any]],
+    ) -> concurrent.futures.Future:
+        """在任一空闲会话上执行 `await fn(session)`，返回线程安全的 Future"""
+        self.start()
+        fut: concurrent.futures.Future = concurrent.futures.Future()
+        self._loop.call_soon_threadsafe(self._jobs.put_nowait, (fn, fut))
+        return fut
+
+    def submit(self, tool_name: str, arguments: dict | None = None) -> concurrent.futures.Future:
+        """提交一次工具调用，Future 的结果为工具输出文本"""
+        read_timeout = timedelta(seconds=self.call_timeout) if self.call_timeout else None
+
+        async def _call(session: ClientSession) -> str:
+            result = await session.call_tool(
+                tool_name, arguments or {}, read_timeout_seconds=read_timeout,
+            )
+            return format_tool_result(result)
+
+        return self.submit_session_call(_call)
+
+    def call_tool(self, tool_name: str, arguments: dict | None = None, timeout: float | None = None) -> str:
+        """同步调用工具并等待结果，可在任意线程中使用"""
+        return self.submit(tool_name, arguments).result(timeout=timeout)
+
+    def list_tools(self, timeout: float | None = None):
+        """同步获取 MCP Server 的工具列表（`ListToolsResult.tools`）"""
+
+        async def _list(session: ClientSession):
+            return (await session.list_tools()).tools
+
+        return self.submit_session_call(_list).result(timeout=timeout)
+
+    # ---------- worker ----------
+    async def _connect(self, idx: int) -> tuple[AsyncExitStack, ClientSession]:
+        stack = AsyncExitStack()
+        try:
+            read, write = await stack.enter_async_context(stdio_client(self.server_params))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+        except BaseException:
+            await stack.aclose()
+            raise
+        print(f"[{self.name} Pool] 会话 #{idx} 已连接")
+        return stack, session
+
+    async def _disconnect(self, idx: int, stack: AsyncExitStack | None) -> None:
+        if stack is None:
+            return
+        try:
+            await stack.aclose()
+        except BaseException as e:  # 子进程已死时关闭也可能报错，忽略即可
+            print(f"[{self.name} Pool] 会话 #{idx} 关闭异常: {e!r}")
+
+    async def _worker(self, idx: int) -> None:
+        """独占一个会话；stdio_client 的进入与退出必须在同一个 task 内完成"""
+        stack: AsyncExitStack | None = None
+        session: ClientSession | None = None
+        try:
+            # 启动即预热，第一次工具调用无需等待子进程启动
+            try:
+                stack, session = await self._connect(idx)
+            except Exception as e:
+                print(f"[{self.name} Pool] 会话 #{idx} 预热失败，将在首次调用时重试: {e}")
+
+            while True:
+                job = await self._jobs.get()
+                if job is None:
+                    break
+                fn, fut = job
+                if not fut.set_running_or_notify_cancel():
+                    continue
+
+                # 会话断开时重连并重试一次；工具本身的异常不重试，避免重复执行有副作用的操作
+                for attempt in range(2):
+                    try:
+                        if session is None:
+                            stack, session = await self._connect(idx)
+                        fut.set_result(await fn(session))
+                        break
+                    except _DISCONNECT_ERRORS as e:
+                        print(f"[{self.name} Pool] 会话 #{idx} 已断开，正在重连: {e!r}")
+                        await self._disconnect(idx, stack)
+                        stack = session = None
+                        if attempt == 1:
+                            fut.set_exception(e)
+                    except Exception as e:
+                        fut.set_exception(e)
+                        break
+        finally:
+            await self._disconnect(idx, stack)
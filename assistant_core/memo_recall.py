@@ -0,0 +1,67 @@
+"""每轮对话前自动检索相关备忘录，作为临时上下文注入。
+
+原先模型要回答“我上次体检是什么时候”这类问题，需要先 memo_list、再逐个 memo_read，
+每一步都是一次 LLM 往返。这里在首次请求前用用户的话调用 MCP 工具
+`memo_semantic_search`（本地向量索引，毫秒级），把相似度足够高的片段作为一条
+system 消息放在本轮用户消息之前；片段只用于本轮，不写入历史，
+因此不会挤占上下文预算，也不改变历史前缀（Ollama 仍可复用 KV cache）。
+"""
+
+from __future__ import annotations
+
+import json
+import re
+
+RECALL_TOOL = "memo_semantic_search"
+RECALL_PREFIX = (
+    "以下是根据用户的话自动检索到的备忘录片段，可能与问题无关。"
+    "如果能直接回答，请引用这些内容，不必再调用 memo_read：\n"
+)
+
+# 语音入口会在用户的话后面附加朗读提示，检索时去掉
+_HINT_RE = re.compile(r"\n（[^）]*）\s*$")
+
+
+class MemoRecall:
+    """`TurnEngine` 的 context_provider：返回 0 或 1 条包含备忘录片段的 system 消息。
+
+    mcp_pool: `MCPSessionPool`；检索失败或超时只打印日志，本轮照常进行
+    min_score: 余弦相似度下限，低于该值的片段不注入（与嵌入方式有关，见 memo_vectors.EMBED_MODEL）
+    """
+
+    def __init__(
+        self,
+        mcp_pool,
+        top_k: int = 3,
+        min_score: float = 0.12,
+        timeout: float = 2.0,
+        min_chars: int = 4,
+        max_snippet_chars: int = 300,
+    ):
+        self.mcp_pool = mcp_pool
+        self.top_k = top_k
+        self.min_score = min_score
+        self.timeout = timeout
+        self.min_chars = min_chars
+        self.max_snippet_chars = max_snippet_chars
+
+    def __call__(self, user_text: str) -> list[dict]:
+        query = _HINT_RE.sub("", user_text).strip()
+        if len(query) < self.min_chars:
+            return []
+        try:
+            raw = self.mcp_pool.call_tool(RECALL_TOOL, {"query": query, "limit": self.top_k}, timeout=self.timeout)
+            items = json.loads(raw).get("items", [])
+        except Exception as e:
+            print(f"[Memo Recall] 检索失败: {e}")
+            return []
+
+        hits = [item for item in items if item.get("score", 0) >= self.min_score]
+        if not hits:
+            return []
+        lines = []
+        for item in hits:
+            snippet = " ".join(item.get("snippet", "").split())[: self.max_snippet_chars]
+            lines.append(f"- [{item['path']}] {item.get('title', '')}: {snippet}")
+        print(f"[Memo Recall] 注入 {len(hits)} 条备忘录片段: {[item['path'] for item in hits]}")
+        return [{'role': 'system', 'content': RECALL_PREFIX + "\n".join(lines)}]
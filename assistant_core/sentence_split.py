@@ -0,0 +1,189 @@
+"""TTS 句子拆分工具，以及 LLM streaming → TTS 的增量分句器。"""
+
+from __future__ import annotations
+
+import re
+from typing import Callable, Iterable
+
+TTS_TOKEN_MAX_NUM = 100  # TTS 单句最大字符数，超过则继续拆分
+
+_PUNCT_PATTERN = re.compile(r'(?<=[。！？；\n!\?;])')
+_SUB_PUNCT_PATTERN = re.compile(r'(?<=[，,、：:\-—])')
+
+# 流式分句时的切分点：句末标点随时可切，次级标点需满足最小长度
+STRONG_PUNCT = frozenset('。！？；!?;\n')
+WEAK_PUNCT = frozenset('，,、：:')
+
+
+def split_sentences_for_tts(text: str, max_len: int = TTS_TOKEN_MAX_NUM) -> list[str]:
+    """按标点将文本拆分为适合 TTS 的短句列表。
+
+    1. 先按句末标点（。！？；!?;\n）拆分。
+    2. 若某段仍超过 max_len，则按次级标点（，,、：:—）继续拆分。
+    3. 若仍超过 max_len，则对半切割，直到每段 <= max_len。
+    """
+    if not text or not text.strip():
+        return []
+
+    # 第一轮：按主要句末标点拆分
+    chunks = _PUNCT_PATTERN.split(text)
+    chunks = [c.strip() for c in chunks if c.strip()]
+
+    # 第二轮：对超长段按次级标点拆分
+    result = []
+    for chunk in chunks:
+        if len(chunk) <= max_len:
+            result.append(chunk)
+        else:
+            sub_chunks = _SUB_PUNCT_PATTERN.split(chunk)
+            sub_chunks = [s.strip() for s in sub_chunks if s.strip()]
+            for sc in sub_chunks:
+                if len(sc) <= max_len:
+                    result.append(sc)
+                else:
+                    # 递归对半拆分
+                    result.extend(_force_split(sc, max_len))
+    return result
+
+
+def _force_split(text: str, max_len: int) -> list[str]:
+    """无合适标点时，对半拆分直到每段 <= max_len"""
+    if len(text) <= max_len:
+        return [text]
+    mid = len(text) // 2
+    # 尽量在中间附近的空格或标点处切割
+    best = mid
+    for offset in range(min(20, mid)):
+        for pos in (mid + offset, mid - offset):
+            if 0 < pos < len(text) and text[pos] in ' ，,。！？；、：!?; \n':
+                best = pos + 1
+                break
+        else:
+            continue
+        break
+    left = text[:best].strip()
+    right = text[best:].strip()
+    parts = []
+    if left:
+        parts.extend(_force_split(left, max_len))
+    if right:
+        parts.extend(_force_split(right, max_len))
+    return parts
+
+
+class StreamingSegmenter:
+    """将 LLM streaming 的 delta 增量切分为 TTS 句子。
+
+    每个字符只扫描一次，记录缓冲区内最后一个句末标点 / 次级标点 / 空白的位置，
+    避免每来一个 delta 就重新扫描整个缓冲区（长段无标点输出时为 O(n^2)）。
+
+    切分策略（长度均按字符计）：
+      - 遇到句末标点立即切分；
+      - 次级标点处仅当片段长度 >= min_len 时切分，避免把“好的，”这类碎片单独送去合成；
+      - 无可用标点且缓冲区达到 max_len 时，在最后一个空白处（没有则直接）强制切分。
+    第一段使用更小的 first_min_len / first_max_len，让首个音频块尽早发出，
+    之后的片段更长，合成效率和韵律更好。切出的片段再经 split_sentences_for_tts 拆分。
+    """
+
+    def __init__(
+        self,
+        max_len: int = TTS_TOKEN_MAX_NUM,
+        min_len: int = 16,
+        first_min_len: int = 2,
+        first_max_len: int = 40,
+    ):
+        if max_len <= 0 or first_max_len <= 0:
+            raise ValueError("max_len and first_max_len must be greater than 0.")
+        self.max_len = max_len
+        self.min_len = min_len
+        self.first_min_len = first_min_len
+        self.first_max_len = min(first_max_len, max_len)
+        self._buf = ""
+        self._last_strong = -1
+        self._last_weak = -1
+        self._last_space = -1
+        self._emitted = False
+
+    def _limits(self) -> tuple[int, int]:
+        if self._emitted:
+            return self.min_len, self.max_len
+        return self.first_min_len, self.first_max_len
+
+    def _scan(self, start: int) -> None:
+        buf = self._buf
+        for i in range(start, len(buf)):
+            ch = buf[i]
+            if ch in STRONG_PUNCT:
+                self._last_strong = i
+            elif ch in WEAK_PUNCT:
+                self._last_weak = i
+            elif ch.isspace():
+                self._last_space = i
+
+    def _cut(self, end: int) -> list[str]:
+        """切出 buf[:end]，并把已记录的位置平移到新缓冲区"""
+        segment = self._buf[:end]
+        self._buf = self._buf[end:]
+        self._last_strong = self._last_strong - end if self._last_strong >= end else -1
+        self._last_weak = self._last_weak - end if self._last_weak >= end else -1
+        self._last_space = self._last_space - end if self._last_space >= end else -1
+        sentences = split_sentences_for_tts(segment.strip(), self.max_len)
+        if sentences:
+            self._emitted = True
+        return sentences
+
+    def feed(self, delta: str) -> list[str]:
+        """追加一段 delta，返回可以送去 TTS 的句子列表（可能为空）"""
+        if not delta:
+            return []
+        start = len(self._buf)
+        self._buf += delta
+        self._scan(start)
+
+        out: list[str] = []
+        while self._buf:
+            min_len, max_len = self._limits()
+            cut = self._last_strong
+            if self._last_weak + 1 >= max(min_len, 1) and self._last_weak > cut:
+                cut = self._last_weak
+            if cut >= 0:
+                out.extend(self._cut(cut + 1))
+                continue
+            if len(self._buf) >= max_len:
+                use_space = self._last_space > 0 and self._last_space + 1 >= min_len
+                end = self._last_space + 1 if use_space else max_len
+                out.extend(self._cut(end))
+                continue
+            break
+        return out
+
+    def flush(self) -> list[str]:
+        """流结束时输出缓冲区中剩余的文本"""
+        if not self._buf:
+            return []
+        return self._cut(len(self._buf))
+
+
+def collect_chat_stream(
+    stream_iter: Iterable[dict],
+    on_delta: Callable[[str], None] | None = None,
+) -> tuple[str, list]:
+    """读取 `client.chat(stream=True)` 的迭代器，每个非空 content delta 回调 on_delta。
+
+    返回 (full_content, tool_calls_list)。
+    """
+    parts: list[str] = []
+    tc_list: list = []
+    for chunk in stream_iter:
+        msg = chunk.get('message', {})
+        # 收集 tool_calls
+        if msg.get('tool_calls'):
+            tc_list.extend(msg['tool_calls'])
+        delta = msg.get('content', '')
+        if not delta:
+            continue
+        parts.append(delta)
+        if on_delta is not None:
+            on_delta(delta)
+    return "".join(parts), tc_list
+
@@ -0,0 +1,215 @@
+"""边录边识别：基于 VAD 的分段流式 ASR。
+
+按住快捷键说话时，InputStream 回调的音频帧被送入 VAD，每检测到一段完整语音
+（其后跟着足够长的停顿）就在后台线程中立即识别；松开按键时只需再识别最后一段。
+免按键模式下，语音结束后的持续静音（endpoint）会自动结束本轮输入。
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+
+class EnergyVAD:
+    """基于帧能量的轻量 VAD，噪声底随环境自适应。
+
+    帧能量超过 max(噪声底 + margin_db, min_speech_db) 判为语音。
+    噪声底取最近 window_frames 帧（不论是否判为语音）能量的低分位数：
+    说话时字与字之间的停顿会把它拉回环境噪声的水平，环境噪声本身高于
+    min_speech_db 时也能在几帧内跟上，不会因为每帧都被判为语音而停止更新。
+    """
+
+    def __init__(
+        self,
+        margin_db: float = 10.0,
+        min_speech_db: float = -50.0,
+        window_frames: int = 100,
+        percentile: float = 10.0,
+    ):
+        self.margin_db = margin_db
+        self.min_speech_db = min_speech_db
+        self.percentile = percentile
+        self._history: deque[float] = deque(maxlen=window_frames)
+        self.noise_db = min_speech_db - margin_db
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(np.square(frame), dtype=np.float64))) if len(frame) else 0.0
+        db = 20.0 * np.log10(rms + 1e-10)
+        # 当前帧先计入窗口：第一帧总是判为非语音（即用它校准噪声底）
+        self._history.append(db)
+        self.noise_db = float(np.percentile(self._history, self.percentile))
+        return db > max(self.noise_db + self.margin_db, self.min_speech_db)
+
+
+def join_transcripts(parts: list[str]) -> str:
+    """拼接分段识别结果：中日文直接相连，拉丁文字之间补空格"""
+    text = ""
+    for p in parts:
+        p = p.strip()
+        if not p:
+            continue
+        if text and text[-1].isascii() and text[-1].isalnum() and p[0].isascii() and p[0].isalnum():
+            text += " "
+        text += p
+    return text
+
+
+class StreamingRecognizer:
+    """消费录音帧，按 VAD 切出语音段并在后台识别。
+
+    transcribe(wav) -> (text, language)，wav 为 float32 单声道 PCM。
+    push() 可在音频回调中调用（只入队）；finish() 结束输入并返回 (完整文本, 首段语言)。
+    on_endpoint 在免按键模式下检测到结束静音（或长时间无语音）时被调用一次。
+    """
+
+    def __init__(
+        self,
+        transcribe: Callable[[np.ndarray], tuple[str, str | None]],
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        preroll_ms: int = 300,
+        segment_silence_ms: int = 600,
+        max_segment_s: float = 20.0,
+        endpoint_silence_ms: int | None = None,
+        no_speech_timeout_s: float = 8.0,
+        on_endpoint: Callable[[], None] | None = None,
+        vad: EnergyVAD | None = None,
+    ):
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.frame_ms = frame_ms
+        self.preroll_frames = max(1, preroll_ms // frame_ms)
+        self.segment_silence_frames = max(1, segment_silence_ms // frame_ms)
+        self.max_segment_frames = int(max_segment_s * 1000 // frame_ms)
+        self.endpoint_silence_frames = (
+            max(1, endpoint_silence_ms // frame_ms) if endpoint_silence_ms else None
+        )
+        self.no_speech_timeout_frames = int(no_speech_timeout_s * 1000 // frame_ms)
+        self.on_endpoint = on_endpoint
+        self.vad = vad or EnergyVAD()
+
+        self._in_q: queue.Queue = queue.Queue()
+        self._pending = np.zeros(0, dtype=np.float32)  # 不足一帧的残余样本
+        self._preroll: list[np.ndarray] = []
+        self._segment: list[np.ndarray] = []
+        self._in_speech = False
+        self._silence_run = 0
+        self._frames_seen = 0
+        self._heard_speech = False
+        self._endpoint_fired = False
+
+        self._asr = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-asr")
+        self._futures: list[Future] = []
+        self._worker = threading.Thread(target=self._run, name="stream-asr-vad", daemon=True)
+        self._worker.start()
+
+    # ---------- 输入 ----------
+    def push(self, frames: np.ndarray) -> None:
+        """送入一块录音（可在 sd.InputStream 回调中调用）"""
+        self._in_q.put(frames)
+
+    def finish(self, timeout: float | None = None) -> tuple[str, str | None]:
+        """结束输入：识别尾段并等待全部分段完成，返回 (text, language)"""
+        self._in_q.put(None)
+        self._worker.join(timeout)
+        texts: list[str] = []
+        language = None
+        for fut in self._futures:
+            try:
+                text, lang = fut.result(timeout)
+            except Exception as e:
+                print(f"[Stream ASR] 分段识别失败: {e}")
+                continue
+            if text:
+                texts.append(text)
+                language = language or lang
+        self._asr.shutdown(wait=False)
+        return join_transcripts(texts), language
+
+    @property
+    def segments_submitted(self) -> int:
+        return len(self._futures)
+
+    # ---------- VAD / 分段 ----------
+    def _run(self) -> None:
+        while True:
+            block = self._in_q.get()
+            if block is None:
+                break
+            data = np.asarray(block, dtype=np.float32).reshape(-1)
+            if len(self._pending):
+                data = np.concatenate([self._pending, data])
+            n_full = len(data) // self.frame_len * self.frame_len
+            for start in range(0, n_full, self.frame_len):
+                self._on_frame(data[start:start + self.frame_len])
+            self._pending = data[n_full:]
+        # 尾段：仍在说话（或停顿未满）的部分一并识别
+        if self._in_speech:
+            if len(self._pending):
+                self._segment.append(self._pending)
+            self._submit_segment()
+
+    def _on_frame(self, frame: np.ndarray) -> None:
+        self._frames_seen += 1
+        speech = self.vad.is_speech(frame)
+        if not self._in_speech:
+            self._preroll.append(frame)
+            if len(self._preroll) > self.preroll_frames:
+                self._preroll.pop(0)
+            if speech:
+                # 语音起点：带上前置缓冲，避免截掉首字
+                self._in_speech = True
+                self._heard_speech = True
+                self._segment = self._preroll
+                self._preroll = []
+                self._silence_run = 0
+            else:
+                self._silence_run += 1
+                self._check_endpoint()
+            return
+
+        self._segment.append(frame)
+        if speech:
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+        if self._silence_run >= self.segment_silence_frames or len(self._segment) >= self.max_segment_frames:
+            # _silence_run 不清零：分段后的静音继续计入 endpoint 判断
+            self._submit_segment()
+            self._in_speech = False
+
+    def _check_endpoint(self) -> None:
+        if self._endpoint_fired or self.on_endpoint is None or self.endpoint_silence_frames is None:
+            return
+        trailing = self._heard_speech and self._silence_run >= self.endpoint_silence_frames
+        idle = not self._heard_speech and self._frames_seen >= self.no_speech_timeout_frames
+        if trailing or idle:
+            self._endpoint_fired = True
+            try:
+                self.on_endpoint()
+            except Exception as e:
+                print(f"[Stream ASR] endpoint 回调异常: {e}")
+
+    def _submit_segment(self) -> None:
+        if not self._segment:
+            return
+        wav = np.concatenate(self._segment)
+        self._segment = []
+        index = len(self._futures) + 1
+        print(f"[Stream ASR] 提交第 {index} 段识别 ({len(wav) / self.sample_rate:.1f}s)")
+        submitted_at = time.monotonic()
+
+        def _job():
+            text, lang = self.transcribe(wav)
+            print(f"[Stream ASR] 第 {index} 段识别完成 ({time.monotonic() - submitted_at:.2f}s): {text}")
+            return text.strip(), lang
+
+        self._futures.append(self._asr.submit(_job))
@@ -0,0 +1,99 @@
+"""同一轮 LLM 回复中多个 tool_calls 的并发调度。
+
+模型一次返回多个 tool_calls（例如同时打开客厅1、客厅2 并读取 Hub 2 传感器）时，
+互不依赖的调用并发执行，总耗时接近单次调用；结果仍按模型给出的顺序生成
+`role: tool` 消息。带副作用、依赖执行顺序的工具可以标记为串行：
+串行工具会等待之前的调用全部完成后单独执行，之后的调用也要等它结束。
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable
+
+
+# 默认串行执行的工具：写文件 / 执行命令 / 清空对话等，执行顺序会影响结果
+DEFAULT_SERIAL_TOOLS = frozenset({
+    "run_command",
+    "memo_create",
+    "memo_update",
+    "memo_delete",
+    "memo_update_todo",
+    "clear_chat",
+})
+
+
+class ToolDispatcher:
+    """按批次并发执行 tool_calls，并保持结果顺序。
+
+    call_fn(name, arguments) -> 输出文本，必须是线程安全的（例如 `AIAssistant.call_mcp_tool`）。
+    """
+
+    def __init__(
+        self,
+        call_fn: Callable[[str, dict], object],
+        max_parallel: int = 4,
+        serial_tools: Iterable[str] = DEFAULT_SERIAL_TOOLS,
+    ):
+        if max_parallel <= 0:
+            raise ValueError("max_parallel must be greater than 0.")
+        self.call_fn = call_fn
+        self.max_parallel = max_parallel
+        self.serial_tools = set(serial_tools)
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="tool-call")
+
+    def is_serial(self, name: str) -> bool:
+        return name in self.serial_tools
+
+    def _plan(self, tool_calls: list) -> list[list[int]]:
+        """将调用下标划分为批次：连续的可并发调用为一批，串行调用单独成批"""
+        batches: list[list[int]] = []
+        current: list[int] = []
+        for idx, tc in enumerate(tool_calls):
+            if self.is_serial(tc["function"]["name"]):
+                if current:
+                    batches.append(current)
+                    current = []
+                batches.append([idx])
+            else:
+                current.append(idx)
+        if current:
+            batches.append(current)
+        return batches
+
+    def run(self, tool_calls: list, tag: str = "MCP Action") -> list[dict]:
+        """执行一轮 tool_calls，按模型顺序返回 `role: tool` 消息列表。
+
+        任一调用抛出异常时，等待同批其余调用结束后按模型顺序抛出第一个异常，
+        与逐个串行调用时的行为一致（之后的批次不再执行）。
+        """
+        outputs: list[object] = [None] * len(tool_calls)
+        for batch in self._plan(tool_calls):
+            futures: list[tuple[int, Future]] = []
+            for idx in batch:
+                t_name = tool_calls[idx]["function"]["name"]
+                t_args = tool_calls[idx]["function"]["arguments"]
+                print(f"[{tag}] 调用工具: {t_name} 参数: {t_args}")
+                if len(batch) == 1:
+                    # 单个调用直接在当前线程执行，省去线程切换
+                    outputs[idx] = self.call_fn(t_name, t_args)
+                else:
+                    futures.append((idx, self._executor.submit(self.call_fn, t_name, t_args)))
+
+            error: BaseException | None = None
+            for idx, fut in futures:
+                try:
+                    outputs[idx] = fut.result()
+                except Exception as e:
+                    if error is None:
+                        error = e
+            if error is not None:
+                raise error
+
+        return [
+            {"role": "tool", "content": str(output), "name": tc["function"]["name"]}
+            for tc, output in zip(tool_calls, outputs)
+        ]
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,189 @@
+"""语音对话的分阶段延迟追踪。
+
+每一轮语音对话对应一个 `TurnTrace`，各阶段用单调时钟（time.monotonic）打点：
+录音结束、ASR 开始 / 结束、首个 LLM token、每句送入 TTS、每批 TTS 合成（音频时长与实时率）、
+工具调用、首个音频样本播放、播放结束。结束时计算各阶段耗时汇总，
+整条记录追加写入 JSONL 文件，并保留在内存环形缓冲区中供 Web 端 /api/traces 查询。
+
+打点只做一次时钟读取和列表追加，可以在任意线程调用；不需要追踪时使用 `NULL_TRACE`，
+调用方无需判断。
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_CAPACITY = 200  # 内存中保留的最近轮次数
+
+
+class TurnTrace:
+    def __init__(self, tracer: "Tracer | None", turn_id: int, kind: str, attrs: dict):
+        self._tracer = tracer
+        self.turn_id = turn_id
+        self.kind = kind
+        self.attrs = attrs
+        self.t0 = time.monotonic()
+        self.started_at = time.time()
+        self.events: list[dict] = []
+        self._once: set[str] = set()
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def mark(self, event: str, at: float | None = None, **attrs) -> None:
+        """记录一个事件；at 为 time.monotonic() 时间戳（默认为当前时间）"""
+        t = time.monotonic() if at is None else at
+        record = {"event": event, "t_ms": round((t - self.t0) * 1000, 2)}
+        record.update(attrs)
+        with self._lock:
+            self.events.append(record)
+
+    def mark_once(self, event: str, **attrs) -> None:
+        """同名事件只记录第一次（例如首个 LLM token）"""
+        if event in self._once:
+            return
+        with self._lock:
+            if event in self._once:
+                return
+            self._once.add(event)
+        self.mark(event, **attrs)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """记录 <name>_start / <name>_end；yield 的 dict 中的内容会写入结束事件。
+
+        dict 中带 audio_s（音频时长）时，结束事件同时记录实时率 rtf = 耗时 / 音频时长。
+        """
+        self.mark(f"{name}_start", **attrs)
+        result: dict = {}
+        start = time.monotonic()
+        try:
+            yield result
+        except Exception as e:
+            result["error"] = str(e)
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            result["duration_ms"] = round(elapsed * 1000, 2)
+            if result.get("audio_s"):
+                result["rtf"] = round(elapsed / result["audio_s"], 4)
+            self.mark(f"{name}_end", **result)
+
+    def summary(self) -> dict:
+        """各阶段耗时（毫秒，相对本轮开始）：找不到的阶段不出现"""
+        with self._lock:
+            events = list(self.events)
+        first: dict[str, float] = {}
+        last: dict[str, float] = {}
+        tts_ms = 0.0
+        tool_ms = 0.0
+        audio_s = 0.0
+        for e in events:
+            first.setdefault(e["event"], e["t_ms"])
+            last[e["event"]] = e["t_ms"]
+            if e["event"] == "tts_end":
+                tts_ms += e.get("duration_ms", 0.0)
+                audio_s += e.get("audio_s", 0.0)
+            elif e["event"] == "tools_end":
+                tool_ms += e.get("duration_ms", 0.0)
+        out = {}
+        if "asr_start" in first and "asr_end" in last:
+            out["asr_ms"] = round(last["asr_end"] - first["asr_start"], 2)
+        if "context_start" in first and "context_end" in last:
+            out["context_ms"] = round(last["context_end"] - first["context_start"], 2)
+        if "llm_request" in first and "llm_first_token" in first:
+            out["llm_first_token_ms"] = round(first["llm_first_token"] - first["llm_request"], 2)
+        if "llm_request" in first and "llm_done" in first:
+            out["llm_total_ms"] = round(first["llm_done"] - first["llm_request"], 2)
+        if tool_ms:
+            out["tool_ms"] = round(tool_ms, 2)
+        if tts_ms:
+            out["tts_ms"] = round(tts_ms, 2)
+            if audio_s:
+                out["tts_rtf"] = round(tts_ms / 1000 / audio_s, 4)
+        for key, event in (("first_audio_ms", "first_audio"), ("playback_end_ms", "playback_end")):
+            if event in first:
+                out[key] = first[event]
+        if events:
+            out["total_ms"] = max(e["t_ms"] for e in events)
+        return out
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            events = list(self.events)
+        return {
+            "turn_id": self.turn_id,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            **self.attrs,
+            "summary": self.summary(),
+            "events": events,
+        }
+
+    def finish(self) -> None:
+        """结束本轮：计算汇总并交给 Tracer 记录；重复调用无效"""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        if self._tracer is not None:
+            self._tracer._record(self)
+
+
+class _NullTrace(TurnTrace):
+    """不记录任何内容的追踪对象"""
+
+    def __init__(self):
+        super().__init__(None, 0, "null", {})
+
+    def mark(self, event: str, at: float | None = None, **attrs) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class Tracer:
+    """生成 TurnTrace，并把结束的记录写入 JSONL 文件（path 为 None 时只保留在内存中）"""
+
+    def __init__(self, path=None, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("capacity must be greater than 0.")
+        self.path = path
+        self._recent: deque[dict] = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def begin(self, kind: str = "voice", **attrs) -> TurnTrace:
+        return TurnTrace(self, next(self._ids), kind, attrs)
+
+    def _record(self, trace: TurnTrace) -> None:
+        record = trace.to_dict()
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._recent.append(record)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(line + "\n")
+                except OSError as e:
+                    print(f"[Trace] 写入 {self.path} 失败: {e}")
+        print(f"[Trace] 第 {trace.turn_id} 轮 ({trace.kind}) {record['summary']}")
+
+    def recent(self, limit: int | None = None) -> list[dict]:
+        """最近结束的轮次（从旧到新）"""
+        with self._lock:
+            items = list(self._recent)
+        if limit is not None and limit >= 0:
+            items = items[-limit:] if limit else []
+        return items
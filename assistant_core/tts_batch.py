@@ -0,0 +1,71 @@
+"""TTS 自适应批量合成的分批逻辑。
+
+第一句总是单独合成，保证首个音频块尽早播放；之后每次把 sentence_queue 中
+已经积压的句子（不超过句数 / 字符预算）一次性取出，交给支持列表输入的
+`Qwen3TTSModel.generate_custom_voice` 批量合成。LLM 输出快于 TTS 时批次自然变大，
+TTS 跟得上时退化为逐句合成，不额外增加等待。
+"""
+
+from __future__ import annotations
+
+import queue
+from typing import Iterator
+
+TTS_BATCH_MAX_SENTENCES = 4  # 单次批量合成的最大句数
+TTS_BATCH_MAX_CHARS = 240  # 单次批量合成的字符预算（批内按最长句 padding，过长会拖慢整批）
+
+_NOTHING = object()
+
+
+def iter_sentence_batches(
+    sentence_queue: queue.Queue,
+    sentinel=None,
+    max_sentences: int = TTS_BATCH_MAX_SENTENCES,
+    max_chars: int = TTS_BATCH_MAX_CHARS,
+) -> Iterator[list[str]]:
+    """从 sentence_queue 中按批取出句子，读到 sentinel 后输出剩余批次并结束。
+
+    除第一批（单句）外，每批阻塞等待一句，再非阻塞地取走已积压的句子，
+    直到达到 max_sentences 或 max_chars。单句超过 max_chars 时仍单独成批。
+    """
+    if max_sentences <= 0:
+        raise ValueError("max_sentences must be greater than 0.")
+    first = True
+    carry = _NOTHING  # 因超出预算而留到下一批的句子（或提前读到的 sentinel）
+    while True:
+        if carry is not _NOTHING:
+            item, carry = carry, _NOTHING
+        else:
+            item = sentence_queue.get()
+        if item is sentinel:
+            return
+        batch = [item]
+        chars = len(item)
+        if first:
+            first = False
+            yield batch
+            continue
+        while len(batch) < max_sentences:
+            try:
+                item = sentence_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is sentinel or chars + len(item) > max_chars:
+                carry = item
+                break
+            batch.append(item)
+            chars += len(item)
+        yield batch
+
+
+def plan_sentence_batches(
+    sentences: list[str],
+    max_sentences: int = TTS_BATCH_MAX_SENTENCES,
+    max_chars: int = TTS_BATCH_MAX_CHARS,
+) -> list[list[str]]:
+    """句子已全部就绪时的分批（非 streaming 场景）：第一句单独一批，其余按预算贪心分批"""
+    q: queue.Queue = queue.Queue()
+    for s in sentences:
+        q.put(s)
+    q.put(None)
+    return list(iter_sentence_batches(q, None, max_sentences, max_chars))
@@ -0,0 +1,221 @@
+"""TTS 合成结果缓存：内存 LRU + 磁盘 .npy 文件（短音频整段读入，长音频 memmap 读取）。
+
+助手经常重复朗读相同的短句（“好的”、设备状态模板、错误提示），
+命中缓存时直接返回 PCM，完全跳过 Kokoro / Qwen TTS 推理。
+
+缓存键由 (引擎, 模型 ID, 音色/说话人, 语言, 语速, 规范化文本) 计算 SHA-1，
+磁盘文件名为 `<key>.<sr>.npy`，目录总大小超过上限时按最近使用时间（mtime）淘汰。
+Windows 上仍被 memmap 映射的文件无法删除：删除失败的文件继续计入总大小，下次淘汰时重试。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 磁盘缓存上限
+DEFAULT_MEMORY_ITEMS = 256  # 内存 LRU 条目数
+DEFAULT_MAX_TEXT_LEN = 64  # 只缓存短句，长句几乎不会重复
+MMAP_MIN_BYTES = 1024 * 1024  # 小于该大小的文件整段读入内存，不保持映射（不妨碍之后删除）
+
+
+def normalize_text(text: str) -> str:
+    """NFKC 规范化并折叠空白，使全半角 / 多余空格不同的同一句话命中同一条缓存"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def make_cache_key(engine: str, model_id: str, voice: str, language: str, speed, text: str) -> str:
+    payload = json.dumps(
+        [engine, model_id, voice, language, str(speed), normalize_text(text)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """线程安全的 TTS 音频缓存。
+
+    get() 返回 (wav, sr)，wav 为只读的 float32 数组（大于 MMAP_MIN_BYTES 的磁盘文件是 memmap）；
+    put() 原子写入磁盘（临时文件 + os.replace）并在超出 max_bytes 时淘汰最久未用的文件。
+    """
+
+    def __init__(
+        self,
+        cache_dir,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        memory_items: int = DEFAULT_MEMORY_ITEMS,
+        max_text_len: int = DEFAULT_MAX_TEXT_LEN,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.max_text_len = max_text_len
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, tuple[np.ndarray, int]] = OrderedDict()
+        # key -> (path, bytes)，按最近使用排序（最旧在前）
+        self._disk: OrderedDict[str, tuple[Path, int]] = OrderedDict()
+        self._disk_bytes = 0
+        self._undeleted: list[tuple[Path, int]] = []  # 已淘汰但删除失败的文件（仍计入 _disk_bytes）
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_written = 0
+        self.evictions = 0
+        self._scan_disk()
+
+    # ---------- 公共接口 ----------
+    def cacheable(self, text: str) -> bool:
+        return 0 < len(normalize_text(text)) <= self.max_text_len
+
+    def get(self, key: str):
+        """命中返回 (wav, sr)，未命中返回 None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._touch(key)
+                self.hits += 1
+                self.memory_hits += 1
+                self.bytes_served += entry[0].nbytes
+                return entry
+            disk = self._disk.get(key)
+            if disk is None:
+                self.misses += 1
+                return None
+            path, size = disk
+        try:
+            wav = np.load(path, mmap_mode="r" if size >= MMAP_MIN_BYTES else None)
+            wav.setflags(write=False)
+            sr = int(path.name.split(".")[1])
+        except (OSError, ValueError, IndexError) as e:
+            print(f"[TTS Cache] 读取失败，丢弃 {path.name}: {e}")
+            with self._lock:
+                self._drop(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self._remember(key, wav, sr)
+            self._touch(key)
+            self.hits += 1
+            self.bytes_served += wav.nbytes
+        return wav, sr
+
+    def put(self, key: str, wav, sr: int) -> None:
+        data = np.ascontiguousarray(np.asarray(wav, dtype=np.float32).reshape(-1))
+        if data.nbytes > self.max_bytes:
+            return
+        path = self.cache_dir / key[:2] / f"{key}.{int(sr)}.npy"
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[TTS Cache] 写入失败: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        size = path.stat().st_size
+        data.setflags(write=False)
+        with self._lock:
+            if key in self._disk:
+                self._disk_bytes -= self._disk.pop(key)[1]
+            self._disk[key] = (path, size)
+            self._disk_bytes += size
+            self.bytes_written += size
+            self._remember(key, data, int(sr))
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "bytes_served": self.bytes_served,
+                "bytes_written": self.bytes_written,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "memory_entries": len(self._memory),
+                "evictions": self.evictions,
+            }
+
+    # ---------- 内部 ----------
+    def _scan_disk(self) -> None:
+        """启动时按 mtime 重建磁盘 LRU 顺序，并清理残留的临时文件"""
+        entries = []
+        for path in self.cache_dir.glob("*/*"):
+            if path.name.endswith(".tmp"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+                continue
+            if not path.name.endswith(".npy"):
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path.name.split(".")[0], path, st.st_size))
+        for _, key, path, size in sorted(entries):
+            self._disk[key] = (path, size)
+            self._disk_bytes += size
+        self._evict()
+
+    def _remember(self, key: str, wav: np.ndarray, sr: int) -> None:
+        self._memory[key] = (wav, sr)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key: str) -> None:
+        disk = self._disk.get(key)
+        if disk is None:
+            return
+        self._disk.move_to_end(key)
+        try:
+            os.utime(disk[0])
+        except OSError:
+            pass
+
+    def _drop(self, key: str) -> None:
+        # 先释放内存 LRU 中对 memmap 的引用，再删除文件
+        self._memory.pop(key, None)
+        disk = self._disk.pop(key, None)
+        if disk is not None and not self._unlink(*disk):
+            self._undeleted.append(disk)
+
+    def _unlink(self, path: Path, size: int) -> bool:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # 例如 Windows 上文件仍被正在播放的 memmap 映射
+            print(f"[TTS Cache] 删除 {path.name} 失败，下次淘汰时重试: {e}")
+            return False
+        self._disk_bytes -= size
+        return True
+
+    def _evict(self) -> None:
+        if self._undeleted:
+            self._undeleted = [entry for entry in self._undeleted if not self._unlink(*entry)]
+        while self._disk_bytes > self.max_bytes and self._disk:
+            key = next(iter(self._disk))
+            self._drop(key)
+            self.evictions += 1
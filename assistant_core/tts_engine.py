@@ -0,0 +1,186 @@
+"""TTS 合成阶段：Kokoro / Qwen TTS 适配器与带缓存的合成器。
+
+模型对象由各入口脚本加载后传入，本模块不直接依赖 torch / kokoro / qwen_tts，
+测试或压测时可以换成任何实现了同样方法的假合成器：
+
+    cache_key(sentence) -> str          缓存键（包含引擎、模型、音色等参数）
+    synthesize(sentences) -> (wavs, sr) 一批句子，wavs 一一对应，失败的位置为 None
+    pieces(sentence) -> Iterator[wav]   逐段产出一句的音频（不支持流式的引擎整句产出一次）
+
+`CachedSynthesizer` 在此之上加 TTSCache：命中的句子完全跳过推理。
+"""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+import numpy as np
+
+from .tts_cache import TTSCache, make_cache_key
+
+
+def _to_numpy(wav) -> np.ndarray:
+    # torch.Tensor（可能在 GPU 上）→ numpy；不在此处 import torch
+    if hasattr(wav, "cpu"):
+        wav = wav.cpu().numpy()
+    return np.asarray(wav, dtype=np.float32)
+
+
+class KokoroSynthesizer:
+    """Kokoro 的 KPipeline 只接受单条文本，是生成器：按其内部分段逐段产出音频"""
+
+    streaming = True
+
+    def __init__(self, pipeline, repo_id: str, voice: str, language: str,
+                 sample_rate: int = 24000, speed_scale: float = 1.5):
+        self.pipeline = pipeline
+        self.repo_id = repo_id
+        self.voice = voice
+        self.language = language
+        self.sample_rate = sample_rate
+        self.speed_scale = speed_scale
+
+    def cache_key(self, sentence: str) -> str:
+        # speed_callable 按音素长度自适应语速，整体乘以 speed_scale
+        return make_cache_key("kokoro", self.repo_id, self.voice, self.language,
+                              f"auto*{self.speed_scale}", sentence)
+
+    def _speed(self, len_ps: int) -> float:
+        speed = 0.8
+        if len_ps <= 83:
+            speed = 1
+        elif len_ps < 183:
+            speed = 1 - (len_ps - 83) / 500
+        return speed * self.speed_scale
+
+    def pieces(self, sentence: str) -> Iterator[np.ndarray]:
+        for result in self.pipeline(sentence, voice=self.voice, speed=self._speed):
+            yield _to_numpy(result.audio)
+
+    def synthesize(self, sentences: list):
+        wavs = []
+        for sentence in sentences:
+            try:
+                pieces = list(self.pieces(sentence))
+                wavs.append(np.concatenate(pieces) if pieces else None)
+            except Exception as e:
+                print(f"[Voice TTS] 合成失败: {sentence[:30]} ({e})")
+                wavs.append(None)
+        return wavs, self.sample_rate
+
+
+class QwenSynthesizer:
+    """Qwen TTS 使用列表输入一次批量推理，失败时退回逐句合成；不支持流式推理"""
+
+    streaming = False
+
+    def __init__(self, model, model_id: str, speaker: str, language: str):
+        self.model = model
+        self.model_id = model_id
+        self.speaker = speaker
+        self.language = language
+
+    def cache_key(self, sentence: str) -> str:
+        return make_cache_key("qwen", self.model_id, self.speaker, self.language, 1.0, sentence)
+
+    def pieces(self, sentence: str) -> Iterator[np.ndarray]:
+        wavs, _ = self.synthesize([sentence])
+        if wavs[0] is not None:
+            yield wavs[0]
+
+    def synthesize(self, sentences: list):
+        n = len(sentences)
+        if n > 1:
+            try:
+                wavs, sr = self.model.generate_custom_voice(
+                    text=list(sentences),
+                    language=[self.language] * n,
+                    speaker=[self.speaker] * n,
+                )
+                return list(wavs), sr
+            except Exception as e:
+                print(f"[Voice TTS] 批量合成 {n} 句失败，改为逐句合成: {e}")
+        wavs = []
+        sr = None
+        for sentence in sentences:
+            try:
+                out, sr = self.model.generate_custom_voice(
+                    text=sentence,
+                    language=self.language,
+                    speaker=self.speaker,
+                )
+                wavs.append(out[0])
+            except Exception as e:
+                print(f"[Voice TTS] 合成失败: {sentence[:30]} ({e})")
+                wavs.append(None)
+        return wavs, sr
+
+
+class CachedSynthesizer:
+    """先查 TTS 缓存，只有未命中的句子送去模型合成"""
+
+    def __init__(self, synthesizer, cache: TTSCache | None = None):
+        self.synthesizer = synthesizer
+        self.cache = cache
+
+    def _key(self, sentence: str) -> str | None:
+        if self.cache is None or not self.cache.cacheable(sentence):
+            return None
+        return self.synthesizer.cache_key(sentence)
+
+    def synthesize(self, sentences: list):
+        """返回 (wavs, sr)，与 sentences 一一对应"""
+        wavs = [None] * len(sentences)
+        sr = None
+        keys = [self._key(s) for s in sentences]
+        pending = []
+        for idx, key in enumerate(keys):
+            hit = self.cache.get(key) if key else None
+            if hit is None:
+                pending.append(idx)
+                continue
+            wavs[idx], sr = hit
+            print(f"[TTS Cache] 命中: {sentences[idx]}")
+        if pending:
+            synthesized, sr_new = self.synthesizer.synthesize([sentences[idx] for idx in pending])
+            sr = sr_new or sr
+            for idx, wav in zip(pending, synthesized):
+                wavs[idx] = wav
+                if wav is not None and keys[idx] and sr_new:
+                    self.cache.put(keys[idx], wav, sr_new)
+        return wavs, sr
+
+    def pieces(self, sentences: list):
+        """按顺序产出 (句序号, 音频片段, sr)，供调用方边合成边推送。
+
+        支持流式的引擎（Kokoro）逐句、逐段产出，一段合成完立即返回，整句完成后写入缓存；
+        其他引擎整批合成后每句作为一个片段返回，由调用方切帧。合成失败的句子不产出任何片段。
+        """
+        synth = self.synthesizer
+        if not getattr(synth, "streaming", False):
+            wavs, sr = self.synthesize(sentences)
+            for idx, wav in enumerate(wavs):
+                if wav is not None:
+                    yield idx, wav, sr
+            return
+
+        for idx, sentence in enumerate(sentences):
+            key = self._key(sentence)
+            hit = self.cache.get(key) if key else None
+            if hit is not None:
+                print(f"[TTS Cache] 命中: {sentence}")
+                yield idx, hit[0], hit[1]
+                continue
+            pieces = []
+            try:
+                for wav in synth.pieces(sentence):
+                    pieces.append(wav)
+                    yield idx, wav, synth.sample_rate
+            except Exception as e:
+                print(f"[Voice TTS] 合成失败: {sentence[:30]} ({e})")
+                continue
+            if key and pieces:
+                self.cache.put(key, np.concatenate(pieces), synth.sample_rate)
+
+    def stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
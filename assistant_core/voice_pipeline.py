@@ -0,0 +1,265 @@
+"""语音回复流水线：LLM 回复 → 分句 → TTS 合成 → 播放 / 推送到浏览器。
+
+各入口脚本原先各自维护一份 “生产者线程 + 环形缓冲区 + OutputStream 播放线程” 的实现。
+这里把各阶段拆成与界面无关的函数，脚本只负责选择模式和转发状态：
+
+  - reply_and_speak: 运行一轮 TurnEngine，streaming 模式下句子一切出就送去 TTS，
+    否则等完整回复后再分句（或整段）合成；
+  - speak:           句子批次 → TTS → AudioRingBuffer → 播放器（默认 sounddevice OutputStream）；
+  - speak_to_web:    句子批次 → TTS 片段 → 固定时长的帧 → emit_fn 推送到浏览器。
+
+播放器是可替换的 `player(ring, sample_rate)`，压测时可以换成不出声的实现。
+各阶段都接受 trace（`tracing.TurnTrace`），记录分句入队、每批合成、首个音频和播放结束的时间。
+sounddevice 只在真正播放时导入，无音频设备的环境也能使用其余部分。
+"""
+
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+from typing import Callable, Iterable
+
+from . import audio_codec
+from .audio_frames import PcmFramer
+from .audio_ring import AudioRingBuffer
+from .sentence_split import split_sentences_for_tts
+from .tracing import NULL_TRACE, TurnTrace
+from .tts_batch import iter_sentence_batches, plan_sentence_batches
+
+PLAYBACK_BLOCK = 1024  # OutputStream 每次回调的帧数
+
+_SENTINEL = None
+
+
+def play_ring(ring: AudioRingBuffer, sample_rate: int, blocksize: int = PLAYBACK_BLOCK) -> None:
+    """使用 sd.OutputStream 从环形缓冲区流式播放，阻塞直到播放结束"""
+    import sounddevice as sd
+
+    def callback(outdata, frames, time_info, status):
+        # 实时音频线程：只做拷贝，不分配内存、不加锁
+        n = ring.read_into(outdata[:, 0])
+        if n < frames:
+            # 数据不足，补静音
+            outdata[n:, 0] = 0.0
+            if ring.drained:
+                raise sd.CallbackStop()
+
+    with sd.OutputStream(
+        samplerate=sample_rate,
+        channels=1,
+        dtype='float32',
+        blocksize=blocksize,
+        callback=callback,
+    ) as stream:
+        # 阻塞直到播放结束（CallbackStop 触发）
+        while stream.active:
+            sd.sleep(50)
+    print(f"[Voice TTS] OutputStream 播放结束 {ring.stats()}")
+
+
+def _audio_stats(span: dict, wavs: list, sr) -> None:
+    """在 tts span 的结束事件中记录音频时长（span 据此计算实时率）"""
+    samples = sum(len(w) for w in wavs if w is not None)
+    if sr and samples:
+        span["audio_s"] = round(samples / sr, 3)
+
+
+def _progress(first: int, last: int, total: int | None) -> str:
+    if total:
+        return f"正在合成语音 ({last}/{total})..."
+    if first == last:
+        return f"正在合成语音 ({last})..."
+    return f"正在合成语音 ({first}-{last})..."
+
+
+def speak(
+    batches: Iterable[list[str]],
+    tts,
+    on_status: Callable[[str], None] | None = None,
+    player: Callable[[AudioRingBuffer, int], None] = play_ring,
+    total: int | None = None,
+    trace: TurnTrace = NULL_TRACE,
+) -> None:
+    """合成并播放句子批次，阻塞直到播放结束。
+
+    TTS 线程按原顺序把音频直接写入预分配的环形缓冲区（空间不足时等待播放端消费），
+    播放线程在拿到第一段音频的采样率后启动。
+    """
+    ring = AudioRingBuffer()
+    sr_holder = [None]  # 在生产者与播放线程之间传递采样率
+    sr_ready = threading.Event()
+
+    def tts_producer():
+        done = 0
+        try:
+            for batch in batches:
+                if ring.aborted:
+                    print("[Voice TTS] 播放已中止，停止合成")
+                    break
+                first_idx = done + 1
+                done += len(batch)
+                try:
+                    if on_status is not None:
+                        on_status(_progress(first_idx, done, total))
+                    with trace.span("tts", first=first_idx, sentences=len(batch),
+                                    chars=sum(len(x) for x in batch)) as span:
+                        wavs, sr = tts.synthesize(batch)
+                        _audio_stats(span, wavs, sr)
+                except Exception as e:
+                    print(f"[Voice TTS] 合成第 {first_idx}-{done} 段失败: {e}")
+                    continue
+                for idx, (sentence, wav) in enumerate(zip(batch, wavs), start=first_idx):
+                    if wav is None:
+                        continue
+                    # 首次拿到 sr 后通知播放线程
+                    if sr_holder[0] is None:
+                        sr_holder[0] = sr
+                        sr_ready.set()
+                    ring.write(wav)
+                    print(f"[Voice TTS] 合成完成 ({idx}): {sentence}")
+        finally:
+            ring.close()
+            sr_ready.set()  # 全部合成失败时也要唤醒播放线程
+
+    def audio_player():
+        sr_ready.wait()
+        if sr_holder[0] is None:
+            return
+        try:
+            player(ring, sr_holder[0])
+        except Exception as e:
+            print(f"[Voice TTS] 播放失败: {e}")
+        finally:
+            # 播放端退出后没有人再读取：让等待空间的 TTS 线程立即返回
+            ring.abort()
+        # 首个样本的时间由环形缓冲区在读出时记录，音频回调中不做额外工作
+        if ring.first_read_at is not None:
+            trace.mark("first_audio", at=ring.first_read_at)
+        trace.mark("playback_end", **ring.stats())
+
+    producer_thread = threading.Thread(target=tts_producer, daemon=True)
+    player_thread = threading.Thread(target=audio_player, daemon=True)
+    producer_thread.start()
+    player_thread.start()
+    producer_thread.join()
+    player_thread.join()
+
+
+def speak_to_web(
+    batches: Iterable[list[str]],
+    tts,
+    emit_fn: Callable[[str, dict], None],
+    codec: str,
+    frame_ms: int = 100,
+    trace: TurnTrace = NULL_TRACE,
+) -> None:
+    """合成句子批次并以 voice_audio_start / voice_audio_chunk / voice_audio_end 推送到浏览器"""
+    framer = None  # 首个片段确定采样率后创建
+
+    def _send(frames):
+        for seq, frame in frames:
+            emit_fn("voice_audio_chunk", {"seq": seq, "data": audio_codec.encode(frame, codec)})
+
+    done = 0
+    for batch in batches:
+        first_idx = done + 1
+        done += len(batch)
+        emit_fn("voice_status", {"status": "tts", "message": _progress(first_idx, done, None)})
+        try:
+            with trace.span("tts", first=first_idx, sentences=len(batch),
+                            chars=sum(len(x) for x in batch)) as span:
+                pieces = []
+                for idx, wav, sr in tts.pieces(batch):
+                    if framer is None:
+                        # 首次发送采样率和编码格式
+                        framer = PcmFramer(sr, frame_ms)
+                        emit_fn("voice_audio_start", {"sampleRate": sr, "codec": codec})
+                    # 片段一产出就切成固定时长的帧按序推送，不等整句合成完
+                    _send(framer.push(wav))
+                    trace.mark_once("first_audio", sent=True)
+                    pieces.append(wav)
+                    print(f"[Web Voice TTS] 推送片段 ({first_idx + idx}): {batch[idx][:30]}...")
+                _audio_stats(span, pieces, framer.sample_rate if framer else None)
+        except Exception as e:
+            print(f"[Web Voice TTS] 合成第 {first_idx}-{done} 段失败: {e}")
+
+    if framer is not None:
+        _send(framer.flush())
+    emit_fn("voice_audio_end", {})
+    trace.mark("playback_end", sent=True)
+
+
+def reply_and_speak(
+    engine,
+    turn,
+    speaker: Callable[..., None],
+    streaming: bool = True,
+    max_len: int | None = 100,
+    on_reply: Callable[[str], None] | None = None,
+    tool_filter=None,
+    tag: str = "MCP Action",
+    trace: TurnTrace = NULL_TRACE,
+) -> str:
+    """生成一轮回复并朗读，返回回复文本（出错时为空字符串）。
+
+    turn: 已写入用户消息的对话事务，由本函数提交（出错则丢弃）；本函数返回或抛出异常时
+          turn 都已结束，调用方在外层用 with 包住时退出 with 只是空操作
+    speaker(batches, total=None): speak / speak_to_web 的偏函数
+    streaming: True 时 LLM 线程边生成边分句送入队列，TTS 线程按批取出合成，
+               两者并行；False 时等完整回复后再分句，max_len 为 None 时整段合成
+    on_reply(content): 回复生成完毕时调用（此时朗读可能仍在进行）
+    """
+    if not streaming:
+        with turn:
+            content = engine.run(turn, tool_filter=tool_filter, tag=tag, trace=trace)
+        if on_reply is not None:
+            on_reply(content)
+        if content.strip():
+            sentences = split_sentences_for_tts(content, max_len) if max_len else [content.strip()]
+            print(f"[Voice TTS] 拆分为 {len(sentences)} 段: {sentences}")
+            for i, sentence in enumerate(sentences, start=1):
+                trace.mark("sentence_enqueued", index=i, chars=len(sentence))
+            if sentences:
+                speaker(plan_sentence_batches(sentences), total=len(sentences))
+        return content
+
+    # 三级流水线: LLM streaming → sentence_queue → TTS → 播放 / 推送
+    sentence_queue: queue.Queue = queue.Queue()
+    content_holder = [""]
+
+    enqueued = itertools.count(1)
+
+    def _on_sentence(s: str) -> None:
+        sentence_queue.put(s)
+        trace.mark("sentence_enqueued", index=next(enqueued), chars=len(s))
+        print(f"[LLM Stream] → TTS: {s}")
+
+    def llm_producer():
+        try:
+            with turn:
+                content_holder[0] = engine.run_sentences(turn, _on_sentence, max_len, tool_filter, tag, trace)
+        except Exception as e:
+            print(f"[LLM Stream] 异常: {e}")
+        finally:
+            sentence_queue.put(_SENTINEL)  # 通知 TTS 线程结束
+
+    llm_thread = threading.Thread(target=llm_producer, daemon=True)
+    tts_thread = threading.Thread(
+        target=speaker, args=(iter_sentence_batches(sentence_queue, _SENTINEL),), daemon=True,
+    )
+    try:
+        llm_thread.start()
+    except BaseException:
+        turn.rollback()
+        raise
+    try:
+        tts_thread.start()
+    finally:
+        # TTS 线程启动失败时也要等生产者提交或丢弃本轮
+        llm_thread.join()
+    content = content_holder[0]
+    if content and on_reply is not None:
+        on_reply(content)
+    tts_thread.join()
+    return content
@@ -0,0 +1,148 @@
+"""Web 端流式语音上传：浏览器边录边发送小帧，服务端写入预分配的缓冲区。
+
+协议（Socket.IO 事件，见 webpage_chat/server.py）：
+  voice_stream_start  {"codec", "sampleRate", "accept"}
+  voice_stream_frame  {"seq": int, "data": bytes}   按 codec 编码的 PCM 帧
+  voice_stream_end    {"frames": int}               本次上传的总帧数
+  voice_stream_cancel {}
+
+threading 模式下各事件可能在不同线程中处理，帧到达顺序不保证，
+这里按 seq 重排后再写入缓冲区；end 时等待全部帧到齐。
+等待重排的帧只接受 seq 在 [下一帧, 下一帧 + reorder_window) 之内的，且总字节数有上限，
+客户端发送过大或稀疏的 seq 不会让服务端内存无限增长。
+传入 recognizer（StreamingRecognizer）时，每写入一段连续音频就送去 VAD 分段识别，
+用户点击停止前已说完的部分就已识别完毕。
+"""
+
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+from assistant_core import audio_codec
+
+MAX_SAMPLE_RATE = 48000  # 采样率由客户端声明，缓冲区按它预分配
+REORDER_WINDOW = 128  # 最多领先下一帧的帧数（浏览器每帧 40ms，约 5 秒）
+MAX_PENDING_BYTES = 1 << 20  # 等待重排的帧的总字节数上限
+
+
+class VoiceUpload:
+    def __init__(
+        self,
+        codec: str,
+        sample_rate: int,
+        max_seconds: float = 60.0,
+        accept=None,
+        recognizer=None,
+        reorder_window: int = REORDER_WINDOW,
+        max_pending_bytes: int = MAX_PENDING_BYTES,
+    ):
+        if codec not in audio_codec.CODECS:
+            raise ValueError(f"Unsupported audio codec: {codec}")
+        if sample_rate <= 0 or max_seconds <= 0:
+            raise ValueError("sample_rate and max_seconds must be greater than 0.")
+        if sample_rate > MAX_SAMPLE_RATE:
+            raise ValueError(f"sample_rate must not exceed {MAX_SAMPLE_RATE}.")
+        self.codec = codec
+        self.sample_rate = sample_rate
+        self.accept = list(accept or [audio_codec.LEGACY_CODEC])
+        self.recognizer = recognizer
+        self._buf = np.zeros(int(sample_rate * max_seconds), dtype=np.float32)  # 预分配，上限之外的音频丢弃
+        self._length = 0
+        self._next_seq = 0
+        self._pending: dict[int, bytes] = {}  # 乱序到达、尚不能写入的帧
+        self._pending_bytes = 0
+        self.reorder_window = reorder_window
+        self.max_pending_bytes = max_pending_bytes
+        self.rejected = 0  # 因超出窗口或字节上限被丢弃的帧数
+        self._cond = threading.Condition()
+        self._closed = False
+        self.truncated = False
+
+    # ---------- 写入 ----------
+    def append(self, seq: int, payload) -> None:
+        """写入一帧（可乱序调用），按 seq 顺序解码进缓冲区"""
+        with self._cond:
+            if self._closed or seq < self._next_seq or seq in self._pending:
+                return
+            if seq >= self._next_seq + self.reorder_window or \
+                    self._pending_bytes + len(payload) > self.max_pending_bytes:
+                self._reject(seq, len(payload))
+                return
+            self._pending[seq] = bytes(payload)
+            self._pending_bytes += len(payload)
+            while self._next_seq in self._pending:
+                data = self._pending.pop(self._next_seq)
+                self._pending_bytes -= len(data)
+                self._write(audio_codec.decode(data, self.codec))
+                self._next_seq += 1
+            self._cond.notify_all()
+
+    def _reject(self, seq: int, size: int) -> None:
+        self.rejected += 1
+        if self.rejected == 1:
+            print(f"[Voice Upload] 丢弃超出重排窗口的帧: seq={seq} ({size} 字节)，"
+                  f"下一帧 {self._next_seq}，待重排 {self._pending_bytes} 字节")
+
+    def _write(self, pcm: np.ndarray) -> None:
+        n = min(len(pcm), len(self._buf) - self._length)
+        if n < len(pcm) and not self.truncated:
+            self.truncated = True
+            print(f"[Voice Upload] 录音超过 {len(self._buf) / self.sample_rate:.0f} 秒上限，之后的音频被丢弃")
+        if n <= 0:
+            return
+        self._buf[self._length:self._length + n] = pcm[:n]
+        if self.recognizer is not None:
+            self.recognizer.push(self._buf[self._length:self._length + n].copy())
+        self._length += n
+
+    # ---------- 读取 ----------
+    @property
+    def frames_received(self) -> int:
+        with self._cond:
+            return self._next_seq
+
+    @property
+    def duration(self) -> float:
+        with self._cond:
+            return self._length / self.sample_rate
+
+    @property
+    def audio(self) -> np.ndarray:
+        """目前为止按序写入的 PCM（缓冲区视图，不复制）"""
+        with self._cond:
+            return self._buf[:self._length]
+
+    def wait_frames(self, total: int, timeout: float | None = 5.0) -> bool:
+        """等待前 total 帧全部写入；超时返回 False（缺帧之后的部分被放弃）"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or self._next_seq >= total, timeout)
+            ok = self._next_seq >= total
+            if not ok and not self._closed:
+                print(f"[Voice Upload] 等待音频帧超时：已收到 {self._next_seq}/{total}")
+            self._closed = True
+            self._pending.clear()
+            self._pending_bytes = 0
+            return ok
+
+    def finish(self) -> tuple[str, str | None] | None:
+        """结束上传。有 recognizer 时返回其识别结果 (text, language)，否则返回 None"""
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._pending_bytes = 0
+        if self.recognizer is None:
+            return None
+        return self.recognizer.finish()
+
+    def cancel(self) -> None:
+        """放弃本次上传；recognizer 在后台线程中收尾，不阻塞调用方"""
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._pending_bytes = 0
+            self._cond.notify_all()
+        recognizer, self.recognizer = self.recognizer, None
+        if recognizer is not None:
+            threading.Thread(target=recognizer.finish, daemon=True).start()
@@ -0,0 +1,122 @@
+"""StreamingSegmenter 微基准：对比旧的整缓冲区重扫描分句与增量分句。
+
+用法（在仓库根目录）:
+    python benchmarks/bench_segmenter.py
+    python benchmarks/bench_segmenter.py --chars 20000 --token-len 3 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assistant_core.sentence_split import (  # noqa: E402
+    StreamingSegmenter,
+    TTS_TOKEN_MAX_NUM,
+    split_sentences_for_tts,
+)
+
+_SPLIT_PUNCT = set('。！？；!?;\n，,、：:')
+
+
+def legacy_split(deltas):
+    """旧版 `_stream_response` 的分句逻辑：每个 delta 都从头扫描整个 buf 找最后一个标点"""
+    out = []
+    buf = ""
+    for delta in deltas:
+        buf += delta
+        last_punct = -1
+        for i, ch in enumerate(buf):
+            if ch in _SPLIT_PUNCT:
+                last_punct = i
+        if last_punct >= 0:
+            sentence = buf[:last_punct + 1].strip()
+            buf = buf[last_punct + 1:]
+            if sentence:
+                out.extend(split_sentences_for_tts(sentence, TTS_TOKEN_MAX_NUM))
+    if buf.strip():
+        out.extend(split_sentences_for_tts(buf.strip(), TTS_TOKEN_MAX_NUM))
+    return out
+
+
+def segmenter_split(deltas):
+    seg = StreamingSegmenter(max_len=TTS_TOKEN_MAX_NUM)
+    out = []
+    for delta in deltas:
+        out.extend(seg.feed(delta))
+    out.extend(seg.flush())
+    return out
+
+
+def make_prose(n_chars, rng):
+    words = ["今天", "天气", "很好", "客厅的灯", "已经打开", "温度", "二十三度", "湿度", "适中", "我们", "可以", "出门"]
+    puncts = ["，", "，", "。", "！", "、", "？"]
+    parts = []
+    total = 0
+    while total < n_chars:
+        w = rng.choice(words)
+        parts.append(w)
+        total += len(w)
+        if rng.random() < 0.25:
+            p = rng.choice(puncts)
+            parts.append(p)
+            total += 1
+    return "".join(parts)
+
+
+def make_code(n_chars, rng):
+    """无标点的长段输出（代码 / 列表），旧实现在这种输入上退化为 O(n^2)"""
+    idents = ["value", "result", "index", "buffer", "count", "offset", "x", "y"]
+    parts = []
+    total = 0
+    while total < n_chars:
+        line = f"    {rng.choice(idents)} = {rng.choice(idents)} + {rng.randint(0, 999)} "
+        parts.append(line)
+        total += len(line)
+    return "".join(parts)
+
+
+def tokenize(text, token_len):
+    return [text[i:i + token_len] for i in range(0, len(text), token_len)]
+
+
+def bench(name, fn, deltas, repeat):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(deltas)
+        best = min(best, time.perf_counter() - t0)
+    per_delta_us = best / max(len(deltas), 1) * 1e6
+    print(f"  {name:<10} {best * 1000:9.2f} ms  {per_delta_us:7.2f} us/delta  {len(out):5d} segments")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chars", type=int, default=8000, help="每个合成流的字符数")
+    parser.add_argument("--token-len", type=int, default=2, help="每个 delta 的字符数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    streams = {
+        "prose": make_prose(args.chars, rng),
+        "code": make_code(args.chars, rng),
+    }
+    for name, text in streams.items():
+        deltas = tokenize(text, args.token_len)
+        print(f"[{name}] {len(text)} chars, {len(deltas)} deltas")
+        bench("legacy", legacy_split, deltas, args.repeat)
+        out = bench("segmenter", segmenter_split, deltas, args.repeat)
+        # 分句结果拼接后不应丢失任何非空白字符
+        joined = "".join("".join(s.split()) for s in out)
+        assert joined == "".join(text.split()), f"{name}: segmenter lost text"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""语音对话流水线端到端基准：ASR → LLM streaming → 分句 → TTS → 播放，全部使用确定性的替身。
+
+与 `_voice_pipeline` 走同一套 assistant_core 代码（transcribe → TurnEngine → reply_and_speak → speak），
+只把外部依赖换掉，不需要 GPU、声卡、MCP 子进程或远端 Ollama：
+
+  - 桩 Ollama：本地 HTTP 服务按固定 token 速率以 NDJSON 流式返回 /api/chat，
+    由真实的 `ollama.Client` 访问（包含 HTTP / JSON 解析开销）；可选首轮返回 tool_calls；
+  - 桩 MCP：ToolDispatcher 的 call_fn 固定耗时后返回文本；
+  - 假 ASR：固定耗时后返回识别结果；
+  - 假 TTS：按字符数生成正弦波 PCM，模拟“固定开销 + 每字耗时”的计算延迟；
+  - 空播放器：按实时速率（可加速）从环形缓冲区取数据但不出声，记录首个音频块时间与欠载次数。
+
+输出首个音频时间（TTFA）、整轮端到端延迟、LLM 完成时间、TTS 批次大小（取走时句子队列的积压）、
+环形缓冲区高水位和吞吐，便于离线发现热路径上的性能回退。
+
+用法（在仓库根目录）:
+    python benchmarks/bench_voice_pipeline.py
+    python benchmarks/bench_voice_pipeline.py --turns 10 --token-rate 30 --tts-ms-per-char 15
+    python benchmarks/bench_voice_pipeline.py --mode batch --tool-call --playback-speed 0
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ollama  # noqa: E402
+
+from assistant_core.asr_input import transcribe  # noqa: E402
+from assistant_core.conversation import ConversationStore  # noqa: E402
+from assistant_core.engine import TurnEngine  # noqa: E402
+from assistant_core.sentence_split import TTS_TOKEN_MAX_NUM  # noqa: E402
+from assistant_core.tool_dispatch import ToolDispatcher  # noqa: E402
+from assistant_core.tts_engine import CachedSynthesizer  # noqa: E402
+from assistant_core.voice_pipeline import PLAYBACK_BLOCK, reply_and_speak, speak  # noqa: E402
+
+DEFAULT_REPLY = (
+    "好的，我来帮你查一下。今天东京的天气是晴天，最高气温二十三度，最低气温十五度。"
+    "下午可能会有一点风，出门的时候建议带一件薄外套。如果晚上要出去散步，"
+    "记得注意保暖。还有什么需要我帮忙的吗？"
+)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=5, help="对话轮数")
+    parser.add_argument("--mode", choices=("streaming", "batch"), default="streaming",
+                        help="streaming: 边生成边合成（llm_streaming 版本）；batch: 完整回复后再分句合成")
+    parser.add_argument("--reply", default=DEFAULT_REPLY, help="桩 LLM 的回复文本")
+    parser.add_argument("--token-chars", type=int, default=2, help="每个 token 的字符数")
+    parser.add_argument("--token-rate", type=float, default=40.0, help="桩 LLM 每秒输出的 token 数")
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="桩 LLM 首 token 延迟（prefill）")
+    parser.add_argument("--tool-call", action="store_true", help="每轮首次请求返回一次工具调用")
+    parser.add_argument("--tool-ms", type=float, default=100.0, help="桩 MCP 工具调用耗时")
+    parser.add_argument("--asr-ms", type=float, default=150.0, help="假 ASR 识别耗时")
+    parser.add_argument("--tts-fixed-ms", type=float, default=60.0, help="假 TTS 每批固定开销")
+    parser.add_argument("--tts-ms-per-char", type=float, default=8.0, help="假 TTS 每字计算耗时")
+    parser.add_argument("--audio-sec-per-char", type=float, default=0.2, help="每字对应的音频时长（秒）")
+    parser.add_argument("--sample-rate", type=int, default=24000)
+    parser.add_argument("--playback-speed", type=float, default=1.0,
+                        help="空播放器相对实时的速度，0 表示不限速（只测合成与调度）")
+    parser.add_argument("--max-len", type=int, default=TTS_TOKEN_MAX_NUM, help="TTS 单句最大字符数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出汇总结果")
+    parser.add_argument("--verbose", action="store_true", help="显示流水线各阶段的日志")
+    return parser.parse_args()
+
+
+# ---------- 桩 Ollama ----------
+class _StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None  # 由 start_stub_ollama 设置
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _chunk(self, message: dict, done: bool = False) -> bytes:
+        body = {"model": "stub", "created_at": "2026-01-01T00:00:00Z", "message": message, "done": done}
+        if done:
+            body["done_reason"] = "stop"
+        return (json.dumps(body, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _write(self, data: bytes) -> None:
+        # chunked 传输，每个 NDJSON 行立即发出
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        cfg = self.config
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(cfg.first_token_ms / 1000)
+        messages = request.get("messages") or []
+        answered_tool = bool(messages) and messages[-1].get("role") == "tool"
+        if cfg.tool_call and request.get("tools") and not answered_tool:
+            self._write(self._chunk({
+                "role": "assistant", "content": "",
+                "tool_calls": [{"function": {"name": "get_weather", "arguments": {"city": "Tokyo"}}}],
+            }))
+        else:
+            interval = 1.0 / cfg.token_rate if cfg.token_rate > 0 else 0.0
+            text, step = cfg.reply, max(1, cfg.token_chars)
+            for i in range(0, len(text), step):
+                self._write(self._chunk({"role": "assistant", "content": text[i:i + step]}))
+                if interval:
+                    time.sleep(interval)
+        self._write(self._chunk({"role": "assistant", "content": ""}, done=True))
+        self._write(b"")  # 结束 chunked 响应
+
+
+def start_stub_ollama(config) -> ThreadingHTTPServer:
+    handler = type("StubOllamaHandler", (_StubOllamaHandler,), {"config": config})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+# ---------- 假 ASR / TTS / MCP ----------
+class _AsrResult:
+    def __init__(self, text: str):
+        self.text = text
+        self.language = "Chinese"
+
+
+class FakeASR:
+    def __init__(self, delay_ms: float):
+        self.delay = delay_ms / 1000
+
+    def transcribe(self, audio, language=None):
+        time.sleep(self.delay)
+        return [_AsrResult("明天东京的天气怎么样？")]
+
+
+class FakeTTS:
+    """Qwen TTS 式的批量合成器：每批耗时 = 固定开销 + 每字耗时 × 字数，输出正弦波"""
+
+    streaming = False
+
+    def __init__(self, sample_rate: int, fixed_ms: float, ms_per_char: float, audio_sec_per_char: float):
+        self.sample_rate = sample_rate
+        self.fixed = fixed_ms / 1000
+        self.per_char = ms_per_char / 1000
+        self.audio_sec_per_char = audio_sec_per_char
+        self.busy_seconds = 0.0
+        self.audio_seconds = 0.0
+        self.batches = []
+
+    def cache_key(self, sentence: str) -> str:
+        return sentence
+
+    def synthesize(self, sentences: list):
+        chars = sum(len(s) for s in sentences)
+        cost = self.fixed + self.per_char * chars
+        time.sleep(cost)
+        self.busy_seconds += cost
+        self.batches.append(len(sentences))
+        wavs = []
+        for s in sentences:
+            n = int(len(s) * self.audio_sec_per_char * self.sample_rate)
+            t = np.arange(n, dtype=np.float32) / self.sample_rate
+            wavs.append((0.2 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32))
+            self.audio_seconds += n / self.sample_rate
+        return wavs, self.sample_rate
+
+
+class NullSink:
+    """不出声的播放器：按 playback_speed 倍实时速率从环形缓冲区取数据"""
+
+    def __init__(self, playback_speed: float, blocksize: int = PLAYBACK_BLOCK):
+        self.speed = playback_speed
+        self.blocksize = blocksize
+        self.first_audio_at = None
+        self.finished_at = None
+        self.underruns = 0
+        self.samples = 0
+
+    def __call__(self, ring, sample_rate: int) -> None:
+        out = np.zeros(self.blocksize, dtype=np.float32)
+        period = self.blocksize / sample_rate / self.speed if self.speed > 0 else 0.0
+        next_tick = time.perf_counter()
+        starving = False  # 连续取不满的块只计一次欠载
+        while True:
+            n = ring.read_into(out)
+            if n and self.first_audio_at is None:
+                self.first_audio_at = time.perf_counter()
+            self.samples += n
+            if n < self.blocksize:
+                if ring.drained:
+                    break
+                if self.first_audio_at is not None and not starving:
+                    self.underruns += 1
+                starving = True
+            else:
+                starving = False
+            if period:
+                next_tick += period
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            elif n == 0:
+                time.sleep(0.001)
+        self.finished_at = time.perf_counter()
+
+
+# ---------- 一轮对话 ----------
+def run_turn(args, engine, conversation, asr, tts) -> dict:
+    """与 `_voice_pipeline` 相同的步骤：识别 → 写入用户消息 → 回复并朗读"""
+    sink = NullSink(args.playback_speed)
+    marks = {}
+    batches_before = len(tts.synth_batches())
+    t0 = time.perf_counter()
+
+    text, _ = transcribe(asr, np.zeros(16000, dtype=np.float32), 16000)
+    marks["asr"] = time.perf_counter()
+
+    with conversation.turn() as turn:
+        turn.append({"role": "user", "content": text})
+        ring_high = []
+
+        def player(ring, sr):
+            sink(ring, sr)
+            ring_high.append(ring.high_water)
+
+        content = reply_and_speak(
+            engine, turn,
+            lambda batches, total=None: speak(batches, tts, player=player, total=total),
+            streaming=args.mode == "streaming",
+            max_len=args.max_len,
+            on_reply=lambda c: marks.setdefault("llm_done", time.perf_counter()),
+        )
+    t_end = time.perf_counter()
+    batches = tts.synth_batches()[batches_before:]
+    return {
+        "asr_ms": (marks["asr"] - t0) * 1000,
+        "ttfa_ms": (sink.first_audio_at - t0) * 1000 if sink.first_audio_at else float("nan"),
+        "llm_done_ms": (marks.get("llm_done", t_end) - t0) * 1000,
+        "e2e_ms": (t_end - t0) * 1000,
+        "audio_s": sink.samples / args.sample_rate,
+        "underruns": sink.underruns,
+        "tts_batches": batches,
+        "ring_high_water": ring_high[0] if ring_high else 0,
+        "reply_chars": len(content),
+    }
+
+
+def _percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+class _BenchTTS(CachedSynthesizer):
+    """不带缓存的 CachedSynthesizer（走与脚本相同的合成入口），并暴露假 TTS 的批次记录"""
+
+    def synth_batches(self) -> list:
+        return self.synthesizer.batches
+
+
+def main():
+    args = _parse_args()
+    httpd = start_stub_ollama(args)
+    host = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    tool_dispatcher = ToolDispatcher(lambda name, arguments: (time.sleep(args.tool_ms / 1000), "晴，23℃")[1])
+    tools = [{"type": "function", "function": {"name": "get_weather", "description": "查询天气",
+                                                "parameters": {"type": "object", "properties": {}}}}]
+    engine = TurnEngine(ollama.Client(host=host), "stub", tool_dispatcher, tools=lambda: tools)
+    conversation = ConversationStore(list).session()
+    asr = FakeASR(args.asr_ms)
+    fake_tts = FakeTTS(args.sample_rate, args.tts_fixed_ms, args.tts_ms_per_char, args.audio_sec_per_char)
+    tts = _BenchTTS(fake_tts)
+
+    if not args.json:
+        print(f"[Bench] 模式={args.mode} 轮数={args.turns} token 速率={args.token_rate}/s 首 token={args.first_token_ms}ms "
+              f"工具调用={'是' if args.tool_call else '否'} TTS={args.tts_fixed_ms}ms+{args.tts_ms_per_char}ms/字 "
+              f"播放速度={args.playback_speed or '不限'}")
+    results = []
+    wall0 = time.perf_counter()
+    for i in range(args.turns):
+        if args.verbose:
+            r = run_turn(args, engine, conversation, asr, tts)
+        else:
+            # 流水线各阶段的 print 日志会干扰计时输出
+            with contextlib.redirect_stdout(io.StringIO()):
+                r = run_turn(args, engine, conversation, asr, tts)
+        results.append(r)
+        if not args.json:
+            print(f"[Bench] 第 {i + 1} 轮: TTFA={r['ttfa_ms']:.0f}ms LLM 完成={r['llm_done_ms']:.0f}ms "
+                  f"端到端={r['e2e_ms']:.0f}ms 音频={r['audio_s']:.1f}s 欠载={r['underruns']} "
+                  f"TTS 批次={r['tts_batches']}")
+    wall = time.perf_counter() - wall0
+    httpd.shutdown()
+    tool_dispatcher.shutdown()
+
+    def summary(key):
+        values = [r[key] for r in results]
+        return {"p50": _percentile(values, 50), "p95": _percentile(values, 95),
+                "mean": statistics.mean(values), "max": max(values)}
+
+    batch_sizes = [b for r in results for b in r["tts_batches"]]
+    report = {
+        "mode": args.mode,
+        "turns": args.turns,
+        "ttfa_ms": summary("ttfa_ms"),
+        "e2e_ms": summary("e2e_ms"),
+        "llm_done_ms": summary("llm_done_ms"),
+        "underruns": sum(r["underruns"] for r in results),
+        "tts_batch_size": {"mean": statistics.mean(batch_sizes) if batch_sizes else 0,
+                           "max": max(batch_sizes, default=0)},
+        "ring_high_water_samples": max(r["ring_high_water"] for r in results),
+        "turns_per_s": args.turns / wall,
+        "tts_realtime_factor": fake_tts.busy_seconds / fake_tts.audio_seconds if fake_tts.audio_seconds else 0.0,
+    }
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    for key, label in (("ttfa_ms", "首个音频 TTFA"), ("llm_done_ms", "LLM 完成"), ("e2e_ms", "整轮端到端")):
+        s = report[key]
+        print(f"[Bench] {label}: p50={s['p50']:.0f}ms p95={s['p95']:.0f}ms mean={s['mean']:.0f}ms max={s['max']:.0f}ms")
+    print(f"[Bench] TTS 批次大小 mean={report['tts_batch_size']['mean']:.2f} max={report['tts_batch_size']['max']}，"
+          f"环形缓冲区高水位 {report['ring_high_water_samples']} 样本，欠载 {report['underruns']} 次")
+    print(f"[Bench] 吞吐 {report['turns_per_s']:.2f} 轮/s，TTS 实时率 {report['tts_realtime_factor']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""webpage_chat 负载测试：N 个并发 Socket.IO 客户端对接桩 assistant。
+
+在进程内启动 webpage_chat/server.py（不加载任何模型），注入一个桩 assistant：
+client.chat 固定耗时后返回一句回复（经由与桌面端相同的 TurnEngine）。每个客户端（独立会话）依次发送 M 条消息并等待回复，
+统计端到端延迟、吞吐，以及因工作线程池已满被拒绝（背压）的请求数。
+
+依赖 flask_socketio 和 python-socketio 客户端（websocket-client）。
+
+用法（在仓库根目录）:
+    python benchmarks/load_test_web_chat.py
+    python benchmarks/load_test_web_chat.py --clients 50 --messages 5 --llm-latency 0.5 --workers 4 --max-pending 16
+    python benchmarks/load_test_web_chat.py --standalone-runtime eventlet   # 测 python server.py 独立运行时的服务器
+
+默认与桌面端嵌入运行时一致：threading 运行时（Werkzeug），不 monkey patch。
+--standalone-runtime 只对应独立运行 server.py 的部署方式，结果不代表嵌入桌面端时的表现。
+"""
+
+import argparse
+import os
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="并发客户端数")
+    parser.add_argument("--messages", type=int, default=3, help="每个客户端发送的消息数")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="桩 LLM 每次调用的耗时（秒）")
+    parser.add_argument("--workers", type=int, default=4, help="服务端工作线程数 (WEB_CHAT_WORKERS)")
+    parser.add_argument("--max-pending", type=int, default=16, help="服务端排队上限 (WEB_CHAT_MAX_PENDING)")
+    parser.add_argument("--port", type=int, default=5199)
+    parser.add_argument("--timeout", type=float, default=60.0, help="单条消息等待回复的超时（秒）")
+    parser.add_argument("--standalone-runtime", choices=("eventlet", "gevent"), default=None,
+                        help="改为测试独立运行 server.py 时的异步服务器（在其他 import 之前 monkey patch）")
+    return parser.parse_args()
+
+
+ARGS = _parse_args()
+# 只有显式要求测试独立运行模式时才 monkey patch，必须在其他 import 之前
+if ARGS.standalone_runtime == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+elif ARGS.standalone_runtime == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
+import statistics  # noqa: E402
+import sys  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "webpage_chat"))
+
+# 必须在 import server 之前设置，server 在导入时读取这些配置
+os.environ["WEB_CHAT_ASYNC_MODE"] = ARGS.standalone_runtime or "threading"
+os.environ["WEB_CHAT_WORKERS"] = str(ARGS.workers)
+os.environ["WEB_CHAT_MAX_PENDING"] = str(ARGS.max_pending)
+
+import socketio  # noqa: E402  python-socketio 客户端
+
+import server  # noqa: E402
+from assistant_core.conversation import ConversationStore  # noqa: E402
+from assistant_core.engine import TurnEngine  # noqa: E402
+
+
+# ---------- 桩 assistant ----------
+class _StubSignal:
+    def emit(self, *args):
+        pass
+
+
+class _StubComm:
+    append_chat = _StubSignal()
+
+
+class _StubLLM:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def chat(self, model=None, messages=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        message = {"role": "assistant", "content": f"收到 {len(messages or [])} 条消息"}
+        if kwargs.get("stream"):
+            return iter([{"message": message}])
+        return {"message": message}
+
+
+class StubAssistant:
+    model_name = "stub"
+    tools = []
+    tool_dispatcher = None
+    _models_loaded = False  # 语音事件直接返回“模型未加载”
+
+    def __init__(self, latency: float):
+        self.client = _StubLLM(latency)
+        self.comm = _StubComm()
+        self.conversations = ConversationStore(list)
+        self.engine = TurnEngine(self.client, self.model_name)
+
+
+# ---------- 客户端 ----------
+def _client_worker(idx: int, url: str, results: dict, lock: threading.Lock):
+    sio = socketio.Client(reconnection=False, ssl_verify=False)
+    reply = threading.Event()
+    outcome = {}
+
+    @sio.on("chat_message")
+    def _on_message(msg):
+        if msg.get("sender") == "AI":
+            outcome["kind"] = "ok"
+            reply.set()
+        elif msg.get("sender") == "System":
+            outcome["kind"] = "overloaded" if "繁忙" in msg.get("content", "") else "busy"
+            reply.set()
+
+    @sio.on("chat_commit")
+    def _on_commit(d):
+        # 文字回复以流式推送，结束时 chat_commit 带完整消息；中途失败时 message 为 None
+        msg = d.get("message")
+        if msg is None:
+            outcome["kind"] = "error"
+            reply.set()
+        elif msg.get("sender") == "AI":
+            outcome["kind"] = "ok"
+            reply.set()
+
+    try:
+        sio.connect(url, transports=["websocket"], wait_timeout=10)
+    except Exception as e:
+        with lock:
+            results["connect_failed"] += 1
+        print(f"[Load] 客户端 {idx} 连接失败: {e}")
+        return
+
+    try:
+        for n in range(ARGS.messages):
+            reply.clear()
+            outcome.clear()
+            t0 = time.perf_counter()
+            sio.emit("send_message", {"message": f"client {idx} message {n}"})
+            if not reply.wait(ARGS.timeout):
+                kind = "timeout"
+            else:
+                kind = outcome.get("kind", "ok")
+            elapsed = time.perf_counter() - t0
+            with lock:
+                results[kind] += 1
+                if kind == "ok":
+                    results["latencies"].append(elapsed)
+    finally:
+        sio.disconnect()
+
+
+def _percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def main():
+    assistant = StubAssistant(ARGS.llm_latency)
+    server.set_assistant(assistant)
+    server.start_server(host="127.0.0.1", port=ARGS.port, use_https=False)
+    time.sleep(1.0)  # 等待服务端开始监听
+
+    url = f"http://127.0.0.1:{ARGS.port}"
+    results = {"ok": 0, "busy": 0, "overloaded": 0, "error": 0, "timeout": 0, "connect_failed": 0, "latencies": []}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=_client_worker, args=(i, url, results, lock), daemon=True)
+        for i in range(ARGS.clients)
+    ]
+    print(f"[Load] 运行时={server.ASYNC_MODE} 客户端={ARGS.clients} 每客户端消息={ARGS.messages} "
+          f"LLM 耗时={ARGS.llm_latency}s 工作线程={ARGS.workers} 排队上限={ARGS.max_pending}")
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    lat = results["latencies"]
+    total = ARGS.clients * ARGS.messages
+    print(f"[Load] 总请求 {total}，耗时 {wall:.2f}s，成功 {results['ok']} ({results['ok'] / wall:.1f} req/s)")
+    print(f"[Load] 拒绝(服务器繁忙) {results['overloaded']}，会话忙 {results['busy']}，"
+          f"失败 {results['error']}，超时 {results['timeout']}，连接失败 {results['connect_failed']}")
+    if lat:
+        print(f"[Load] 延迟 p50={_percentile(lat, 50) * 1000:.0f}ms p95={_percentile(lat, 95) * 1000:.0f}ms "
+              f"max={max(lat) * 1000:.0f}ms mean={statistics.mean(lat) * 1000:.0f}ms")
+    print(f"[Load] 工作线程池: {server._worker_pool.stats()}，LLM 调用 {assistant.client.calls} 次")
+    # 理论上限：workers 个请求并行，每个耗时 llm_latency
+    print(f"[Load] 理论吞吐上限 ≈ {ARGS.workers / ARGS.llm_latency:.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
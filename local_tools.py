@@ -1,6 +1,7 @@
 from datetime import datetime
 import os
 import subprocess
+import threading
 from urllib.parse import urlparse
 import webbrowser
 
@@ -285,7 +286,7 @@ def memo_create(content: str, title: str = "", timestamp: str = ""):
 
 @mcp.tool(
     name="memo_list",
-    description="列出备忘录文件，支持 year/month 过滤。include_todo=true 时包含 todo.md。",
+    description="按更新时间从新到旧列出备忘录（路径、标题、创建/更新时间、大小），支持 year/month 过滤。include_todo=true 时包含 todo.md。",
 )
 def memo_list(year: int | None = None, month: int | None = None, limit: int = 100, include_todo: bool = False):
     return _memo_call(
@@ -297,6 +298,22 @@ def memo_list(year: int | None = None, month: int | None = None, limit: int = 10
     )
 
 
+@mcp.tool(
+    name="memo_search",
+    description="按关键词全文检索备忘录（含 todo.md），按相关度返回路径、标题和摘要。多个关键词用空格分隔，支持 year/month 过滤。查找备忘录内容时优先使用此工具，再用 memo_read 读取全文。",
+)
+def memo_search(query: str, year: int | None = None, month: int | None = None, limit: int = 10):
+    return _memo_call(memo_store.search_memos, query=query, year=year, month=month, limit=limit)
+
+
+@mcp.tool(
+    name="memo_semantic_search",
+    description="按语义相似度检索备忘录（含 todo.md），每个备忘录返回最相关的一段原文。适合用一句话描述要找的内容；找到的片段通常已足够回答，不必再逐个 memo_read。",
+)
+def memo_semantic_search(query: str, year: int | None = None, month: int | None = None, limit: int = 5):
+    return _memo_call(memo_store.semantic_search_memos, query=query, year=year, month=month, limit=limit)
+
+
 @mcp.tool(
     name="memo_read",
     description="读取备忘录内容。path 使用相对路径，例如 2026/02/20260212_093000.md 或 todo.md。",
@@ -307,7 +324,7 @@ def memo_read(path: str):
 
 @mcp.tool(
     name="memo_update",
-    description="更新指定备忘录。mode 仅支持 replace(覆盖)、append(追加)、prepend(前插)。需要直接调用工具，不要把调用参数当普通文本回复。",
+    description="更新指定备忘录。mode 仅支持 replace(覆盖正文)、append(追加)、prepend(在正文开头插入)，标题和创建时间保持不变。需要直接调用工具，不要把调用参数当普通文本回复。",
 )
 def memo_update(path: str, content: str, mode: str = "replace"):
     return _memo_call(memo_store.update_memo, path=path, content=content, mode=mode)
@@ -342,4 +359,6 @@ def clear_chat(confirm: bool = True):
 
 
 if __name__ == "__main__":
+    # 后台同步备忘录检索索引，不阻塞 MCP 握手
+    threading.Thread(target=memo_store.sync_index, daemon=True).start()
     mcp.run()
@@ -0,0 +1,73 @@
+"""ChatView：流式消息进行中插入其他消息时，delta、结束渲染和移除只作用于流式消息本身。"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+
+from assistant_core.chat_view import ChatView  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def make_view(app, **kwargs):
+    display = QtWidgets.QTextEdit()
+    return ChatView(display, markdown_enabled=lambda: False, render_interval_ms=0, **kwargs)
+
+
+def lines(view):
+    return view.display.document().toPlainText().split("\n")
+
+
+def test_deltas_after_interleaved_message_stay_in_stream(app):
+    view = make_view(app)
+    view.append_message("Me", "hello")
+    view.begin_stream("AI")
+    view.append_delta("第一句。")
+    view.append_message("System", "正在合成语音 (1)...")
+    view.append_delta("第二句。")
+    assert lines(view) == ["Me: hello", "AI: 第一句。第二句。", "System: 正在合成语音 (1)..."]
+
+    view.end_stream("第一句。第二句。完")
+    assert lines(view) == ["Me: hello", "AI: 第一句。第二句。完", "System: 正在合成语音 (1)..."]
+
+
+def test_reset_only_clears_stream_body(app):
+    view = make_view(app)
+    view.begin_stream("AI")
+    view.append_delta("tool output")
+    view.append_message("System", "status")
+    view.reset_stream()
+    view.append_delta("answer")
+    view.end_stream()
+    assert lines(view) == ["AI: answer", "System: status"]
+
+
+@pytest.mark.parametrize("first", [True, False])
+def test_aborted_stream_removes_itself_not_last_message(app, first):
+    view = make_view(app)
+    if not first:
+        view.append_message("Me", "hello")
+    view.begin_stream("AI")
+    view.append_message("System", "status")
+    view.end_stream("")
+    expected = ["System: status"] if first else ["Me: hello", "System: status"]
+    assert lines(view) == expected
+    view.append_message("Me", "next")
+    assert lines(view) == expected + ["Me: next"]
+
+
+def test_eviction_keeps_active_stream(app):
+    view = make_view(app, max_messages=2)
+    view.begin_stream("AI")
+    view.append_message("System", "a")
+    view.append_message("System", "b")
+    view.append_delta("streaming")
+    assert lines(view) == ["AI: streaming", "System: a", "System: b"]
+    view.end_stream()
+    assert lines(view) == ["System: a", "System: b"]
@@ -0,0 +1,76 @@
+"""ConcurrencyLimitedClient：流式结果无论被耗尽、中途丢弃还是从未迭代，许可都会归还。"""
+
+import gc
+
+import pytest
+
+from assistant_core.llm_limiter import ConcurrencyLimitedClient
+
+
+class StubClient:
+    def __init__(self, chunks=3, fail_at=None):
+        self.chunks = chunks
+        self.fail_at = fail_at
+        self.requests = 0
+
+    def chat(self, model=None, messages=None, stream=False):
+        if not stream:
+            self.requests += 1
+            return {"message": {"content": "ok"}}
+        return self._stream()
+
+    def _stream(self):
+        self.requests += 1
+        for i in range(self.chunks):
+            if i == self.fail_at:
+                raise ConnectionError("stream broken")
+            yield {"message": {"content": str(i)}}
+
+
+def free_permits(limited):
+    return limited._sem._value
+
+
+def test_unstarted_stream_holds_no_permit():
+    stub = StubClient()
+    limited = ConcurrencyLimitedClient(stub, max_concurrent=1)
+    stream = limited.chat(model="m", messages=[], stream=True)
+    assert free_permits(limited) == 1 and stub.requests == 0
+    del stream
+    gc.collect()
+    assert free_permits(limited) == 1
+
+
+def test_exhausted_stream_releases_permit():
+    limited = ConcurrencyLimitedClient(StubClient(), max_concurrent=1)
+    stream = limited.chat(model="m", messages=[], stream=True)
+    next(stream)
+    assert free_permits(limited) == 0
+    assert [c["message"]["content"] for c in stream] == ["1", "2"]
+    assert free_permits(limited) == 1
+
+
+def test_abandoned_and_closed_streams_release_permit():
+    limited = ConcurrencyLimitedClient(StubClient(), max_concurrent=1)
+    stream = limited.chat(model="m", messages=[], stream=True)
+    next(stream)
+    del stream
+    gc.collect()
+    assert free_permits(limited) == 1
+
+    stream = limited.chat(model="m", messages=[], stream=True)
+    next(stream)
+    stream.close()
+    assert free_permits(limited) == 1
+    with pytest.raises(StopIteration):
+        next(stream)
+
+
+def test_failed_stream_and_plain_chat_release_permit():
+    limited = ConcurrencyLimitedClient(StubClient(fail_at=1), max_concurrent=1)
+    stream = limited.chat(model="m", messages=[], stream=True)
+    with pytest.raises(ConnectionError):
+        list(stream)
+    assert free_permits(limited) == 1
+    assert limited.chat(model="m", messages=[])["message"]["content"] == "ok"
+    assert free_permits(limited) == 1
@@ -0,0 +1,43 @@
+"""TTSCache：删除失败（Windows 上文件仍被映射）的淘汰文件继续计入总大小，并在下次淘汰时重试。"""
+
+from pathlib import Path
+
+import numpy as np
+
+from assistant_core.tts_cache import TTSCache
+
+
+def test_failed_unlink_is_counted_and_retried(tmp_path, monkeypatch):
+    wav = np.zeros(1000, dtype=np.float32)
+    cache = TTSCache(tmp_path, max_bytes=int(wav.nbytes * 2.5))
+    cache.put("a" * 40, wav, 24000)
+    cache.put("b" * 40, wav, 24000)
+    locked = cache._disk["a" * 40][0]
+
+    real_unlink = Path.unlink
+
+    def unlink(self, *args, **kwargs):
+        if self == locked:
+            raise PermissionError("file is mapped")
+        return real_unlink(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "unlink", unlink)
+    cache.put("c" * 40, wav, 24000)  # 超出上限，淘汰 a 但删除失败
+    assert locked.exists()
+    # a 的文件仍占用磁盘空间，为守住上限 b 也被淘汰
+    assert cache.stats()["disk_entries"] == 1
+    assert cache.stats()["disk_bytes"] == sum(p.stat().st_size for p in tmp_path.glob("*/*.npy"))
+
+    monkeypatch.setattr(Path, "unlink", real_unlink)
+    cache.put("d" * 40, wav, 24000)  # 下次淘汰时重试删除
+    assert not locked.exists()
+    assert cache.stats()["disk_bytes"] == sum(p.stat().st_size for p in tmp_path.glob("*/*.npy"))
+    assert cache.stats()["disk_bytes"] <= cache.max_bytes
+
+
+def test_small_entries_are_read_into_memory(tmp_path):
+    cache = TTSCache(tmp_path)
+    cache.put("e" * 40, np.ones(100, dtype=np.float32), 24000)
+    reopened = TTSCache(tmp_path)
+    wav, sr = reopened.get("e" * 40)
+    assert sr == 24000 and not isinstance(wav, np.memmap) and not wav.flags.writeable
@@ -0,0 +1,51 @@
+"""speak：播放器异常退出时 TTS 线程不会在写满的环形缓冲区上永久等待。"""
+
+import threading
+
+import numpy as np
+
+from assistant_core.audio_ring import DEFAULT_CAPACITY, AudioRingBuffer
+from assistant_core.voice_pipeline import speak
+
+
+class LongTTS:
+    """每句返回超过环形缓冲区容量的音频"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize(self, sentences):
+        self.calls += 1
+        return [np.zeros(DEFAULT_CAPACITY + 24000, dtype=np.float32) for _ in sentences], 24000
+
+
+def _run(target, timeout=5.0):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def test_speak_returns_when_player_raises():
+    tts = LongTTS()
+
+    def broken_player(ring, sr):
+        raise OSError("device unavailable")
+
+    assert _run(lambda: speak([["一"], ["二"], ["三"]], tts, player=broken_player))
+    assert tts.calls == 1  # 播放中止后不再合成后续批次
+
+
+def test_speak_returns_when_player_dies_mid_playback():
+    def partial_player(ring, sr):
+        ring.read_into(np.zeros(4096, dtype=np.float32))
+        raise RuntimeError("device unplugged")
+
+    assert _run(lambda: speak([["一"]], LongTTS(), player=partial_player))
+
+
+def test_ring_write_returns_after_abort():
+    ring = AudioRingBuffer(capacity=8)
+    threading.Timer(0.1, ring.abort).start()
+    assert ring.write(np.ones(32, dtype=np.float32)) == 8  # 写满 8 个后等待，abort 时返回
+    assert ring.aborted
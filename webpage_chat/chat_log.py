@@ -0,0 +1,178 @@
+"""Web 聊天记录：容量受限的环形缓冲区 + 可选的追加写归档文件。
+
+每条消息带单调递增的 id。客户端重连时带上最后看到的 id，只接收增量；
+向上滚动时按 id 分页拉取更早的记录。内存中只保留最近 capacity 条，
+启用 spill_path 时所有消息同时追加写入 JSONL 归档，超出内存范围的分页从归档中读取
+（内存里只保存每条记录在文件中的偏移量），重启后也会从归档恢复。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_CAPACITY = 500  # 内存中保留的消息条数
+DEFAULT_PAGE_SIZE = 50
+
+
+class ChatLog:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, spill_path: str | None = None):
+        if capacity <= 0:
+            raise ValueError("Capacity must be greater than 0.")
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self._lock = threading.Lock()
+        self._messages: deque[dict] = deque(maxlen=capacity)
+        self._next_id = 1
+        self._floor_id = 1  # clear() 之后，更早的消息不再返回
+        # 归档中每条消息的文件偏移量：_offsets[i] 对应 id = _offset_base + i
+        self._offsets: list[int] = []
+        self._offset_base = 1
+        if spill_path:
+            os.makedirs(os.path.dirname(os.path.abspath(spill_path)), exist_ok=True)
+            self._load_spill()
+
+    # ---------- 写入 ----------
+    def append(self, sender: str, content: str, timestamp: float | None = None) -> dict:
+        with self._lock:
+            msg = {
+                "id": self._next_id,
+                "sender": sender,
+                "content": content,
+                "timestamp": timestamp if timestamp is not None else time.time(),
+            }
+            self._next_id += 1
+            self._messages.append(msg)
+            if self.spill_path:
+                self._spill(msg)
+            return msg
+
+    def clear(self) -> None:
+        """清空对话显示；id 继续递增，归档中记录清空点"""
+        with self._lock:
+            self._messages.clear()
+            self._floor_id = self._next_id
+            if self.spill_path:
+                self._spill({"clear": True, "id": self._floor_id})
+
+    # ---------- 读取 ----------
+    @property
+    def last_id(self) -> int:
+        return self._next_id - 1
+
+    def since(self, last_id: int | None, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """重连增量：返回 id > last_id 的消息。
+
+        last_id 为空、比当前记录更新（服务端重启）、增量超过 limit 或中间记录已被淘汰时，
+        返回最近 limit 条并标记 reset，客户端应整体替换显示。
+        """
+        with self._lock:
+            newest = self._next_id - 1
+            reset = (
+                last_id is None
+                or last_id > newest
+                or last_id < self._floor_id - 1
+                or newest - last_id > limit
+                # 中间有消息已被挤出内存
+                or (self._messages and last_id < self._messages[0]["id"] - 1)
+            )
+            if reset:
+                messages = self._tail(limit)
+            else:
+                messages = [m for m in self._messages if m["id"] > last_id]
+            first = messages[0]["id"] if messages else self._next_id
+            return {
+                "messages": messages,
+                "reset": reset,
+                "hasMore": self._has_before(first),
+                "lastId": newest,
+            }
+
+    def page(self, before_id: int, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """向上翻页：返回 id < before_id 的最多 limit 条消息（按时间顺序）"""
+        with self._lock:
+            start = max(self._floor_id, before_id - limit)
+            messages = self._range(start, before_id)
+            return {"messages": messages, "hasMore": self._has_before(start)}
+
+    # ---------- 内部 ----------
+    def _tail(self, limit: int) -> list[dict]:
+        if limit <= 0:
+            return []
+        return [m for m in list(self._messages)[-limit:] if m["id"] >= self._floor_id]
+
+    def _has_before(self, first_id: int) -> bool:
+        oldest = self._offset_base if self.spill_path and self._offsets else (
+            self._messages[0]["id"] if self._messages else self._next_id
+        )
+        return first_id > max(self._floor_id, oldest)
+
+    def _range(self, start: int, end: int) -> list[dict]:
+        """返回 start <= id < end 的消息，内存中没有的部分从归档读取"""
+        if start >= end:
+            return []
+        mem_first = self._messages[0]["id"] if self._messages else self._next_id
+        result: list[dict] = []
+        if start < mem_first and self.spill_path:
+            result.extend(self._read_spill(start, min(end, mem_first)))
+        result.extend(m for m in self._messages if start <= m["id"] < end)
+        return result
+
+    def _spill(self, record: dict) -> None:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with open(self.spill_path, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+        except OSError as e:
+            print(f"[ChatLog] 写入归档失败: {e}")
+            offset = -1  # 占位，保持 id 与偏移量下标一一对应
+        if "clear" in record:
+            return
+        if not self._offsets:
+            self._offset_base = record["id"]
+        self._offsets.append(offset)
+
+    def _read_spill(self, start: int, end: int) -> list[dict]:
+        lo = max(start, self._offset_base) - self._offset_base
+        hi = min(end - self._offset_base, len(self._offsets))
+        if lo >= hi:
+            return []
+        result = []
+        try:
+            with open(self.spill_path, "rb") as f:
+                for offset in self._offsets[lo:hi]:
+                    if offset < 0:
+                        continue
+                    f.seek(offset)
+                    result.append(json.loads(f.readline()))
+        except (OSError, ValueError) as e:
+            print(f"[ChatLog] 读取归档失败: {e}")
+        return result
+
+    def _load_spill(self) -> None:
+        """启动时扫描归档：重建偏移索引、恢复 id 计数和最近的消息"""
+        if not os.path.isfile(self.spill_path):
+            return
+        offset = 0
+        with open(self.spill_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    offset += len(line)
+                    continue
+                if record.get("clear"):
+                    self._floor_id = record["id"]
+                    self._messages.clear()
+                else:
+                    if not self._offsets:
+                        self._offset_base = record["id"]
+                    self._offsets.append(offset)
+                    self._messages.append(record)
+                    self._next_id = record["id"] + 1
+                offset += len(line)
+        self._next_id = max(self._next_id, self._floor_id)
@@ -1,21 +1,138 @@
 """
-Web Chat Server — 与 AIAssistant (PyQt) 共享对话的 WebSocket 服务
+Web Chat Server — AIAssistant (PyQt) 的 WebSocket 聊天服务
+每个浏览器（会话 cookie）拥有独立的对话；设置 WEB_CHAT_SHARE_DESKTOP=1 时与桌面端共享对话。
 可独立运行，也可由 ai_assistant.py 集成启动。
 支持 HTTPS（自签名证书），使局域网 / Tailscale 手机端可使用麦克风等安全 API。
 """
 
-import threading, asyncio, json, time, os, ssl
-from flask import Flask, render_template, send_from_directory, request
-from flask_socketio import SocketIO, emit
+import os
+
+# ---------- 运行时 ----------
+# threading: Werkzeug 开发服务器 + 原生线程。嵌入桌面端进程（start_server）时固定使用这种：
+#            PyQt / torch 的线程不能被 monkey patch，Werkzeug 以 allow_unsafe_werkzeug=True 显式启用，
+#            只应监听局域网 / Tailscale，不要直接暴露到公网
+# eventlet / gevent: 仅用于独立运行（python server.py）的生产级异步服务器，需在其他 import 之前 monkey patch
+ASYNC_MODE = os.environ.get("WEB_CHAT_ASYNC_MODE", "threading")
+if __name__ == "__main__" and ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+elif __name__ == "__main__" and ASYNC_MODE == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
+import threading, json, time, ssl, uuid, re, hashlib
+from flask import Flask, render_template, send_from_directory, request, make_response
+from flask_socketio import SocketIO, emit, join_room
+
+from chat_log import ChatLog, DEFAULT_PAGE_SIZE
+from worker_pool import BoundedWorkerPool
+
+
+def _resolve_async_mode(mode: str) -> str:
+    """eventlet / gevent 只有在进程已被 monkey patch 时才可用（即独立运行），否则退回 threading（Werkzeug）"""
+    if mode == "threading":
+        return mode
+    try:
+        if mode == "eventlet":
+            import eventlet.patcher
+            patched = eventlet.patcher.is_monkey_patched("thread")
+        elif mode == "gevent":
+            from gevent import monkey
+            patched = monkey.is_module_patched("threading")
+        else:
+            print(f"[Web] 未知的运行时 {mode}，使用 threading")
+            return "threading"
+    except ImportError:
+        print(f"[Web] 未安装 {mode}，使用 threading")
+        return "threading"
+    if not patched:
+        print(f"[Web] {mode} 只支持独立运行 server.py；嵌入桌面端时使用 threading（Werkzeug 开发服务器）")
+        return "threading"
+    return mode
+
+
+ASYNC_MODE = _resolve_async_mode(ASYNC_MODE)
 
 # ---------- Flask / SocketIO ----------
 app = Flask(__name__, static_folder="static", template_folder="templates")
 app.config["SECRET_KEY"] = "ai-assistant-secret"
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE)
+
+# ---------- 会话配置 ----------
+# True: 所有 Web 客户端与桌面端共用同一对话；False: 每个浏览器（cookie）独立对话
+SHARE_WITH_DESKTOP = os.environ.get("WEB_CHAT_SHARE_DESKTOP", "0") == "1"
+SESSION_COOKIE = "chat_session"
+SESSION_COOKIE_MAX_AGE = 30 * 24 * 3600
+DESKTOP_SESSION = "default"  # 与 ConversationStore 的默认会话一致
+CHAT_LOG_CAPACITY = 500  # 每个会话在内存中保留的聊天记录条数
+STREAM_DELTA_INTERVAL = 0.05  # 流式回复的增量至少间隔该秒数合并推送一次
+# 设置后，各会话的完整聊天记录追加写入该目录下的 <session>.jsonl，内存中只保留最近 CHAT_LOG_CAPACITY 条
+CHAT_LOG_DIR = os.environ.get("WEB_CHAT_LOG_DIR") or None
+# 阻塞的 assistant 调用（LLM / ASR / TTS）在有界线程池中执行；运行 + 排队都满时拒绝新请求
+WEB_WORKERS = int(os.environ.get("WEB_CHAT_WORKERS", "4"))
+WEB_MAX_PENDING = int(os.environ.get("WEB_CHAT_MAX_PENDING", "16"))
+# 没有连接的 cookie 会话闲置超过该秒数后释放聊天记录和对话上下文（按 sid 划分的会话断开即释放）
+SESSION_IDLE_TTL = int(os.environ.get("WEB_CHAT_SESSION_TTL", str(24 * 3600)))
+SESSION_SWEEP_INTERVAL = 60  # 在新连接到来时检查闲置会话，至少间隔该秒数
 
 # ---------- 共享状态 ----------
 _assistant_ref = None        # 指向 AIAssistant 实例
-_chat_log: list[dict] = []   # [{sender, content, timestamp}, ...]
+_worker_pool = BoundedWorkerPool(WEB_WORKERS, WEB_MAX_PENDING, name="Web Worker")
+
+
+def _new_chat_log(session_id: str) -> ChatLog:
+    spill_path = None
+    if CHAT_LOG_DIR:
+        # 会话 id 来自 cookie，不能直接作为文件名
+        name = session_id if re.fullmatch(r"[A-Za-z0-9_-]{1,64}", session_id) else \
+            hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        spill_path = os.path.join(CHAT_LOG_DIR, f"{name}.jsonl")
+    return ChatLog(CHAT_LOG_CAPACITY, spill_path)
+
+
+_chat_log = _new_chat_log(DESKTOP_SESSION)  # 桌面端会话的聊天记录
+
+
+class WebSession:
+    """一个 Web 会话：独立的聊天记录、Socket.IO room 和进行中请求槽位。
+    对话上下文保存在 assistant.conversations 中同名的会话里。"""
+
+    def __init__(self, session_id: str, log: ChatLog | None = None, ephemeral: bool = False):
+        self.id = session_id
+        self.room = f"session:{session_id}"
+        self.log = log if log is not None else _new_chat_log(session_id)
+        self.ephemeral = ephemeral  # 按 sid 划分（没有 cookie）：连接断开后无法再回到该会话
+        self.connections = 0  # 由 _sessions_lock 保护
+        self.last_active = time.monotonic()
+        self._in_flight = threading.Lock()
+
+    @property
+    def shared_with_desktop(self) -> bool:
+        return self.id == DESKTOP_SESSION
+
+    def try_begin(self) -> bool:
+        """占用进行中槽位，同一会话同时只处理一个请求"""
+        return self._in_flight.acquire(blocking=False)
+
+    def end(self):
+        self._in_flight.release()
+        self.last_active = time.monotonic()
+        # 请求结束时连接可能已经断开：断开时因请求仍在进行而未释放的会话在这里释放
+        with _sessions_lock:
+            evict = self.ephemeral and self.connections == 0
+        if evict:
+            _evict_session(self)
+
+    @property
+    def busy(self) -> bool:
+        return self._in_flight.locked()
+
+
+_sessions: dict[str, WebSession] = {DESKTOP_SESSION: WebSession(DESKTOP_SESSION, _chat_log)}
+_sid_sessions: dict[str, str] = {}  # Socket.IO sid → session id
+_voice_uploads: dict[str, tuple] = {}  # Socket.IO sid → (WebSession, VoiceUpload) 进行中的流式语音上传
+_sessions_lock = threading.Lock()
+_last_sweep = time.monotonic()
 
 
 def set_assistant(assistant):
@@ -24,17 +141,162 @@ def set_assistant(assistant):
     _assistant_ref = assistant
 
 
+def _get_session(session_id: str, ephemeral: bool = False) -> WebSession:
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is None:
+            session = _sessions[session_id] = WebSession(session_id, ephemeral=ephemeral)
+        return session
+
+
+def _current_session() -> WebSession:
+    """当前 Socket.IO 请求所属的会话"""
+    with _sessions_lock:
+        session_id = _sid_sessions.get(request.sid, request.sid)
+    session = _get_session(session_id, ephemeral=session_id == request.sid)
+    session.last_active = time.monotonic()
+    return session
+
+
+def _evict_session(session: WebSession):
+    """释放会话的聊天记录和对话上下文（桌面端共享会话不释放）"""
+    if session.id == DESKTOP_SESSION:
+        return
+    with _sessions_lock:
+        if _sessions.get(session.id) is not session:
+            return
+        del _sessions[session.id]
+    if _assistant_ref is not None:
+        _assistant_ref.conversations.drop(session.id)
+
+
+def _sweep_idle_sessions():
+    """释放没有连接、没有进行中请求且闲置超过 SESSION_IDLE_TTL 的会话"""
+    global _last_sweep
+    now = time.monotonic()
+    with _sessions_lock:
+        if now - _last_sweep < SESSION_SWEEP_INTERVAL:
+            return
+        _last_sweep = now
+        idle = [
+            s for s in _sessions.values()
+            if s.id != DESKTOP_SESSION and s.connections == 0 and not s.busy
+            and now - s.last_active > SESSION_IDLE_TTL
+        ]
+    for session in idle:
+        _evict_session(session)
+    if idle:
+        print(f"[Web] 释放 {len(idle)} 个闲置会话，剩余 {len(_sessions)} 个")
+
+
+def post_message(session: WebSession, sender: str, content: str):
+    """写入会话聊天记录并发送给该会话的所有 Web 客户端"""
+    msg = session.log.append(sender, content)
+    socketio.emit("chat_message", msg, to=session.room)
+
+
 def broadcast_message(sender: str, content: str):
-    """从 PyQt 端广播消息到所有 Web 客户端"""
-    msg = {"sender": sender, "content": content, "timestamp": time.time()}
-    _chat_log.append(msg)
-    socketio.emit("chat_message", msg)
+    """从 PyQt 端广播消息到与桌面端共享对话的 Web 客户端"""
+    post_message(_sessions[DESKTOP_SESSION], sender, content)
+
+
+class MessageStream:
+    """向会话的 Web 客户端逐步推送一条消息（LLM 流式回复）。
+
+    chat_delta  {streamId, sender, delta, timestamp[, reset]}：增量文本，按 STREAM_DELTA_INTERVAL 合并发送；
+                reset 为 true 时客户端先清空已显示的内容（例如工具调用前的输出）
+    chat_commit {streamId, message}：写入聊天记录后的完整消息（带 id）；中途失败时 message 为 None
+    """
+
+    def __init__(self, session: WebSession, sender: str, on_commit=None):
+        self.session = session
+        self.sender = sender
+        self.stream_id = uuid.uuid4().hex
+        self.timestamp = time.time()
+        self._on_commit = on_commit  # on_commit(sender, content)，例如同步到 PyQt 端
+        self._parts: list[str] = []
+        self._unsent: list[str] = []
+        self._last_emit = 0.0
+        self._done = False
+
+    def delta(self, text: str):
+        if self._done or not text:
+            return
+        self._parts.append(text)
+        self._unsent.append(text)
+        now = time.monotonic()
+        if now - self._last_emit >= STREAM_DELTA_INTERVAL:
+            self._last_emit = now
+            self._flush()
+
+    def reset(self):
+        """丢弃已推送的内容，之后的增量从头开始显示"""
+        if self._done:
+            return
+        self._parts, self._unsent = [], []
+        self._emit_delta("", reset=True)
+
+    def _flush(self):
+        if not self._unsent:
+            return
+        delta, self._unsent = "".join(self._unsent), []
+        self._emit_delta(delta)
+
+    def _emit_delta(self, delta: str, reset: bool = False):
+        data = {
+            "streamId": self.stream_id,
+            "sender": self.sender,
+            "delta": delta,
+            "timestamp": self.timestamp,
+        }
+        if reset:
+            data["reset"] = True
+        try:
+            socketio.emit("chat_delta", data, to=self.session.room)
+        except Exception as e:
+            print(f"[Web] 推送 chat_delta 失败: {e}")
+
+    def commit(self, content: str | None = None) -> dict | None:
+        """结束流式推送：content 为空时使用已推送的全部增量"""
+        if self._done:
+            return None
+        self._done = True
+        content = "".join(self._parts) if content is None else content
+        msg = self.session.log.append(self.sender, content)
+        socketio.emit("chat_commit", {"streamId": self.stream_id, "message": msg}, to=self.session.room)
+        if self._on_commit is not None:
+            self._on_commit(self.sender, content)
+        return msg
+
+    def abort(self):
+        if self._done:
+            return
+        self._done = True
+        socketio.emit("chat_commit", {"streamId": self.stream_id, "message": None}, to=self.session.room)
+
+
+def broadcast_stream(sender: str) -> MessageStream:
+    """从 PyQt 端向与桌面端共享对话的 Web 客户端流式推送一条消息"""
+    return MessageStream(_sessions[DESKTOP_SESSION], sender)
+
+
+def _post_fn(session: WebSession):
+    """返回向会话发布消息的函数；共享会话同时同步到 PyQt 端"""
+    def post(sender, content):
+        post_message(session, sender, content)
+        if session.shared_with_desktop and _assistant_ref is not None:
+            _assistant_ref.comm.append_chat.emit(sender, content)
+    return post
 
 
 # ---------- Routes ----------
 @app.route("/")
 def index():
-    return render_template("index.html")
+    resp = make_response(render_template("index.html"))
+    if not request.cookies.get(SESSION_COOKIE):
+        # 会话 cookie：手机断线重连（sid 变化）后仍回到同一对话
+        resp.set_cookie(SESSION_COOKIE, uuid.uuid4().hex, max_age=SESSION_COOKIE_MAX_AGE, samesite="Lax")
+    return resp
 
 
 @app.route("/static/<path:filename>")
@@ -42,11 +304,96 @@ def static_files(filename):
     return send_from_directory("static", filename)
 
 
+@app.route("/api/traces")
+def voice_traces():
+    """最近若干轮语音对话的分阶段耗时（?limit=N，默认全部，从旧到新）"""
+    tracer = getattr(_assistant_ref, 'tracer', None)
+    try:
+        limit = int(request.args.get("limit", ""))
+    except ValueError:
+        limit = None
+    traces = tracer.recent(limit) if tracer is not None else []
+    resp = make_response(json.dumps({"traces": traces}, ensure_ascii=False))
+    resp.headers["Content-Type"] = "application/json; charset=utf-8"
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
 # ---------- SocketIO Events ----------
 @socketio.on("connect")
-def handle_connect():
-    # 发送历史记录给刚连接的客户端
-    emit("chat_history", _chat_log)
+def handle_connect(auth=None):
+    if SHARE_WITH_DESKTOP:
+        session_id = DESKTOP_SESSION
+    else:
+        # 没有 cookie（例如直接连接 Socket.IO）时退化为按 sid 划分会话
+        session_id = request.cookies.get(SESSION_COOKIE) or request.sid
+        if session_id == DESKTOP_SESSION:
+            session_id = request.sid
+    _sweep_idle_sessions()
+    with _sessions_lock:
+        # 取会话和登记连接在同一把锁内完成，避免刚取到的会话被并发的清理释放
+        session = _sessions.get(session_id)
+        if session is None:
+            session = _sessions[session_id] = WebSession(session_id, ephemeral=session_id == request.sid)
+        session.connections += 1
+        session.last_active = time.monotonic()
+        _sid_sessions[request.sid] = session_id
+    join_room(session.room)
+    # 重连时只发送客户端最后看到的 id 之后的增量；首次连接只发送最近一页
+    last_id = auth.get("lastId") if isinstance(auth, dict) else None
+    if not isinstance(last_id, int):
+        last_id = None
+    emit("chat_history", session.log.since(last_id))
+
+
+@socketio.on("load_history")
+def handle_load_history(data):
+    """向上滚动时分页加载更早的记录"""
+    data = data or {}
+    before_id = data.get("beforeId")
+    if not isinstance(before_id, int):
+        return
+    limit = min(int(data.get("limit") or DEFAULT_PAGE_SIZE), 200)
+    emit("chat_history_page", _current_session().log.page(before_id, limit))
+
+
+@socketio.on("disconnect")
+def handle_disconnect(*_):
+    _cancel_voice_upload(request.sid)
+    with _sessions_lock:
+        session_id = _sid_sessions.pop(request.sid, None)
+        session = _sessions.get(session_id) if session_id is not None else None
+        if session is None:
+            return
+        session.connections = max(0, session.connections - 1)
+        session.last_active = time.monotonic()
+        # 进行中的请求结束时（WebSession.end）再释放
+        evict = session.ephemeral and session.connections == 0 and not session.busy
+    if evict:
+        _evict_session(session)
+
+
+def _reject_busy(event: str):
+    if event == "voice_status":
+        emit("voice_status", {"status": "error", "message": "上一条请求仍在处理中，请稍候"})
+    else:
+        emit("chat_message", {
+            "sender": "System",
+            "content": "上一条消息仍在处理中，请稍候。",
+            "timestamp": time.time(),
+        })
+
+
+def _reject_overloaded(event: str):
+    """工作线程池已满（背压）：请求未被处理，提示客户端稍后重试"""
+    if event == "voice_status":
+        emit("voice_status", {"status": "error", "message": "服务器繁忙，请稍后再试"})
+    else:
+        emit("chat_message", {
+            "sender": "System",
+            "content": "服务器繁忙，请稍后再试。",
+            "timestamp": time.time(),
+        })
 
 
 @socketio.on("send_message")
@@ -63,20 +410,23 @@ def handle_send(data):
         })
         return
 
-    # 广播用户消息
-    broadcast_message("Web", user_text)
-    # 通知 PyQt 端更新显示
-    _assistant_ref.comm.append_chat.emit("Web", user_text)
+    session = _current_session()
+    if not session.try_begin():
+        _reject_busy("chat_message")
+        return
+
+    # 发布用户消息（共享会话同时通知 PyQt 端更新显示）
+    _post_fn(session)("Web", user_text)
 
-    # 后台线程处理 AI 逻辑（复用 assistant 的方法）
-    threading.Thread(
-        target=_process_from_web, args=(user_text,), daemon=True
-    ).start()
+    # 在工作线程池中处理 AI 逻辑（复用 assistant 的方法）
+    if not _worker_pool.try_submit(_process_from_web, session, user_text):
+        session.end()
+        _reject_overloaded("chat_message")
 
 
 @socketio.on("voice_input")
 def handle_voice_input(data):
-    """接收来自 Web 端的语音输入 (PCM float32, 16kHz)"""
+    """接收来自 Web 端的语音输入：{"codec", "sampleRate", "data", "accept"}（旧客户端为 float32 原始字节）"""
     if _assistant_ref is None:
         emit("voice_status", {"status": "error", "message": "AI 助手未连接"})
         return
@@ -84,72 +434,159 @@ def handle_voice_input(data):
         emit("voice_status", {"status": "error", "message": "语音模型尚未加载完成，请稍后再试"})
         return
 
-    sid = request.sid
+    session = _current_session()
+    if not session.try_begin():
+        _reject_busy("voice_status")
+        return
+
+    emit_fn = _voice_emit_fn(request.sid)
+
+    def _run():
+        try:
+            _assistant_ref.web_voice_pipeline(
+                data, emit_fn,
+                conversation=_assistant_ref.conversations.session(session.id),
+                post_fn=_post_fn(session),
+            )
+        finally:
+            session.end()
+
+    if not _worker_pool.try_submit(_run):
+        session.end()
+        _reject_overloaded("voice_status")
 
+
+def _voice_emit_fn(sid: str):
     def emit_fn(event, evt_data):
         socketio.emit(event, evt_data, to=sid)
+    return emit_fn
 
-    threading.Thread(
-        target=_assistant_ref.web_voice_pipeline,
-        args=(data, emit_fn),
-        daemon=True,
-    ).start()
 
+def _cancel_voice_upload(sid: str):
+    with _sessions_lock:
+        entry = _voice_uploads.pop(sid, None)
+    if entry is not None:
+        session, upload = entry
+        upload.cancel()
+        session.end()
 
-@socketio.on("clear_chat")
-def handle_clear(_=None):
-    global _chat_log
-    _chat_log.clear()
-    if _assistant_ref:
-        # 通过信号安全地通知 PyQt 主线程清空对话，不能直接调用 Qt GUI 方法
-        _assistant_ref.comm.append_chat.emit("__CLEAR__", "")
-    socketio.emit("chat_cleared")
 
+@socketio.on("voice_stream_start")
+def handle_voice_stream_start(meta):
+    """流式语音上传开始：{"codec", "sampleRate", "accept"}，此后逐帧接收并提前开始识别"""
+    if _assistant_ref is None:
+        emit("voice_status", {"status": "error", "message": "AI 助手未连接"})
+        return
+    if not getattr(_assistant_ref, '_models_loaded', False):
+        emit("voice_status", {"status": "error", "message": "语音模型尚未加载完成，请稍后再试"})
+        return
 
-# ---------- AI 处理 ----------
-def _process_from_web(user_input: str):
-    """复用 AIAssistant 的 AI 逻辑，处理来自 Web 的消息"""
-    a = _assistant_ref
-    if a is None:
+    sid = request.sid
+    _cancel_voice_upload(sid)  # 同一连接上未结束的旧上传直接作废
+    session = _current_session()
+    if not session.try_begin():
+        _reject_busy("voice_status")
         return
     try:
-        a.chat_history.append({"role": "user", "content": user_input})
+        upload = _assistant_ref.web_voice_stream_begin(meta)
+    except Exception as e:
+        session.end()
+        print(f"[Web] 无法开始语音上传: {e}")
+        emit("voice_status", {"status": "error", "message": "无法开始语音上传"})
+        return
+    with _sessions_lock:
+        _voice_uploads[sid] = (session, upload)
 
-        response = a.client.chat(
-            model=a.model_name if hasattr(a, 'model_name') else "dengcao/Qwen3-30B-A3B-Instruct-2507",
-            messages=a.chat_history,
-            tools=a.tools,
-            keep_alive=-1,
-        )
-        message = response.get("message", {})
-
-        if message.get("tool_calls"):
-            a.chat_history.append(message)
-            for tool_call in message["tool_calls"]:
-                t_name = tool_call["function"]["name"]
-                t_args = tool_call["function"]["arguments"]
-                print(f"[MCP Action via Web] 调用工具: {t_name} 参数: {t_args}")
-                output = asyncio.run(a.call_mcp_tool(t_name, t_args))
-                a.chat_history.append({"role": "tool", "content": str(output), "name": t_name})
-
-            final = a.client.chat(
-                model=a.model_name if hasattr(a, 'model_name') else "dengcao/Qwen3-30B-A3B-Instruct-2507",
-                messages=a.chat_history,
+
+@socketio.on("voice_stream_frame")
+def handle_voice_stream_frame(data):
+    with _sessions_lock:
+        entry = _voice_uploads.get(request.sid)
+    if entry is None or not isinstance(data, dict):
+        return
+    seq, payload = data.get("seq"), data.get("data")
+    if isinstance(seq, int) and isinstance(payload, (bytes, bytearray)):
+        entry[1].append(seq, payload)
+
+
+@socketio.on("voice_stream_end")
+def handle_voice_stream_end(data=None):
+    """流式上传结束：{"frames": 总帧数}，等齐所有帧后进入 LLM → TTS"""
+    sid = request.sid
+    with _sessions_lock:
+        entry = _voice_uploads.get(sid)
+    if entry is None:
+        return
+    session, upload = entry
+    total = (data or {}).get("frames")
+
+    def _run():
+        # 帧可能晚于 end 到达：等待期间上传仍留在表中，继续接收帧
+        if isinstance(total, int):
+            upload.wait_frames(total)
+        with _sessions_lock:
+            if _voice_uploads.get(sid) is not entry:
+                return  # 等待期间被取消（断开连接 / 新的上传），槽位已释放
+            del _voice_uploads[sid]
+        try:
+            _assistant_ref.web_voice_pipeline(
+                upload, _voice_emit_fn(sid),
+                conversation=_assistant_ref.conversations.session(session.id),
+                post_fn=_post_fn(session),
             )
-            final_content = final["message"]["content"]
-            a.chat_history.append(final["message"])
+        finally:
+            session.end()
+
+    if not _worker_pool.try_submit(_run):
+        _cancel_voice_upload(sid)
+        _reject_overloaded("voice_status")
+
+
+@socketio.on("voice_stream_cancel")
+def handle_voice_stream_cancel(_=None):
+    _cancel_voice_upload(request.sid)
+
+
+@socketio.on("clear_chat")
+def handle_clear(_=None):
+    session = _current_session()
+    session.log.clear()
+    if _assistant_ref:
+        if session.shared_with_desktop:
+            # 通过信号安全地通知 PyQt 主线程清空对话，不能直接调用 Qt GUI 方法
+            _assistant_ref.comm.append_chat.emit("__CLEAR__", "")
         else:
-            a.chat_history.append(message)
-            final_content = message.get("content", "")
+            _assistant_ref.conversations.session(session.id).clear()
+    socketio.emit("chat_cleared", to=session.room)
+
 
-        # 同时广播到 Web 和 PyQt
-        broadcast_message("AI", final_content)
-        a.comm.append_chat.emit("AI", final_content)
+# ---------- AI 处理 ----------
+def _process_from_web(session: WebSession, user_input: str):
+    """复用 AIAssistant 的 AI 逻辑，在会话自己的对话上下文中处理来自 Web 的消息"""
+    a = _assistant_ref
+    stream = None
+    try:
+        if a is None:
+            return
+        # 回复逐 token 推送到会话的 Web 客户端；完成后写入聊天记录（共享会话同时同步到 PyQt）
+        on_commit = a.comm.append_chat.emit if session.shared_with_desktop else None
+        stream = MessageStream(session, "AI", on_commit=on_commit)
+        # 整轮作为事务提交；共享会话与桌面端的请求排队执行，独立会话之间互不阻塞
+        with a.conversations.session(session.id).turn() as turn:
+            turn.append({"role": "user", "content": user_input})
+            # 与桌面端共用 TurnEngine；工具调用前的输出不计入最终回复
+            content = a.engine.run(turn, stream.delta, stream.reset, tag="MCP Action via Web")
+
+        stream.commit(content)
 
     except Exception as e:
-        err = f"Error: {e}"
-        broadcast_message("System", err)
-        a.comm.append_chat.emit("System Error", str(e))
+        if stream is not None:
+            stream.abort()
+        post_message(session, "System", f"Error: {e}")
+        if session.shared_with_desktop:
+            a.comm.append_chat.emit("System Error", str(e))
+    finally:
+        session.end()
 
 
 # ---------- SSL 证书自动生成 ----------
@@ -272,34 +709,48 @@ def _get_local_ip():
 
 
 # ---------- 启动 ----------
+def _run_kwargs(use_https: bool) -> tuple[dict, str]:
+    """按运行时生成 socketio.run 的参数。
+
+    threading（嵌入桌面端时的唯一选择）：Werkzeug 开发服务器，Flask-SocketIO 默认拒绝在其上运行，
+    这里显式传入 allow_unsafe_werkzeug=True，HTTPS 使用 ssl_context；
+    eventlet / gevent（仅独立运行）：生产级服务器，直接接受证书文件路径。
+    """
+    werkzeug = {"allow_unsafe_werkzeug": True} if ASYNC_MODE == "threading" else {}
+    if not (use_https and _ensure_ssl_cert()):
+        return werkzeug, "http"
+    if ASYNC_MODE == "threading":
+        ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_ctx.load_cert_chain(_CERT_FILE, _KEY_FILE)
+        return {"ssl_context": ssl_ctx, **werkzeug}, "https"
+    return {"certfile": _CERT_FILE, "keyfile": _KEY_FILE}, "https"
+
+
 def start_server(host="0.0.0.0", port=5100, use_https=True):
     """在后台线程中启动 Flask-SocketIO 服务
 
+    由桌面端脚本调用时进程未被 monkey patch，运行时总是 threading（Werkzeug 开发服务器）；
+    eventlet / gevent 只在独立运行 server.py 时生效。
+
     Args:
         host: 监听地址
         port: 监听端口
         use_https: 是否启用 HTTPS（手机端麦克风功能需要）
     """
-    ssl_ctx = None
-    scheme = "http"
-
-    if use_https and _ensure_ssl_cert():
-        ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-        ssl_ctx.load_cert_chain(_CERT_FILE, _KEY_FILE)
-        scheme = "https"
+    run_kwargs, scheme = _run_kwargs(use_https)
 
     def _run():
-        socketio.run(
-            app, host=host, port=port,
-            ssl_context=ssl_ctx,
-            allow_unsafe_werkzeug=True,
-        )
+        socketio.run(app, host=host, port=port, **run_kwargs)
 
     t = threading.Thread(target=_run, daemon=True)
     t.start()
 
     local_ip = _get_local_ip()
     print(f"🌐 Web Chat 服务已启动:")
+    if ASYNC_MODE == "threading":
+        print(f"   运行时: threading（Werkzeug 开发服务器，仅供局域网 / Tailscale 访问）")
+    else:
+        print(f"   运行时: {ASYNC_MODE}")
     print(f"   本机访问: {scheme}://localhost:{port}")
     if local_ip:
         print(f"   局域网访问: {scheme}://{local_ip}:{port}")
@@ -311,9 +762,6 @@ def start_server(host="0.0.0.0", port=5100, use_https=True):
 if __name__ == "__main__":
     # 独立调试模式
     print("⚠️  独立模式运行，AI 功能不可用。请通过 ai_assistant.py 启动以获得完整功能。")
-    ssl_ctx = None
-    if _ensure_ssl_cert():
-        ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-        ssl_ctx.load_cert_chain(_CERT_FILE, _KEY_FILE)
-    socketio.run(app, host="0.0.0.0", port=5100, debug=True,
-                 ssl_context=ssl_ctx, allow_unsafe_werkzeug=True)
+    print(f"   运行时: {ASYNC_MODE}（设置 WEB_CHAT_ASYNC_MODE=eventlet / gevent 使用生产级异步服务器）")
+    run_kwargs, _ = _run_kwargs(use_https=True)
+    socketio.run(app, host="0.0.0.0", port=5100, debug=ASYNC_MODE == "threading", **run_kwargs)
@@ -5,7 +5,16 @@ if (window.location.protocol === "http:" && window.location.hostname !== "localh
 }
 
 // ===== Socket.IO 连接 =====
-const socket = io();
+// 聊天记录同步状态：重连时带上最后看到的消息 id，服务端只返回增量
+let lastSeenId = null;        // 已显示的最新消息 id
+let oldestLoadedId = null;    // 已加载的最早消息 id（向上翻页的起点）
+let hasMoreHistory = false;
+let loadingHistory = false;
+const HISTORY_PAGE_SIZE = 50;
+
+const socket = io({
+  auth: (cb) => cb({ lastId: lastSeenId }),
+});
 
 // ===== DOM =====
 const chatArea     = document.getElementById("chatArea");
@@ -147,11 +156,7 @@ function hideThinking() {
   }
 }
 
-function appendMessage(sender, content, timestamp) {
-  // Hide welcome
-  welcomeDiv.classList.add("hidden");
-  hideThinking();
-
+function buildMessageEl(sender, content, timestamp) {
   const cls = getSenderClass(sender);
   const time = timestamp ? formatTime(timestamp) : formatTime(Date.now() / 1000);
 
@@ -174,14 +179,50 @@ function appendMessage(sender, content, timestamp) {
     `;
   }
 
-  messagesDiv.appendChild(msgEl);
-
   // Highlight code blocks
   msgEl.querySelectorAll("pre code").forEach(block => hljs.highlightElement(block));
+  return msgEl;
+}
+
+function appendMessage(sender, content, timestamp) {
+  // Hide welcome
+  welcomeDiv.classList.add("hidden");
+  hideThinking();
 
+  messagesDiv.appendChild(buildMessageEl(sender, content, timestamp));
   scrollToBottom();
 }
 
+function trackMessageId(id) {
+  if (typeof id !== "number") return;
+  if (lastSeenId === null || id > lastSeenId) lastSeenId = id;
+  if (oldestLoadedId === null || id < oldestLoadedId) oldestLoadedId = id;
+}
+
+// 在顶部插入更早的消息，保持当前可见位置不跳动
+function prependMessages(messages) {
+  if (!messages.length) return;
+  const prevHeight = chatArea.scrollHeight;
+  const frag = document.createDocumentFragment();
+  messages.forEach(m => {
+    frag.appendChild(buildMessageEl(m.sender, m.content, m.timestamp));
+    trackMessageId(m.id);
+  });
+  messagesDiv.insertBefore(frag, messagesDiv.firstChild);
+  welcomeDiv.classList.add("hidden");
+  chatArea.scrollTop += chatArea.scrollHeight - prevHeight;
+}
+
+function loadOlderHistory() {
+  if (!hasMoreHistory || loadingHistory || oldestLoadedId === null) return;
+  loadingHistory = true;
+  socket.emit("load_history", { beforeId: oldestLoadedId, limit: HISTORY_PAGE_SIZE });
+}
+
+chatArea.addEventListener("scroll", () => {
+  if (chatArea.scrollTop < 80) loadOlderHistory();
+});
+
 function scrollToBottom() {
   requestAnimationFrame(() => {
     chatArea.scrollTop = chatArea.scrollHeight;
@@ -189,17 +230,36 @@ function scrollToBottom() {
 }
 
 // ===== Socket 事件 =====
-socket.on("chat_history", (history) => {
-  messagesDiv.innerHTML = "";
-  if (history.length > 0) {
+// data: {messages, reset, hasMore, lastId}；reset 时整体替换，否则只追加增量
+socket.on("chat_history", (data) => {
+  if (data.reset) {
+    liveStreams.clear();
+    messagesDiv.innerHTML = "";
+    oldestLoadedId = null;
+    hasMoreHistory = data.hasMore;
+  }
+  data.messages.forEach(m => {
+    if (!data.reset && lastSeenId !== null && m.id <= lastSeenId) return;
+    appendMessage(m.sender, m.content, m.timestamp);
+    trackMessageId(m.id);
+  });
+  if (data.reset) lastSeenId = data.lastId;
+  if (messagesDiv.children.length > 0) {
     welcomeDiv.classList.add("hidden");
-    history.forEach(m => appendMessage(m.sender, m.content, m.timestamp));
   } else {
     welcomeDiv.classList.remove("hidden");
   }
 });
 
+socket.on("chat_history_page", (data) => {
+  loadingHistory = false;
+  hasMoreHistory = data.hasMore;
+  prependMessages(data.messages);
+});
+
 socket.on("chat_message", (msg) => {
+  if (lastSeenId !== null && msg.id <= lastSeenId) return;  // 重连时已通过增量收到
+  trackMessageId(msg.id);
   appendMessage(msg.sender, msg.content, msg.timestamp);
   // 文字聊天收到 AI 回复后重置 FAB
   if (msg.sender === 'AI' && voiceFabState === 'loading' && !isVoicePipelineActive) {
@@ -207,8 +267,66 @@ socket.on("chat_message", (msg) => {
   }
 });
 
+// ===== 流式回复 =====
+// chat_delta 追加到临时气泡（Markdown 渲染按帧合并），chat_commit 换成带 id 的正式消息
+const liveStreams = new Map();  // streamId → {el, bubble, sender, text, scheduled, done}
+
+function renderLiveStream(entry) {
+  entry.scheduled = false;
+  if (entry.done) return;
+  entry.bubble.innerHTML = renderContent(entry.sender, entry.text);
+  scrollToBottom();
+}
+
+socket.on("chat_delta", (d) => {
+  let entry = liveStreams.get(d.streamId);
+  if (!entry) {
+    welcomeDiv.classList.add("hidden");
+    hideThinking();
+    const el = buildMessageEl(d.sender, "", d.timestamp);
+    el.classList.add("streaming");
+    messagesDiv.appendChild(el);
+    entry = { el, bubble: el.querySelector(".bubble"), sender: d.sender, text: "", scheduled: false, done: false };
+    liveStreams.set(d.streamId, entry);
+  }
+  if (d.reset) entry.text = "";
+  entry.text += d.delta || "";
+  if (!entry.scheduled) {
+    entry.scheduled = true;
+    requestAnimationFrame(() => renderLiveStream(entry));
+  }
+});
+
+socket.on("chat_commit", (d) => {
+  const entry = liveStreams.get(d.streamId);
+  liveStreams.delete(d.streamId);
+  if (entry) entry.done = true;
+  const msg = d.message;
+  // 生成失败，或重连时已通过增量收到：移除临时气泡
+  if (!msg || (lastSeenId !== null && msg.id <= lastSeenId)) {
+    if (entry) entry.el.remove();
+    return;
+  }
+  trackMessageId(msg.id);
+  const el = buildMessageEl(msg.sender, msg.content, msg.timestamp);
+  if (entry) {
+    entry.el.replaceWith(el);
+  } else {
+    welcomeDiv.classList.add("hidden");
+    hideThinking();
+    messagesDiv.appendChild(el);
+  }
+  scrollToBottom();
+  if (msg.sender === 'AI' && voiceFabState === 'loading' && !isVoicePipelineActive) {
+    setVoiceFabState('idle');
+  }
+});
+
 socket.on("chat_cleared", () => {
+  liveStreams.clear();
   messagesDiv.innerHTML = "";
+  oldestLoadedId = null;
+  hasMoreHistory = false;
   welcomeDiv.classList.remove("hidden");
 });
 
@@ -271,7 +389,64 @@ document.querySelectorAll(".quick-btn").forEach(btn => {
 
 const voiceMicBtn    = document.getElementById("voiceMicBtn");
 
+// ---------- 音频编码 ----------
+// 与服务端 assistant_core/audio_codec.py 对应：
+//   pcm_s16: 16 位 PCM；mulaw8: μ-law(μ=255) 8 位码；pcm_f32: 旧格式
+const UPLOAD_CODEC = "pcm_s16";
+const ACCEPTED_CODECS = ["pcm_s16", "mulaw8", "pcm_f32"];
+const MU = 255;
+
+const MULAW8_TABLE = (() => {
+  const table = new Float32Array(256);
+  for (let code = -128; code < 128; code++) {
+    const y = code / 127;
+    table[code & 0xff] = Math.sign(y) * (Math.pow(1 + MU, Math.abs(y)) - 1) / MU;
+  }
+  return table;
+})();
+
+function encodePcm(float32, codec) {
+  if (codec === "pcm_s16") {
+    const out = new Int16Array(float32.length);
+    for (let i = 0; i < float32.length; i++) {
+      const x = Math.max(-1, Math.min(1, float32[i]));
+      out[i] = Math.round(x * 32767);
+    }
+    return out.buffer;
+  }
+  if (codec === "mulaw8") {
+    const out = new Int8Array(float32.length);
+    const logMu = Math.log1p(MU);
+    for (let i = 0; i < float32.length; i++) {
+      const x = Math.max(-1, Math.min(1, float32[i]));
+      out[i] = Math.round(Math.sign(x) * Math.log1p(MU * Math.abs(x)) / logMu * 127);
+    }
+    return out.buffer;
+  }
+  return float32.buffer;
+}
+
+function decodePcm(arrayBuffer, codec) {
+  if (codec === "pcm_s16") {
+    const pcm = new Int16Array(arrayBuffer, 0, arrayBuffer.byteLength >> 1);
+    const out = new Float32Array(pcm.length);
+    for (let i = 0; i < pcm.length; i++) out[i] = pcm[i] / 32768;
+    return out;
+  }
+  if (codec === "mulaw8") {
+    const codes = new Uint8Array(arrayBuffer);
+    const out = new Float32Array(codes.length);
+    for (let i = 0; i < codes.length; i++) out[i] = MULAW8_TABLE[codes[i]];
+    return out;
+  }
+  return new Float32Array(arrayBuffer, 0, arrayBuffer.byteLength >> 2);
+}
+
 // ---------- 录音器 ----------
+// 支持 AudioWorklet 时在音频线程中降采样到 16kHz 并按小帧回调 onFrame（流式上传）；
+// 否则退回 ScriptProcessor，停止时一次性取出全部录音。
+const UPLOAD_FRAME_SAMPLES = 640;  // 40ms @16kHz
+
 class VoiceRecorder {
   constructor() {
     this.audioContext = null;
@@ -281,6 +456,9 @@ class VoiceRecorder {
     this.chunks = [];
     this.isRecording = false;
     this.actualSampleRate = 16000;
+    this.streaming = false;   // true: 使用 AudioWorklet 逐帧回调
+    this.onFrame = null;      // (Float32Array @16kHz) => void
+    this._flushResolve = null;
   }
 
   async start() {
@@ -297,6 +475,32 @@ class VoiceRecorder {
     this.actualSampleRate = this.audioContext.sampleRate;
 
     this.source = this.audioContext.createMediaStreamSource(this.stream);
+
+    if (this.audioContext.audioWorklet && typeof AudioWorkletNode !== "undefined") {
+      try {
+        await this.audioContext.audioWorklet.addModule("/static/recorder-worklet.js");
+        this.processor = new AudioWorkletNode(this.audioContext, "pcm-capture", {
+          processorOptions: { targetRate: 16000, frameSamples: UPLOAD_FRAME_SAMPLES },
+        });
+        this.processor.port.onmessage = (e) => {
+          if (e.data && e.data.flushed) {
+            if (this._flushResolve) this._flushResolve();
+            this._flushResolve = null;
+            return;
+          }
+          if (this.isRecording && this.onFrame) this.onFrame(e.data);
+        };
+        this.source.connect(this.processor);
+        this.processor.connect(this.audioContext.destination);
+        this.streaming = true;
+        this.isRecording = true;
+        return;
+      } catch (err) {
+        console.warn("AudioWorklet 不可用，改用 ScriptProcessor:", err);
+        this.processor = null;
+      }
+    }
+
     this.processor = this.audioContext.createScriptProcessor(4096, 1, 1);
 
     this.processor.onaudioprocess = (e) => {
@@ -317,6 +521,16 @@ class VoiceRecorder {
     return pcm;
   }
 
+  flush() {
+    // 流式模式：让 worklet 立即发出不足一帧的剩余采样（最多等 200ms）
+    if (!this.streaming || !this.processor) return Promise.resolve();
+    return new Promise((resolve) => {
+      const timer = setTimeout(() => { this._flushResolve = null; resolve(); }, 200);
+      this._flushResolve = () => { clearTimeout(timer); resolve(); };
+      this.processor.port.postMessage("flush");
+    });
+  }
+
   snapshot() {
     // Capture current recorded chunks into a PCM buffer without closing stream/context
     const wasRecording = this.isRecording;
@@ -373,14 +587,25 @@ class VoiceRecorder {
 }
 
 // ---------- 流式音频播放器 ----------
+// 服务端按固定时长切帧推送并附带序号；这里按序号重排，
+// 攒够 JITTER_TARGET_MS 再开始排播，播放追上接收（欠载）时重新攒缓冲。
+const JITTER_TARGET_MS = 150;
+
 class AudioStreamPlayer {
-  constructor(sampleRate) {
+  constructor(sampleRate, codec = "pcm_f32") {
     this.sampleRate = sampleRate;
+    this.codec = codec;
     this.ctx = null;
     this.nextStartTime = 0;
     this.lastSource = null;
     this.onEnded = null;
     this._ended = false;
+    this._pending = new Map();  // seq → Float32Array（乱序到达的帧）
+    this._ready = [];           // 已按序就绪、尚未排播的帧
+    this._readySamples = 0;
+    this._nextSeq = 0;
+    this._autoSeq = 0;          // 旧服务端不带序号时自动编号
+    this._buffering = true;
   }
 
   init() {
@@ -388,29 +613,74 @@ class AudioStreamPlayer {
     this.nextStartTime = this.ctx.currentTime + 0.05; // 小缓冲
   }
 
-  playChunk(arrayBuffer) {
+  pushFrame(seq, arrayBuffer) {
     if (!this.ctx) this.init();
+    if (seq < this._nextSeq) return;  // 重复帧
+    const samples = decodePcm(arrayBuffer, this.codec);
+    if (samples.length === 0) {
+      this._pending.set(seq, null);
+    } else {
+      this._pending.set(seq, samples);
+    }
+    while (this._pending.has(this._nextSeq)) {
+      const frame = this._pending.get(this._nextSeq);
+      this._pending.delete(this._nextSeq);
+      this._nextSeq++;
+      if (frame) {
+        this._ready.push(frame);
+        this._readySamples += frame.length;
+      }
+    }
+    this._schedule(false);
+  }
 
-    const float32Data = new Float32Array(arrayBuffer);
-    if (float32Data.length === 0) return;
-
-    const audioBuffer = this.ctx.createBuffer(1, float32Data.length, this.sampleRate);
-    audioBuffer.getChannelData(0).set(float32Data);
-
-    const source = this.ctx.createBufferSource();
-    source.buffer = audioBuffer;
-    source.connect(this.ctx.destination);
+  playChunk(arrayBuffer) {
+    this.pushFrame(this._autoSeq++, arrayBuffer);
+  }
 
+  _schedule(force) {
+    if (!this.ctx) return;
     const now = this.ctx.currentTime;
-    const startTime = Math.max(now + 0.02, this.nextStartTime);
-    source.start(startTime);
-    this.nextStartTime = startTime + audioBuffer.duration;
-    this.lastSource = source;
+    if (!this._buffering && this.nextStartTime < now) {
+      // 欠载：已排播的音频放完了，重新攒缓冲，避免一帧一卡
+      this._buffering = true;
+    }
+    if (this._buffering && !force &&
+        this._readySamples < this.sampleRate * JITTER_TARGET_MS / 1000) {
+      return;
+    }
+    this._buffering = false;
+    for (const frame of this._ready) {
+      const audioBuffer = this.ctx.createBuffer(1, frame.length, this.sampleRate);
+      audioBuffer.getChannelData(0).set(frame);
+
+      const source = this.ctx.createBufferSource();
+      source.buffer = audioBuffer;
+      source.connect(this.ctx.destination);
+
+      const startTime = Math.max(this.ctx.currentTime + 0.02, this.nextStartTime);
+      source.start(startTime);
+      this.nextStartTime = startTime + audioBuffer.duration;
+      this.lastSource = source;
+    }
+    this._ready = [];
+    this._readySamples = 0;
   }
 
   end() {
     if (this._ended) return;
     this._ended = true;
+    // 流已结束：跳过缺失的序号，剩余帧全部排播
+    const seqs = [...this._pending.keys()].sort((a, b) => a - b);
+    for (const seq of seqs) {
+      const frame = this._pending.get(seq);
+      if (frame) {
+        this._ready.push(frame);
+        this._readySamples += frame.length;
+      }
+    }
+    this._pending.clear();
+    this._schedule(true);
     // 等最后一个 chunk 播完再回调
     if (this.ctx) {
       const remaining = this.nextStartTime - this.ctx.currentTime;
@@ -516,6 +786,28 @@ async function checkMicPermission() {
   }
 }
 
+// ---------- 流式上传 ----------
+// voice_stream_start → voice_stream_frame {seq, data} × N → voice_stream_end {frames: N}
+let uploadActive = false;
+let uploadSeq = 0;
+let uploadSamples = 0;
+
+function beginVoiceUpload(recorder) {
+  uploadActive = true;
+  uploadSeq = 0;
+  uploadSamples = 0;
+  socket.emit("voice_stream_start", {
+    codec: UPLOAD_CODEC,
+    sampleRate: 16000,
+    accept: ACCEPTED_CODECS,
+  });
+  recorder.onFrame = (frame) => {
+    if (!uploadActive) return;
+    socket.emit("voice_stream_frame", { seq: uploadSeq++, data: encodePcm(frame, UPLOAD_CODEC) });
+    uploadSamples += frame.length;
+  };
+}
+
 // ---------- 录音按钮事件 ----------
 async function startVoiceRecording() {
   if (voiceFabState !== 'idle') return;
@@ -535,6 +827,7 @@ async function startVoiceRecording() {
 
   // 如果之前为了播放而保留了麦克风实例，尝试重用并直接进入录音
   if (voiceRecorder && voiceRecorder.stream && !voiceRecorder.isRecording) {
+    if (voiceRecorder.streaming) beginVoiceUpload(voiceRecorder);
     voiceRecorder.isRecording = true;
     setVoiceFabState('recording');
     return;
@@ -543,6 +836,7 @@ async function startVoiceRecording() {
   voiceRecorder = new VoiceRecorder();
   try {
     await voiceRecorder.start();
+    if (voiceRecorder.streaming) beginVoiceUpload(voiceRecorder);
     setVoiceFabState('recording');
   } catch (err) {
     console.error("麦克风访问失败:", err);
@@ -561,7 +855,7 @@ async function startVoiceRecording() {
   }
 }
 
-function stopVoiceRecording() {
+async function stopVoiceRecording() {
   if (voiceFabState !== 'recording') return;
 
   if (!voiceRecorder || !voiceRecorder.isRecording) {
@@ -569,6 +863,30 @@ function stopVoiceRecording() {
     return;
   }
 
+  if (voiceRecorder.streaming && uploadActive) {
+    // 流式上传：音频已边录边发送，这里只需发出尾帧并通知结束
+    const recorder = voiceRecorder;
+    setVoiceFabState('loading');
+    await recorder.flush();
+    recorder.isRecording = false;
+    uploadActive = false;
+    micHeldForPlayback = true;
+
+    // 太短（<0.3秒@16kHz = 4800 samples）或已取消
+    if (uploadSamples < 4800 || voiceCancelled) {
+      socket.emit("voice_stream_cancel");
+      recorder.release();
+      if (voiceRecorder === recorder) voiceRecorder = null;
+      micHeldForPlayback = false;
+      setVoiceFabState('idle');
+      return;
+    }
+
+    isVoicePipelineActive = true;
+    socket.emit("voice_stream_end", { frames: uploadSeq });
+    return;
+  }
+
   // 获取当前录音数据，但保留麦克风与 AudioContext，直到播放结束再释放
   const pcm = voiceRecorder.snapshot();
   // 停止继续录制（但不释放设备）
@@ -597,7 +915,12 @@ function stopVoiceRecording() {
 
   setVoiceFabState('loading');
   isVoicePipelineActive = true;
-  socket.emit("voice_input", pcm.buffer);
+  socket.emit("voice_input", {
+    codec: UPLOAD_CODEC,
+    sampleRate: 16000,
+    data: encodePcm(pcm, UPLOAD_CODEC),
+    accept: ACCEPTED_CODECS,
+  });
 }
 
 function stopPlayback() {
@@ -622,7 +945,7 @@ voiceMicBtn.addEventListener("click", async (e) => {
   if (voiceFabState === 'idle') {
     await startVoiceRecording();
   } else if (voiceFabState === 'recording') {
-    stopVoiceRecording();
+    await stopVoiceRecording();
   } else if (voiceFabState === 'playing') {
     stopPlayback();
   }
@@ -636,6 +959,15 @@ voiceMicBtn.addEventListener("contextmenu", (e) => e.preventDefault());
 socket.on("voice_status", (data) => {
   if (voiceCancelled) return;
   if (data.status === "error") {
+    if (uploadActive) {
+      // 流式上传被服务端拒绝（忙碌 / 模型未就绪）：停止录音并释放麦克风
+      uploadActive = false;
+      if (voiceRecorder) {
+        voiceRecorder.release();
+        voiceRecorder = null;
+      }
+      micHeldForPlayback = false;
+    }
     // 出错时强制重置
     if (audioStreamPlayer) {
       audioStreamPlayer.close();
@@ -658,7 +990,7 @@ socket.on("voice_asr_result", (data) => {
 
 socket.on("voice_audio_start", (data) => {
   if (voiceCancelled) return;
-  audioStreamPlayer = new AudioStreamPlayer(data.sampleRate);
+  audioStreamPlayer = new AudioStreamPlayer(data.sampleRate, data.codec || "pcm_f32");
   audioStreamPlayer.init();
   audioStreamPlayer.onEnded = () => {
     audioStreamPlayer = null;
@@ -676,7 +1008,11 @@ socket.on("voice_audio_start", (data) => {
 
 socket.on("voice_audio_chunk", (data) => {
   if (voiceCancelled || !audioStreamPlayer) return;
-  audioStreamPlayer.playChunk(data);
+  if (data && data.data !== undefined) {
+    audioStreamPlayer.pushFrame(data.seq, data.data);
+  } else {
+    audioStreamPlayer.playChunk(data);
+  }
 });
 
 socket.on("voice_audio_end", () => {
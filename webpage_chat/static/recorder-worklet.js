@@ -0,0 +1,58 @@
+// 录音 AudioWorklet：在音频线程中把麦克风输入降采样到 targetRate，
+// 攒够 frameSamples 个采样后通过 port 发给主线程（Float32Array，转移所有权）。
+// 主线程发送 "flush" 时立即发出剩余采样，并附带 {flushed: true} 回复。
+
+class PcmCaptureProcessor extends AudioWorkletProcessor {
+  constructor(options) {
+    super();
+    const opts = (options && options.processorOptions) || {};
+    this.targetRate = opts.targetRate || 16000;
+    this.frameSamples = opts.frameSamples || 640;
+    this.ratio = sampleRate / this.targetRate;  // sampleRate 为 AudioWorkletGlobalScope 全局变量
+    this.frame = new Float32Array(this.frameSamples);
+    this.filled = 0;
+    this.pos = 0;        // 下一个输出采样在输入流中的位置（相对当前块）
+    this.prev = 0;       // 上一块的最后一个输入采样，用于跨块插值
+    this.port.onmessage = (e) => {
+      if (e.data === "flush") {
+        this._emit();
+        this.port.postMessage({ flushed: true });
+      }
+    };
+  }
+
+  _emit() {
+    if (this.filled === 0) return;
+    const out = this.frame.slice(0, this.filled);
+    this.port.postMessage(out, [out.buffer]);
+    this.filled = 0;
+  }
+
+  _push(sample) {
+    this.frame[this.filled++] = sample;
+    if (this.filled === this.frameSamples) this._emit();
+  }
+
+  process(inputs) {
+    const input = inputs[0] && inputs[0][0];
+    if (!input) return true;
+    if (this.ratio === 1) {
+      for (let i = 0; i < input.length; i++) this._push(input[i]);
+      return true;
+    }
+    // 线性插值降采样；pos 可能落在 [-1, 0) 区间，此时与上一块的末尾采样插值
+    while (this.pos < input.length - 1) {
+      const lo = Math.floor(this.pos);
+      const frac = this.pos - lo;
+      const a = lo < 0 ? this.prev : input[lo];
+      const b = input[lo + 1];
+      this._push(a * (1 - frac) + b * frac);
+      this.pos += this.ratio;
+    }
+    this.pos -= input.length;
+    this.prev = input[input.length - 1];
+    return true;
+  }
+}
+
+registerProcessor("pcm-capture", PcmCaptureProcessor);
@@ -0,0 +1,74 @@
+"""Web 请求的有界工作线程池。
+
+send_message / voice 等事件需要调用阻塞的 assistant 方法（LLM、ASR、TTS）。
+原先每个请求直接起一个线程，并发一高线程数和内存都不受控；这里固定 max_workers 个
+工作线程，最多再排队 max_pending 个请求，超出时 try_submit 立即返回 False，
+由调用方提示客户端“服务器繁忙”（背压），而不是无限堆积。
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedWorkerPool:
+    def __init__(self, max_workers: int = 4, max_pending: int = 16, name: str = "web-worker"):
+        if max_workers <= 0 or max_pending < 0:
+            raise ValueError("max_workers must be greater than 0 and max_pending must not be negative.")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def try_submit(self, fn, *args, **kwargs) -> bool:
+        """提交任务；池已满（运行中 + 排队达到上限）时不提交并返回 False"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            print(f"[{self.name}] 请求过多，已拒绝（{self.max_workers} 运行 + {self.max_pending} 排队已满）")
+            return False
+        with self._lock:
+            self._queued += 1
+        try:
+            self._executor.submit(self._run, fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+        return True
+
+    def _run(self, fn, args, kwargs) -> None:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            print(f"[{self.name}] 任务异常: {e}")
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": self._queued,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait)